@@ -0,0 +1,87 @@
+"""Conta statements SQL e commits por distribuição: caminho carta-a-carta vs. gravação em lote.
+
+Uso: python -m benchmarks.bench_insercao_lote --distribuicoes 200
+"""
+import argparse
+import random
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from modules.distribuicao.models import Base, Jogador, Pokemon
+from modules.distribuicao.repository import GerenciadorBD
+
+
+class Contador:
+    def __init__(self, engine, session_factory):
+        self.statements = 0
+        self.commits = 0
+        event.listen(engine, "before_cursor_execute", self.__statement)
+        event.listen(session_factory, "after_commit", self.__commit)
+
+    def __statement(self, *args):
+        self.statements += 1
+
+    def __commit(self, session):
+        self.commits += 1
+
+
+def porCarta(bd: GerenciadorBD, jogador: Jogador, pokemons: list[Pokemon]):
+    """Caminho antigo do gerarPokemonsIniciais."""
+    try:
+        bd.createJogador(jogador)
+    except ValueError:
+        pass
+    for p in pokemons:
+        try:
+            bd.adicionarPokemon(p)
+        except ValueError:
+            pass
+    for p in pokemons:
+        try:
+            bd.adicionarPokemonAoJogador(jogador.get_id(), p)
+        except ValueError:
+            pass
+
+
+def emLote(bd: GerenciadorBD, jogador: Jogador, pokemons: list[Pokemon]):
+    bd.adicionarDistribuicao(jogador, pokemons)
+
+
+def medir(estrategia, distribuicoes: int) -> dict:
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    contador = Contador(engine, Session)
+    bd = GerenciadorBD(Session())
+
+    rng = random.Random(42)
+    inicio = time.perf_counter()
+    for i in range(distribuicoes):
+        pokemons = [Pokemon(n, f"pokemon-{n}") for n in rng.sample(range(1, 1026), 5)]
+        estrategia(bd, Jogador(str(i), pokemons), pokemons)
+    duracao = time.perf_counter() - inicio
+
+    return {
+        "statements_por_distribuicao": contador.statements / distribuicoes,
+        "commits_por_distribuicao": contador.commits / distribuicoes,
+        "ms_por_distribuicao": duracao * 1000 / distribuicoes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--distribuicoes", type=int, default=200)
+    args = parser.parse_args()
+
+    for nome, estrategia in (("por carta", porCarta), ("em lote", emLote)):
+        r = medir(estrategia, args.distribuicoes)
+        print(
+            f"{nome:>9}: statements={r['statements_por_distribuicao']:.1f} "
+            f"commits={r['commits_por_distribuicao']:.1f} tempo={r['ms_por_distribuicao']:.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
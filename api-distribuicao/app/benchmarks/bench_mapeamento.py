@@ -0,0 +1,98 @@
+"""Custo por linha e memória de montar a listagem de um time grande.
+
+Compara o caminho antigo (entidade ORM -> adapter -> Pokemon -> dict) com o
+novo (tupla (id, nome, shiny) -> dict) e o tamanho de um Pokemon com e sem
+__slots__.
+
+Uso: python -m benchmarks.bench_mapeamento --cartas 10000
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from modules.distribuicao.adapters import OrmTopokemonAdapter
+from modules.distribuicao.models import Base, Jogador, Pokemon, PokemonORM, UsuarioORM, UsuarioPokemonORM
+from modules.distribuicao.repository import GerenciadorBD
+
+
+class PokemonComDict:
+    """Pokemon como era antes do __slots__, para comparação."""
+
+    def __init__(self, numero_pokedex: int = 0, nome: str = 'missingno', shiny: bool = False):
+        self.numero_pokedex = numero_pokedex
+        self.nome = nome
+        self.shiny = shiny
+
+
+def caminhoAntigo(db, id_jogador: str) -> list[dict]:
+    linhas = db.execute(
+        select(UsuarioORM.idUsuario, PokemonORM)
+        .outerjoin(UsuarioPokemonORM, UsuarioPokemonORM.idUsuario == UsuarioORM.idUsuario)
+        .outerjoin(PokemonORM, PokemonORM.idPokemon == UsuarioPokemonORM.idPokemon)
+        .where(UsuarioORM.idUsuario == id_jogador)
+    ).all()
+    pokemons = [OrmTopokemonAdapter(p) for _, p in linhas if p is not None]
+    return [{"pokemon_name": p.get_nome(), "is_shiny": p.is_shiny()} for p in pokemons]
+
+
+def caminhoNovo(db, id_jogador: str) -> list[dict]:
+    return [
+        {"pokemon_name": nome, "is_shiny": shiny}
+        for _, nome, shiny in GerenciadorBD(db).getLinhasTimeDoJogador(id_jogador)
+    ]
+
+
+def medir(funcao, Session, id_jogador: str, repeticoes: int) -> tuple[float, int]:
+    # Sessão nova a cada rodada: sem identity map aquecido de uma rodada para outra
+    with Session() as db:
+        funcao(db, id_jogador)  # aquecimento
+
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        with Session() as db:
+            funcao(db, id_jogador)
+    duracao = (time.perf_counter() - inicio) / repeticoes
+
+    tracemalloc.start()
+    with Session() as db:
+        funcao(db, id_jogador)
+        _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return duracao, pico
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cartas", type=int, default=10_000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        GerenciadorBD(db).adicionarDistribuicoesEmLote([
+            Jogador("colecionador", [Pokemon(i, f"pokemon-{i}", i % 256 == 0) for i in range(1, args.cartas + 1)])
+        ])
+
+    for nome, funcao in (("antigo", caminhoAntigo), ("novo", caminhoNovo)):
+        duracao, pico = medir(funcao, Session, "colecionador", args.repeticoes)
+        print(
+            f"{nome:>6}: {duracao * 1000:.1f}ms por listagem, {duracao * 1e6 / args.cartas:.2f}µs por linha, "
+            f"pico de memória {pico / 1024:.0f} KiB"
+        )
+
+    com_dict = PokemonComDict(1, "bulbasaur")
+    com_slots = Pokemon(1, "bulbasaur")
+    print(
+        f"Pokemon: {sys.getsizeof(com_dict) + sys.getsizeof(com_dict.__dict__)} bytes com __dict__, "
+        f"{sys.getsizeof(com_slots)} bytes com __slots__"
+    )
+
+
+if __name__ == "__main__":
+    main()
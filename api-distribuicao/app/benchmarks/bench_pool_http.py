@@ -0,0 +1,73 @@
+"""Compara p50/p99 de distribuições de 5 cartas com e sem pool de conexões HTTP.
+
+Uso: python -m benchmarks.bench_pool_http --distribuicoes 200 --latencia 0.002
+"""
+import argparse
+import random
+import statistics
+import time
+
+import requests
+
+from benchmarks.stub_pokeapi import StubPokeAPI
+from modules.distribuicao.cache import CacheEspecies
+from modules.distribuicao.external import GestorAPI
+
+
+class SessaoSemPool:
+    """Imita a chamada antiga: um `requests.get` (e uma conexão nova) por requisição."""
+
+    def get(self, url, **kwargs):
+        return requests.get(url, **kwargs)
+
+
+def percentil(amostras: list[float], p: float) -> float:
+    ordenadas = sorted(amostras)
+    indice = min(len(ordenadas) - 1, max(0, round(p / 100 * len(ordenadas)) - 1))
+    return ordenadas[indice]
+
+
+def distribuir(gestor: GestorAPI):
+    max_id = gestor.getMaxID()
+    for pokemon_id in random.sample(range(1, max_id + 1), 5):
+        gestor.getPokemon(pokemon_id)
+
+
+def medir(url: str, distribuicoes: int, com_pool: bool) -> dict:
+    # Capacidade zero desliga o cache de espécies, para medir só o HTTP
+    gestor = GestorAPI(api_url=url, cache=CacheEspecies(capacidade=0))
+    if not com_pool:
+        gestor.session = SessaoSemPool()
+
+    tempos = []
+    for _ in range(distribuicoes):
+        inicio = time.perf_counter()
+        distribuir(gestor)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+
+    return {
+        "p50_ms": percentil(tempos, 50),
+        "p99_ms": percentil(tempos, 99),
+        "media_ms": statistics.fmean(tempos),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--distribuicoes", type=int, default=200)
+    parser.add_argument("--latencia", type=float, default=0.002)
+    args = parser.parse_args()
+
+    with StubPokeAPI(latencia=args.latencia) as stub:
+        for com_pool in (False, True):
+            conexoes_antes = stub.conexoes
+            resultado = medir(stub.url, args.distribuicoes, com_pool)
+            rotulo = "com pool" if com_pool else "sem pool"
+            print(
+                f"{rotulo:>9}: p50={resultado['p50_ms']:.2f}ms p99={resultado['p99_ms']:.2f}ms "
+                f"media={resultado['media_ms']:.2f}ms conexoes={stub.conexoes - conexoes_antes}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Requisições por segundo do time e da distribuição, com e sem a resposta JSON rápida.
+
+Usa o TestClient do FastAPI com um GestorCartas falso (sem banco e sem
+PokeAPI), então o que muda entre as rodadas é só a validação e a
+serialização da resposta.
+
+Uso: python -m benchmarks.bench_respostas --requisicoes 2000 --cartas 1000
+"""
+import argparse
+import time
+
+from fastapi.testclient import TestClient
+
+from main import app
+from modules.distribuicao.container import obterGestorCartas
+from modules.distribuicao.models import Pokemon
+from shared import respostas
+
+
+class GestorFalso:
+    """Devolve respostas prontas, no mesmo formato do GestorCartas."""
+
+    def __init__(self, cartas: int):
+        self.__time = {
+            "status": 200,
+            "message": "Time adquirido com sucesso",
+            "data": {
+                "operation": "LIST_TEAM",
+                "team": [{"pokemon_name": f"pokemon-{i}", "is_shiny": i % 256 == 0} for i in range(1, cartas + 1)],
+            },
+        }
+
+    def listarTime(self, idJogador: str, limite=None, cursor=None) -> dict:
+        return self.__time
+
+    async def gerarPokemonsIniciaisAsync(self, idJogador: str) -> dict:
+        return {
+            "status": "sucesso",
+            "mensagem": "Os 5 pokémons iniciais foram gerados com sucesso.",
+            "codigo": "200",
+            "pokemons": [Pokemon(i, f"pokemon-{i}", i == 3) for i in range(1, 6)],
+        }
+
+
+def medir(client: TestClient, metodo: str, caminho: str, requisicoes: int) -> float:
+    for _ in range(min(50, requisicoes)):  # aquecimento
+        client.request(metodo, caminho)
+    inicio = time.perf_counter()
+    for _ in range(requisicoes):
+        client.request(metodo, caminho)
+    return requisicoes / (time.perf_counter() - inicio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requisicoes", type=int, default=2000)
+    parser.add_argument("--cartas", type=int, default=1000, help="tamanho do time listado")
+    args = parser.parse_args()
+
+    gestor = GestorFalso(args.cartas)
+    app.dependency_overrides[obterGestorCartas] = lambda: gestor
+    client = TestClient(app)  # sem `with`: não roda o lifespan (banco/catálogo)
+
+    cenarios = (
+        ("time", "GET", "/api/players/bench/team"),
+        ("distribuição", "POST", "/api/players/bench/distribution"),
+    )
+    encoder = "orjson" if respostas.orjson is not None else "json"
+    for nome, metodo, caminho in cenarios:
+        respostas.RESPOSTA_JSON_RAPIDA = False
+        padrao = medir(client, metodo, caminho, args.requisicoes)
+        respostas.RESPOSTA_JSON_RAPIDA = True
+        rapida = medir(client, metodo, caminho, args.requisicoes)
+        print(f"{nome:>12}: padrão {padrao:,.0f} req/s, rápida ({encoder}) {rapida:,.0f} req/s ({rapida / padrao:.2f}x)")
+
+    app.dependency_overrides.clear()
+
+
+if __name__ == "__main__":
+    main()
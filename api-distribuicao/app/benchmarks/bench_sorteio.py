@@ -0,0 +1,49 @@
+"""Tempo para sortear N distribuições: laço com random.randint vs. MotorSorteio vetorizado.
+
+Uso: python -m benchmarks.bench_sorteio --distribuicoes 100000
+"""
+import argparse
+import random
+import time
+
+from modules.distribuicao.sorteio import MotorSorteio, CARTAS_POR_DISTRIBUICAO
+
+MAX_ID = 1025
+
+
+def laco(distribuicoes: int, max_id: int):
+    """Caminho antigo do gerarPokemonsIniciais, sem as chamadas à API."""
+    rng = random.Random(42)
+    for _ in range(distribuicoes):
+        pokemons_id = []
+        shiny = []
+        while len(pokemons_id) < CARTAS_POR_DISTRIBUICAO:
+            pokemon_id = rng.randint(1, max_id)
+            if pokemon_id not in pokemons_id:
+                shiny.append(rng.randint(1, 256) == 1)
+                pokemons_id.append(pokemon_id)
+
+
+def vetorizado(distribuicoes: int, max_id: int):
+    MotorSorteio(semente=42).sortear(distribuicoes, max_id)
+
+
+def ponderado(distribuicoes: int, max_id: int):
+    # Lendários (144-151) 20x mais raros que as demais espécies
+    MotorSorteio(semente=42, pesos={i: 0.05 for i in range(144, 152)}).sortear(distribuicoes, max_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--distribuicoes", type=int, default=100_000)
+    args = parser.parse_args()
+
+    for nome, estrategia in (("laço", laco), ("vetorizado", vetorizado), ("ponderado", ponderado)):
+        inicio = time.perf_counter()
+        estrategia(args.distribuicoes, MAX_ID)
+        duracao = time.perf_counter() - inicio
+        print(f"{nome:>10}: {duracao * 1000:.1f}ms ({args.distribuicoes / duracao:,.0f} distribuições/s)")
+
+
+if __name__ == "__main__":
+    main()
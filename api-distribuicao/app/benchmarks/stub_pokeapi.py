@@ -0,0 +1,111 @@
+"""Servidor HTTP local que imita as rotas da PokeAPI usadas pelo GestorAPI.
+
+Uso: python -m benchmarks.stub_pokeapi --porta 8765 --latencia 0.02
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROTA_POKEMON = re.compile(r"^/api/v2/pokemon/(\d+)/?$")
+ROTA_ESPECIES = re.compile(r"^/api/v2/pokemon-species/?(\?.*)?$")
+
+
+class StubPokeAPI:
+    """PokeAPI falsa com latência e taxa de erro configuráveis."""
+
+    def __init__(self, porta: int = 0, latencia: float = 0.0, taxa_erro: float = 0.0, max_id: int = 1025):
+        self.latencia = latencia
+        self.taxa_erro = taxa_erro
+        self.max_id = max_id
+        self.requisicoes = 0
+        self.conexoes = 0
+        self.__servidor = ThreadingHTTPServer(("127.0.0.1", porta), self.__criarHandler())
+        self.__servidor.daemon_threads = True
+        self.__thread = None
+
+    @property
+    def url(self) -> str:
+        host, porta = self.__servidor.server_address[:2]
+        return f"http://{host}:{porta}/api/v2/"
+
+    def __criarHandler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                stub.conexoes += 1
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                stub.requisicoes += 1
+                if stub.latencia:
+                    time.sleep(stub.latencia)
+
+                if stub.taxa_erro and random.random() < stub.taxa_erro:
+                    return self.__responder(503, {"detail": "erro simulado"})
+
+                if self.path == "/api/v2/" or self.path == "/api/v2":
+                    return self.__responder(200, {"pokemon": f"{stub.url}pokemon/"})
+
+                if ROTA_ESPECIES.match(self.path):
+                    return self.__responder(200, {"count": stub.max_id, "results": []})
+
+                encontrado = ROTA_POKEMON.match(self.path)
+                if encontrado:
+                    numero = int(encontrado.group(1))
+                    if 1 <= numero <= stub.max_id:
+                        return self.__responder(200, {"id": numero, "forms": [{"name": f"pokemon-{numero}"}]})
+
+                return self.__responder(404, {"detail": "Not found."})
+
+            def __responder(self, status: int, corpo: dict):
+                dados = json.dumps(corpo).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+        return Handler
+
+    def iniciar(self):
+        self.__thread = threading.Thread(target=self.__servidor.serve_forever, daemon=True)
+        self.__thread.start()
+        return self
+
+    def parar(self):
+        self.__servidor.shutdown()
+        self.__servidor.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *args):
+        self.parar()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PokeAPI falsa para benchmarks")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--latencia", type=float, default=0.0, help="latência por requisição, em segundos")
+    parser.add_argument("--taxa-erro", type=float, default=0.0, help="fração de respostas 503")
+    args = parser.parse_args()
+
+    stub = StubPokeAPI(porta=args.porta, latencia=args.latencia, taxa_erro=args.taxa_erro)
+    print(f"Stub PokeAPI ouvindo em {stub.url}")
+    stub.iniciar()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stub.parar()
@@ -1,11 +1,107 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from modules.distribuicao.router import router as distribuicao_router
+from modules.distribuicao.container import container
+from modules.distribuicao.catalogo import CATALOGO_ARQUIVO
+from modules.distribuicao.repository import GerenciadorBD, IDEMPOTENCIA_LIMPEZA_INTERVALO, contador_trocas
+from shared.database import SessionLocal, engine, estatisticasPool, testarConexao
+from shared.metricas import registro, exportarEstado
+from shared.migracoes import MIGRACOES_AUTOMATICAS, aplicarMigracoes
+from shared.perfil_sql import PERFIL_SQL, instalarPerfilador, middlewarePerfilSQL
+
+
+def carregarCatalogo() -> int:
+    """Carrega o catálogo de espécies do arquivo configurado ou da tabela Especie."""
+    try:
+        if CATALOGO_ARQUIVO:
+            return container.catalogo.carregarArquivo(CATALOGO_ARQUIVO)
+        with SessionLocal() as db:
+            return container.catalogo.carregarDoBanco(db)
+    except Exception as e:
+        print(f"Erro ao carregar catálogo de espécies: {e}")
+        return 0
+
+
+def purgarIdempotencia() -> int:
+    """Apaga as chaves de idempotência vencidas."""
+    try:
+        with container.sessoes() as db:
+            return GerenciadorBD(db).purgarIdempotencia()
+    except Exception as e:
+        print(f"Erro: {e}")
+        return 0
+
 
-app = FastAPI()
+async def limparIdempotenciaPeriodicamente(intervalo: float):
+    while True:
+        apagadas = await asyncio.to_thread(purgarIdempotencia)
+        if apagadas:
+            print(f"{apagadas} chaves de idempotência vencidas apagadas.")
+        await asyncio.sleep(intervalo)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await asyncio.to_thread(testarConexao)
+    if MIGRACOES_AUTOMATICAS:
+        try:
+            await asyncio.to_thread(aplicarMigracoes)
+        except Exception as e:
+            print(f"Erro ao aplicar migrações: {e}")
+    # Com o catálogo carregado, nomes e Max ID não dependem mais da PokeAPI
+    especies = await asyncio.to_thread(carregarCatalogo)
+    if especies:
+        print(f"Catálogo de espécies carregado com {especies} entradas.")
+    # Aquece o cache de espécies a partir do snapshot em disco (se configurado)
+    carregados = container.cache_especies.carregar()
+    if carregados:
+        print(f"Cache de espécies aquecido com {carregados} entradas.")
+    # Resolve o total de espécies antes da primeira requisição (fallback 1025 se falhar)
+    await asyncio.to_thread(container.api.atualizarMaxID)
+    limpeza = None
+    if IDEMPOTENCIA_LIMPEZA_INTERVALO > 0:
+        limpeza = asyncio.create_task(limparIdempotenciaPeriodicamente(IDEMPOTENCIA_LIMPEZA_INTERVALO))
+    yield
+    if limpeza is not None:
+        limpeza.cancel()
+    container.cache_especies.salvar()
+    await container.api_async.fechar()
+    engine.dispose()
+
+app = FastAPI(lifespan=lifespan)
+
+# Depuração: statements SQL por requisição (cabeçalho X-SQL-Queries), para achar N+1
+if PERFIL_SQL:
+    instalarPerfilador(engine)
+    app.middleware("http")(middlewarePerfilSQL)
 
 # Rota principal (GET)
 @app.get("/")
 def home():
     return {"mensagem": "Olá! Minha API está viva."}
 
-app.include_router(distribuicao_router, prefix="/api", tags=["Distribuição"])
\ No newline at end of file
+# Estatísticas do pool de conexões do banco
+@app.get("/status/banco")
+def status_banco():
+    return estatisticasPool()
+
+# Métricas no formato texto do Prometheus: durações e erros por operação + estado dos componentes
+@app.get("/metrics", response_class=PlainTextResponse)
+def metricas():
+    return (
+        registro.exportar()
+        + exportarEstado("distribuicao_disjuntor", "Disjuntor da PokeAPI", container.disjuntor.metricas())
+        + exportarEstado("distribuicao_cache_especies", "Cache de nomes de espécies", container.cache_especies.metricas())
+        + exportarEstado("distribuicao_cache_negativo", "IDs da pokédex inválidos (404) em cache", container.cache_negativo.metricas())
+        + exportarEstado("distribuicao_voo_unico", "Buscas de espécie na PokeAPI (coalescidas = chamadas economizadas)", container.api.voo_unico.metricas())
+        + exportarEstado("distribuicao_voo_unico_async", "Buscas assíncronas de espécie na PokeAPI", container.api_async.voo_unico.metricas())
+        + exportarEstado("distribuicao_max_id", "Cache do total de espécies", container.api.max_id.metricas())
+        + exportarEstado("distribuicao_cache_times", "Cache de times por jogador", container.cache_times.metricas())
+        + exportarEstado("distribuicao_pool_bd", "Pool de conexões do banco", estatisticasPool())
+        + exportarEstado("distribuicao_trocas", "Trocas entre jogadores", contador_trocas.metricas())
+    )
+
+app.include_router(distribuicao_router, prefix="/api", tags=["Distribuição"])
@@ -0,0 +1,9 @@
+-- Alinha o banco ao models.py: o ID do jogador é texto (String(20)) e o
+-- idPokemon é o número da pokédex, informado pela aplicação (sem AUTO_INCREMENT).
+-- As chaves estrangeiras ficam desligadas só nesta conexão, enquanto os dois
+-- lados de UsuarioPokemon.idUsuario -> Usuario.idUsuario mudam de tipo.
+SET FOREIGN_KEY_CHECKS = 0;
+ALTER TABLE Usuario MODIFY idUsuario VARCHAR(20) NOT NULL;
+ALTER TABLE UsuarioPokemon MODIFY idUsuario VARCHAR(20) NOT NULL;
+ALTER TABLE Pokemon MODIFY idPokemon INT NOT NULL;
+SET FOREIGN_KEY_CHECKS = 1;
@@ -0,0 +1,6 @@
+-- Listagem do time, verificação de posse e travas da troca filtram por
+-- (idUsuario, idPokemon): a PK clusterizada de UsuarioPokemon já cobre essas consultas.
+-- A busca inversa ("quem possui o Pokémon X") só tinha o índice implícito da FK
+-- em idPokemon; este índice a cobre por inteiro e passa a sustentar a FK
+-- (o MySQL descarta sozinho o índice implícito).
+CREATE INDEX ix_UsuarioPokemon_idPokemon_idUsuario ON UsuarioPokemon (idPokemon, idUsuario);
@@ -0,0 +1,8 @@
+-- Catálogo local de espécies (importado da PokeAPI uma única vez).
+-- Bancos criados pelo banco-de-dados.sql original não têm esta tabela.
+CREATE TABLE IF NOT EXISTS Especie (
+    idEspecie INT PRIMARY KEY,
+    nomeEspecie VARCHAR(50) NOT NULL,
+    tipos VARCHAR(50) NULL,
+    raridade INT NULL
+);
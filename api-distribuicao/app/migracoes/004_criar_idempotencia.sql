@@ -0,0 +1,8 @@
+-- Respostas de operações já aplicadas (cabeçalho Idempotency-Key).
+-- criadoEm é gravado pela aplicação, em UTC.
+CREATE TABLE IF NOT EXISTS Idempotencia (
+    chave VARCHAR(64) PRIMARY KEY,
+    idUsuario VARCHAR(20) NOT NULL,
+    resposta TEXT NOT NULL,
+    criadoEm DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,3 @@
+-- As chaves de idempotência vencem (IDEMPOTENCIA_TTL): a limpeza periódica
+-- apaga por criadoEm, sem varrer a tabela.
+CREATE INDEX ix_Idempotencia_criadoEm ON Idempotencia (criadoEm);
@@ -24,8 +24,8 @@ def UsuarioToOrmAdapter(usuario: Jogador) -> UsuarioORM:
 
 
 def OrmToUsuarioAdapter(usuario_orm: UsuarioORM) -> Jogador:
-    """"""
+    """Converte um Jogador ORM (com os vínculos já carregados) em um Jogador padrão."""
     return Jogador(
         id=usuario_orm.idUsuario,
-        pokemons=usuario_orm.pokemons_colecao
+        pokemons=[OrmTopokemonAdapter(vinculo.pokemon_carta) for vinculo in usuario_orm.pokemons_colecao]
     )
\ No newline at end of file
@@ -0,0 +1,373 @@
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+
+class CacheEspecies:
+    """Cache em memória (LRU com TTL opcional) de número da pokédex -> nome da espécie."""
+
+    def __init__(self, capacidade: int = 2048, ttl: float | None = None, arquivo: str | None = None, relogio=time.monotonic):
+        self.capacidade = capacidade
+        self.ttl = ttl
+        self.arquivo = arquivo
+        self.__relogio = relogio
+        self.__entradas = OrderedDict()  # numero_pokedex -> (nome, instante de gravação)
+        self.__lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def obter(self, numero_pokedex: int) -> str | None:
+        """Retorna o nome em cache ou None se não houver entrada válida."""
+        with self.__lock:
+            entrada = self.__entradas.get(numero_pokedex)
+            if entrada is None:
+                self.misses += 1
+                return None
+
+            nome, gravado_em = entrada
+            if self.ttl is not None and self.__relogio() - gravado_em > self.ttl:
+                del self.__entradas[numero_pokedex]
+                self.misses += 1
+                return None
+
+            self.__entradas.move_to_end(numero_pokedex)
+            self.hits += 1
+            return nome
+
+    def definir(self, numero_pokedex: int, nome: str):
+        """Grava uma entrada, removendo a menos usada se a capacidade estourar."""
+        with self.__lock:
+            self.__entradas[numero_pokedex] = (nome, self.__relogio())
+            self.__entradas.move_to_end(numero_pokedex)
+            while len(self.__entradas) > self.capacidade:
+                self.__entradas.popitem(last=False)
+                self.evictions += 1
+
+    def limpar(self):
+        with self.__lock:
+            self.__entradas.clear()
+
+    def __len__(self):
+        return len(self.__entradas)
+
+    def salvar(self) -> bool:
+        """Grava um snapshot do cache em disco (JSON compacto)."""
+        if not self.arquivo:
+            return False
+
+        with self.__lock:
+            snapshot = {str(numero): nome for numero, (nome, _) in self.__entradas.items()}
+
+        try:
+            temporario = f"{self.arquivo}.tmp"
+            with open(temporario, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, separators=(",", ":"))
+            os.replace(temporario, self.arquivo)
+            return True
+        except OSError as e:
+            print(f"Erro ao salvar snapshot do cache: {e}")
+            return False
+
+    def carregar(self) -> int:
+        """Aquece o cache a partir do snapshot em disco. Retorna quantas entradas foram lidas."""
+        if not self.arquivo or not os.path.exists(self.arquivo):
+            return 0
+
+        try:
+            with open(self.arquivo, encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Erro ao carregar snapshot do cache: {e}")
+            return 0
+
+        for numero, nome in snapshot.items():
+            self.definir(int(numero), nome)
+        return len(snapshot)
+
+    def metricas(self) -> dict:
+        consultas = self.hits + self.misses
+        return {
+            "tamanho": len(self.__entradas),
+            "capacidade": self.capacidade,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / consultas if consultas else 0.0,
+        }
+
+
+class CacheNegativo:
+    """IDs da pokédex que a PokeAPI respondeu com 404, lembrados por `ttl` segundos.
+
+    Evita refazer a chamada para IDs sabidamente inválidos (formas, lacunas) e
+    alimenta o MotorSorteio, que deixa de sorteá-los.
+    """
+
+    def __init__(self, capacidade: int = 4096, ttl: float = 3600, relogio=time.monotonic):
+        self.capacidade = capacidade
+        self.ttl = ttl
+        self.__relogio = relogio
+        self.__entradas = OrderedDict()  # numero_pokedex -> instante em que expira
+        self.__lock = threading.Lock()
+
+        self.hits = 0
+        self.marcacoes = 0
+
+    def marcar(self, numero_pokedex: int):
+        with self.__lock:
+            self.__entradas[numero_pokedex] = self.__relogio() + self.ttl
+            self.__entradas.move_to_end(numero_pokedex)
+            while len(self.__entradas) > self.capacidade:
+                self.__entradas.popitem(last=False)
+            self.marcacoes += 1
+
+    def contem(self, numero_pokedex: int) -> bool:
+        with self.__lock:
+            expira_em = self.__entradas.get(numero_pokedex)
+            if expira_em is None:
+                return False
+            if self.__relogio() >= expira_em:
+                del self.__entradas[numero_pokedex]
+                return False
+            self.hits += 1
+            return True
+
+    def ids(self) -> list[int]:
+        """IDs inválidos ainda dentro do TTL (os expirados são descartados)."""
+        agora = self.__relogio()
+        with self.__lock:
+            # As entradas estão em ordem de marcação, logo de expiração: os expirados ficam no início
+            while self.__entradas:
+                numero, expira_em = next(iter(self.__entradas.items()))
+                if expira_em > agora:
+                    break
+                del self.__entradas[numero]
+            return list(self.__entradas)
+
+    def limpar(self):
+        with self.__lock:
+            self.__entradas.clear()
+
+    def __len__(self):
+        return len(self.__entradas)
+
+    def metricas(self) -> dict:
+        return {
+            "tamanho": len(self.__entradas),
+            "capacidade": self.capacidade,
+            "hits": self.hits,
+            "marcacoes": self.marcacoes,
+        }
+
+
+class CacheMaxID:
+    """Memoiza o total de espécies da PokeAPI e o atualiza em segundo plano.
+
+    `obter()` nunca bloqueia: devolve o último valor conhecido (ou o padrão,
+    se ainda não houver nenhum) e, se estiver vencido, dispara a atualização
+    em uma thread.
+    """
+
+    def __init__(self, buscar, intervalo: float = 86400, padrao: int = 1025, intervalo_falha: float = 60, relogio=time.monotonic):
+        self.__buscar = buscar  # função sem argumentos que retorna o total ou None
+        self.intervalo = intervalo
+        self.intervalo_falha = min(intervalo_falha, intervalo)
+        self.padrao = padrao
+        self.__relogio = relogio
+        self.__lock = threading.Lock()
+        self.__expira_em = None
+        self.__atualizando = False
+
+        self.valor = None
+        self.thread = None
+        self.atualizacoes = 0
+        self.falhas = 0
+
+    def obter(self) -> int:
+        with self.__lock:
+            vencido = self.__expira_em is None or self.__relogio() >= self.__expira_em
+            disparar = vencido and not self.__atualizando
+            if disparar:
+                self.__atualizando = True
+
+        if disparar:
+            self.thread = threading.Thread(target=self.__atualizarEmSegundoPlano, daemon=True)
+            self.thread.start()
+
+        valor = self.valor
+        return valor if valor is not None else self.padrao
+
+    def atualizar(self) -> int:
+        """Busca o valor agora (bloqueante). Usado no aquecimento e pela thread de atualização."""
+        try:
+            novo_valor = self.__buscar()
+        except Exception as e:
+            print(f"Erro ao atualizar Max ID: {e}")
+            novo_valor = None
+
+        with self.__lock:
+            if novo_valor is not None:
+                self.valor = novo_valor
+                self.atualizacoes += 1
+                self.__expira_em = self.__relogio() + self.intervalo
+            else:
+                # Mantém o último valor conhecido e tenta de novo mais cedo
+                self.falhas += 1
+                self.__expira_em = self.__relogio() + self.intervalo_falha
+        return self.valor if self.valor is not None else self.padrao
+
+    def __atualizarEmSegundoPlano(self):
+        try:
+            self.atualizar()
+        finally:
+            with self.__lock:
+                self.__atualizando = False
+
+    def metricas(self) -> dict:
+        return {
+            "valor": self.valor,
+            "atualizacoes": self.atualizacoes,
+            "falhas": self.falhas,
+        }
+
+
+class IBackendCache(ABC):
+    """Interface base para backends de cache chave -> valor (memória local, cache compartilhado, ...)"""
+
+    @abstractmethod
+    def obter(self, chave: str):
+        """Retorna o valor ou None se não houver entrada válida"""
+        pass
+
+    @abstractmethod
+    def definir(self, chave: str, valor):
+        """Grava uma entrada"""
+        pass
+
+    @abstractmethod
+    def remover(self, chave: str):
+        """Remove uma entrada, se existir"""
+        pass
+
+
+class BackendMemoriaLRU(IBackendCache):
+    """Backend em memória do processo, com remoção LRU e TTL opcional."""
+
+    def __init__(self, capacidade: int = 10000, ttl: float | None = None, relogio=time.monotonic):
+        self.capacidade = capacidade
+        self.ttl = ttl
+        self.__relogio = relogio
+        self.__entradas = OrderedDict()  # chave -> (valor, instante de gravação)
+        self.__lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def obter(self, chave: str):
+        with self.__lock:
+            entrada = self.__entradas.get(chave)
+            if entrada is None:
+                self.misses += 1
+                return None
+
+            valor, gravado_em = entrada
+            if self.ttl is not None and self.__relogio() - gravado_em > self.ttl:
+                del self.__entradas[chave]
+                self.misses += 1
+                return None
+
+            self.__entradas.move_to_end(chave)
+            self.hits += 1
+            return valor
+
+    def definir(self, chave: str, valor):
+        with self.__lock:
+            self.__entradas[chave] = (valor, self.__relogio())
+            self.__entradas.move_to_end(chave)
+            while len(self.__entradas) > self.capacidade:
+                self.__entradas.popitem(last=False)
+                self.evictions += 1
+
+    def remover(self, chave: str):
+        with self.__lock:
+            self.__entradas.pop(chave, None)
+
+    def __len__(self):
+        return len(self.__entradas)
+
+    def metricas(self) -> dict:
+        return {
+            "tamanho": len(self.__entradas),
+            "capacidade": self.capacidade,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class CacheTimes:
+    """Cache de leitura dos times por jogador, invalidado a cada escrita no time.
+
+    Cada jogador tem uma geração, trocada a cada invalidação. A leitura guarda a
+    geração antes de ir ao banco e só grava no cache se ela não mudou: assim uma
+    escrita concorrente não é sobrescrita pelo time antigo. Com o backend em
+    memória, a invalidação só vale para o próprio processo; outros workers
+    servem o time antigo até o TTL vencer.
+    """
+
+    def __init__(self, backend: IBackendCache, capacidade_geracoes: int = 100000):
+        self.backend = backend
+        self.capacidade_geracoes = capacidade_geracoes
+        self.__geracoes = OrderedDict()  # id do jogador -> geração da última invalidação
+        self.__contador = 0
+        self.__piso = 0  # geração dos jogadores sem invalidação registrada
+        self.__lock = threading.Lock()
+        self.invalidacoes = 0
+        self.descartadas = 0
+
+    @staticmethod
+    def __chave(id_jogador: str) -> str:
+        return f"time:{id_jogador}"
+
+    def obter(self, id_jogador: str) -> list[dict] | None:
+        time_em_cache = self.backend.obter(self.__chave(id_jogador))
+        # Devolve uma cópia para que o chamador não altere a entrada guardada
+        return list(time_em_cache) if time_em_cache is not None else None
+
+    def geracao(self, id_jogador: str) -> int:
+        """Geração atual do time; passe-a para `definir` depois de ler o banco."""
+        with self.__lock:
+            return self.__geracoes.get(id_jogador, self.__piso)
+
+    def definir(self, id_jogador: str, time_formatado: list[dict], geracao: int | None = None):
+        """Grava o time. Com `geracao`, não grava se o time foi invalidado depois dela."""
+        with self.__lock:
+            if geracao is not None and self.__geracoes.get(id_jogador, self.__piso) != geracao:
+                self.descartadas += 1
+                return
+            self.backend.definir(self.__chave(id_jogador), tuple(time_formatado))
+
+    def invalidar(self, id_jogador: str):
+        with self.__lock:
+            self.invalidacoes += 1
+            self.__contador += 1
+            self.__geracoes[id_jogador] = self.__contador
+            self.__geracoes.move_to_end(id_jogador)
+            if len(self.__geracoes) > self.capacidade_geracoes:
+                self.__geracoes.popitem(last=False)
+                # Os esquecidos passam a uma geração nova: leituras antigas deles não gravam
+                self.__contador += 1
+                self.__piso = self.__contador
+            self.backend.remover(self.__chave(id_jogador))
+
+    def metricas(self) -> dict:
+        metricas = {"invalidacoes": self.invalidacoes, "descartadas": self.descartadas}
+        if hasattr(self.backend, "metricas"):
+            metricas.update(self.backend.metricas())
+        return metricas
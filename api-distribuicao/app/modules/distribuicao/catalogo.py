@@ -0,0 +1,122 @@
+"""Catálogo local de espécies: tira a PokeAPI do caminho quente.
+
+Importação (offline, uma única operação em lote):
+    python -m modules.distribuicao.catalogo                      # baixa da PokeAPI
+    python -m modules.distribuicao.catalogo --arquivo lista.json # usa um JSON no formato da PokeAPI
+    python -m modules.distribuicao.catalogo --exportar catalogo.json
+"""
+import argparse
+import json
+import os
+import random
+import re
+
+from sqlalchemy.orm import Session
+
+from modules.distribuicao.models import Pokemon, EspecieORM
+from modules.distribuicao.repository import EspecieRepository
+
+CATALOGO_ARQUIVO = os.environ.get("CATALOGO_ARQUIVO") or None
+
+ID_NA_URL = re.compile(r"/(\d+)/?$")
+
+
+class CatalogoEspecies:
+    """Catálogo id -> nome em memória, somente leitura depois de carregado."""
+
+    def __init__(self, especies: dict[int, str] = None):
+        self.__especies = dict(especies or {})
+        self.__ids = sorted(self.__especies)
+
+    def carregar(self, especies: dict[int, str]):
+        # Troca o dicionário inteiro de uma vez: leitores concorrentes nunca veem meio catálogo
+        novo = dict(especies)
+        self.__ids = sorted(novo)
+        self.__especies = novo
+
+    def carregarDoBanco(self, db: Session) -> int:
+        self.carregar(EspecieRepository(db).listarNomes())
+        return len(self)
+
+    def carregarArquivo(self, caminho: str) -> int:
+        """Carrega um catálogo compacto no formato {"1": "bulbasaur", ...}."""
+        with open(caminho, encoding="utf-8") as f:
+            self.carregar({int(id_especie): nome for id_especie, nome in json.load(f).items()})
+        return len(self)
+
+    def salvarArquivo(self, caminho: str):
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump({str(i): n for i, n in self.__especies.items()}, f, separators=(",", ":"))
+
+    def nome(self, numero_pokedex: int) -> str | None:
+        return self.__especies.get(numero_pokedex)
+
+    def pokemon(self, numero_pokedex: int, shiny: bool = False) -> Pokemon | None:
+        nome = self.__especies.get(numero_pokedex)
+        if nome is None:
+            return None
+        return Pokemon(numero_pokedex=numero_pokedex, nome=nome, shiny=shiny)
+
+    def ids(self) -> list[int]:
+        return self.__ids
+
+    def maxID(self) -> int | None:
+        return self.__ids[-1] if self.__ids else None
+
+    def sortear(self) -> int:
+        return random.choice(self.__ids)
+
+    def __len__(self):
+        return len(self.__especies)
+
+    def __contains__(self, numero_pokedex: int):
+        return numero_pokedex in self.__especies
+
+
+def especiesDaListagem(dados_json: dict) -> dict[int, str]:
+    """Converte a listagem paginada da PokeAPI (/pokemon?limit=N) em id -> nome."""
+    especies = {}
+    for item in dados_json.get("results", []):
+        encontrado = ID_NA_URL.search(item.get("url", ""))
+        if encontrado:
+            especies[int(encontrado.group(1))] = item["name"]
+    return especies
+
+
+def baixarListagem(api) -> dict:
+    """Busca a listagem de todas as espécies em uma única chamada à PokeAPI."""
+    limite = api.atualizarMaxID()
+    response = api._get(f"{api.api_url}pokemon/?limit={limite}&offset=0")
+    if response.status_code != 200:
+        raise ValueError(f"Erro ao baixar catálogo. Status: {response.status_code}")
+    return response.json()
+
+
+def importarCatalogo(db: Session, dados_json: dict) -> int:
+    """Grava no banco, em lote, o catálogo vindo da listagem da PokeAPI."""
+    EspecieORM.__table__.create(db.get_bind(), checkfirst=True)
+    return EspecieRepository(db).createEmLote(especiesDaListagem(dados_json))
+
+
+if __name__ == "__main__":
+    from modules.distribuicao.external import GestorAPI
+    from shared.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Importa o catálogo de espécies para o banco")
+    parser.add_argument("--arquivo", help="JSON no formato de /pokemon?limit=N da PokeAPI (padrão: baixa da API)")
+    parser.add_argument("--exportar", help="também grava um catálogo compacto {id: nome} neste arquivo")
+    args = parser.parse_args()
+
+    if args.arquivo:
+        with open(args.arquivo, encoding="utf-8") as f:
+            listagem = json.load(f)
+    else:
+        listagem = baixarListagem(GestorAPI())
+
+    with SessionLocal() as db:
+        total = importarCatalogo(db, listagem)
+    print(f"{total} espécies importadas.")
+
+    if args.exportar:
+        CatalogoEspecies(especiesDaListagem(listagem)).salvarArquivo(args.exportar)
+        print(f"Catálogo compacto gravado em {args.exportar}.")
@@ -0,0 +1,81 @@
+import os
+
+from fastapi import Depends
+from sqlalchemy.orm import Session
+
+from modules.distribuicao.cache import CacheEspecies, CacheNegativo, CacheTimes, IBackendCache, BackendMemoriaLRU
+from modules.distribuicao.catalogo import CatalogoEspecies
+from modules.distribuicao.external import (
+    GestorAPI, GestorAPIAsync, DisjuntorAPI,
+    CACHE_CAPACIDADE, CACHE_TTL, CACHE_ARQUIVO, CACHE_NEGATIVO_CAPACIDADE, CACHE_NEGATIVO_TTL,
+    DISJUNTOR_LIMITE_FALHAS, DISJUNTOR_TEMPO_REABERTURA,
+)
+from modules.distribuicao.repository import GerenciadorBD
+from modules.distribuicao.service import GestorCartas
+from modules.distribuicao.sorteio import MotorSorteio, SORTEIO_SEMENTE, SORTEIO_PESOS_ARQUIVO
+from shared.database import SessionLocal, get_db
+
+TIMES_CACHE_CAPACIDADE = int(os.environ.get("TIMES_CACHE_CAPACIDADE", "10000"))
+# Curto de propósito: o cache em memória não é invalidado pelas escritas feitas em outros workers
+TIMES_CACHE_TTL = float(os.environ["TIMES_CACHE_TTL"]) if os.environ.get("TIMES_CACHE_TTL") else 30.0
+
+class Container:
+    """Container de dependências do módulo de distribuição.
+
+    Guarda uma única instância, por processo, das peças sem estado de requisição
+    e seguras entre threads (pool HTTP, caches, disjuntor). Cada requisição
+    recebe o seu próprio GerenciadorBD, com a sua própria sessão do banco.
+
+    O backend do cache de times pode ser trocado (ex.: por um cache
+    compartilhado entre workers) passando `backend_times`.
+    """
+
+    def __init__(self, api_url: str = "https://pokeapi.co/api/v2/", backend_times: IBackendCache = None, sessoes=SessionLocal):
+        # Fábrica de sessões para trabalhos que sobrevivem à requisição (ex.: respostas em streaming)
+        self.sessoes = sessoes
+        self.cache_especies = CacheEspecies(capacidade=CACHE_CAPACIDADE, ttl=CACHE_TTL, arquivo=CACHE_ARQUIVO)
+        # IDs que deram 404, compartilhados pelos dois clientes e pelo sorteio
+        self.cache_negativo = CacheNegativo(capacidade=CACHE_NEGATIVO_CAPACIDADE, ttl=CACHE_NEGATIVO_TTL)
+        # Vazio até o startup carregar a tabela Especie; enquanto vazio, a PokeAPI é usada
+        self.catalogo = CatalogoEspecies()
+        self.disjuntor = DisjuntorAPI(limite_falhas=DISJUNTOR_LIMITE_FALHAS, tempo_reabertura=DISJUNTOR_TEMPO_REABERTURA)
+        self.api = GestorAPI(
+            api_url=api_url, cache=self.cache_especies, disjuntor=self.disjuntor,
+            catalogo=self.catalogo, cache_negativo=self.cache_negativo
+        )
+        self.api_async = GestorAPIAsync(
+            api_url=api_url, cache=self.cache_especies, disjuntor=self.disjuntor,
+            max_id=self.api.max_id, catalogo=self.catalogo, cache_negativo=self.cache_negativo
+        )
+        self.cache_times = CacheTimes(
+            backend_times if backend_times is not None
+            else BackendMemoriaLRU(capacidade=TIMES_CACHE_CAPACIDADE, ttl=TIMES_CACHE_TTL)
+        )
+        # Um único gerador por processo: com semente fixa, a sequência de sorteios é reproduzível
+        self.sorteio = MotorSorteio(semente=SORTEIO_SEMENTE, invalidos=self.cache_negativo)
+        if SORTEIO_PESOS_ARQUIVO:
+            self.sorteio.carregarPesos(SORTEIO_PESOS_ARQUIVO)
+
+    def gestorCartas(self, db: Session) -> GestorCartas:
+        """Monta um GestorCartas para uma requisição, sobre a sessão recebida."""
+        return GestorCartas(self.api, GerenciadorBD(db), self.api_async, self.cache_times, self.sorteio)
+
+
+container = Container()
+
+
+def obterContainer() -> Container:
+    return container
+
+
+def obterGestorCartas(db: Session = Depends(get_db), c: Container = Depends(obterContainer)) -> GestorCartas:
+    """Dependência do FastAPI: GestorCartas da requisição atual."""
+    return c.gestorCartas(db)
+
+
+def obterGestorAPI(c: Container = Depends(obterContainer)) -> GestorAPI:
+    return c.api
+
+
+def obterGestorAPIAsync(c: Container = Depends(obterContainer)) -> GestorAPIAsync:
+    return c.api_async
@@ -1,87 +1,534 @@
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from modules.distribuicao.models import Pokemon
+from modules.distribuicao.cache import CacheEspecies, CacheMaxID, CacheNegativo
+from shared.metricas import instrumentar
 
+CACHE_CAPACIDADE = int(os.environ.get("POKEDEX_CACHE_CAPACIDADE", "2048"))
+CACHE_TTL = float(os.environ["POKEDEX_CACHE_TTL"]) if os.environ.get("POKEDEX_CACHE_TTL") else None
+CACHE_ARQUIVO = os.environ.get("POKEDEX_CACHE_ARQUIVO") or None
+# IDs que deram 404: lembrados por menos tempo que os nomes, caso a PokeAPI ganhe espécies novas
+CACHE_NEGATIVO_CAPACIDADE = int(os.environ.get("POKEDEX_CACHE_NEGATIVO_CAPACIDADE", "4096"))
+CACHE_NEGATIVO_TTL = float(os.environ.get("POKEDEX_CACHE_NEGATIVO_TTL", "3600"))
+MAX_ID_INTERVALO = float(os.environ.get("POKEAPI_MAX_ID_INTERVALO", "86400"))
+MAX_ID_PADRAO = 1025 # Fallback para Gen 9
+
+DISJUNTOR_LIMITE_FALHAS = int(os.environ.get("POKEAPI_DISJUNTOR_LIMITE", "5"))
+DISJUNTOR_TEMPO_REABERTURA = float(os.environ.get("POKEAPI_DISJUNTOR_REABERTURA", "30"))
+
+HTTP_POOL_TAMANHO = int(os.environ.get("POKEAPI_POOL_TAMANHO", "10"))
+HTTP_TIMEOUT_CONEXAO = float(os.environ.get("POKEAPI_TIMEOUT_CONEXAO", "3.05"))
+HTTP_TIMEOUT_LEITURA = float(os.environ.get("POKEAPI_TIMEOUT_LEITURA", "5"))
+HTTP_TENTATIVAS = int(os.environ.get("POKEAPI_TENTATIVAS", "2"))
+HTTP_BACKOFF = float(os.environ.get("POKEAPI_BACKOFF", "0.2"))
+HTTP_BACKOFF_JITTER = float(os.environ.get("POKEAPI_BACKOFF_JITTER", "0.1"))
+HTTP_STATUS_RETENTATIVA = (500, 502, 503, 504)
+
+def criarSessaoHTTP(pool_tamanho: int = 10, tentativas: int = 2, backoff: float = 0.2, jitter: float = 0.1) -> requests.Session:
+    """Cria uma sessão HTTP com pool de conexões keep-alive e retentativas com backoff exponencial."""
+    retry = Retry(
+        total=tentativas,
+        connect=tentativas,
+        read=tentativas,
+        status=tentativas,
+        backoff_factor=backoff,
+        backoff_jitter=jitter,
+        status_forcelist=HTTP_STATUS_RETENTATIVA,
+        allowed_methods=frozenset({"GET"}),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_tamanho, pool_maxsize=pool_tamanho, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def _extrairNome(dados_json: dict) -> str | None:
+    """Extrai o nome do primeiro form da resposta de /pokemon/{id}/."""
+    lista_forms = dados_json.get("forms", [])
+    if lista_forms:
+        return lista_forms[0]["name"]
+    return None
+
+def _pokemonLocal(catalogo, cache: CacheEspecies, numero_pokedex: int, shiny: bool) -> Pokemon | None:
+    """Pokemon pelo catálogo local ou pelo cache de nomes; None se nenhum dos dois conhece o número."""
+    nome = catalogo.nome(numero_pokedex) if catalogo else None
+    if nome is None:
+        nome = cache.obter(numero_pokedex)
+    if nome is None:
+        return None
+    return Pokemon(numero_pokedex=numero_pokedex, nome=nome, shiny=shiny)
+
+class CircuitoAbertoError(Exception):
+    """Chamada rejeitada porque o circuito da PokeAPI está aberto."""
+
+class VooUnico:
+    """Single-flight entre threads: chamadas simultâneas com a mesma chave dividem uma única execução.
+
+    A primeira thread executa; as que chegam enquanto ela não termina esperam e
+    recebem o mesmo resultado (ou a mesma exceção).
+    """
+
+    class _Chamada:
+        __slots__ = ("pronta", "resultado", "erro")
+
+        def __init__(self):
+            self.pronta = threading.Event()
+            self.resultado = None
+            self.erro = None
+
+    def __init__(self):
+        self.__em_andamento: dict = {}
+        self.__lock = threading.Lock()
+        self.execucoes = 0
+        self.coalescidas = 0
+
+    def executar(self, chave, funcao):
+        with self.__lock:
+            chamada = self.__em_andamento.get(chave)
+            lider = chamada is None
+            if lider:
+                chamada = self.__em_andamento[chave] = self._Chamada()
+                self.execucoes += 1
+            else:
+                self.coalescidas += 1
+
+        if not lider:
+            chamada.pronta.wait()
+            if chamada.erro is not None:
+                raise chamada.erro
+            return chamada.resultado
+
+        try:
+            chamada.resultado = funcao()
+            return chamada.resultado
+        except BaseException as e:
+            chamada.erro = e
+            raise
+        finally:
+            with self.__lock:
+                del self.__em_andamento[chave]
+            chamada.pronta.set()
+
+    def metricas(self) -> dict:
+        return {"em_andamento": len(self.__em_andamento), "execucoes": self.execucoes, "coalescidas": self.coalescidas}
+
+class _LiderCancelado(Exception):
+    """Sinal interno do VooUnicoAsync: quem fazia a busca foi cancelado, quem esperava tenta de novo."""
+
+class VooUnicoAsync:
+    """Single-flight entre corrotinas do mesmo event loop (mesma ideia do VooUnico).
+
+    Se a corrotina que executa for cancelada (ex.: o cliente dela desconectou),
+    as que esperavam não são canceladas junto: uma delas refaz a busca.
+    """
+
+    def __init__(self):
+        self.__em_andamento: dict = {}
+        self.execucoes = 0
+        self.coalescidas = 0
+
+    async def executar(self, chave, funcao):
+        """`funcao` é chamada sem argumentos e devolve a corrotina a executar."""
+        loop = asyncio.get_running_loop()
+        # A chave inclui o loop: um Future não pode ser aguardado em outro event loop
+        chave = (id(loop), chave)
+        while True:
+            futuro = self.__em_andamento.get(chave)
+            if futuro is None:
+                break
+            self.coalescidas += 1
+            try:
+                # shield: o cancelamento de quem espera não cancela a busca dos demais
+                return await asyncio.shield(futuro)
+            except _LiderCancelado:
+                continue
+
+        futuro = self.__em_andamento[chave] = loop.create_future()
+        self.execucoes += 1
+        try:
+            resultado = await funcao()
+        except BaseException as e:
+            futuro.set_exception(_LiderCancelado() if isinstance(e, asyncio.CancelledError) else e)
+            futuro.exception()  # marca como lida: sem aviso quando ninguém mais esperava
+            raise
+        else:
+            futuro.set_result(resultado)
+            return resultado
+        finally:
+            del self.__em_andamento[chave]
+
+    def metricas(self) -> dict:
+        return {"em_andamento": len(self.__em_andamento), "execucoes": self.execucoes, "coalescidas": self.coalescidas}
+
+class DisjuntorAPI:
+    """Circuit breaker das chamadas à PokeAPI.
+
+    Abre após `limite_falhas` falhas consecutivas e rejeita chamadas até passar
+    `tempo_reabertura`; então libera uma única chamada de teste (semiaberto).
+    """
+    FECHADO = "fechado"
+    ABERTO = "aberto"
+    SEMI_ABERTO = "semi_aberto"
+
+    def __init__(self, limite_falhas: int = 5, tempo_reabertura: float = 30.0, relogio=time.monotonic):
+        self.limite_falhas = limite_falhas
+        self.tempo_reabertura = tempo_reabertura
+        self.__relogio = relogio
+        self.__lock = threading.Lock()
+
+        self.estado = self.FECHADO
+        self.falhas_consecutivas = 0
+        self.__aberto_em = 0.0
+        self.__teste_em_andamento = False
+
+        self.chamadas_rejeitadas = 0
+        self.transicoes = {self.FECHADO: 0, self.ABERTO: 0, self.SEMI_ABERTO: 0}
+
+    def __mudarEstado(self, novo_estado: str):
+        if novo_estado != self.estado:
+            print(f"Circuito da PokeAPI: {self.estado} -> {novo_estado}")
+            self.estado = novo_estado
+            self.transicoes[novo_estado] += 1
+
+    def permitirChamada(self) -> bool:
+        with self.__lock:
+            if self.estado == self.ABERTO and self.__relogio() - self.__aberto_em >= self.tempo_reabertura:
+                self.__mudarEstado(self.SEMI_ABERTO)
+                self.__teste_em_andamento = False
+
+            if self.estado == self.FECHADO:
+                return True
+
+            if self.estado == self.SEMI_ABERTO and not self.__teste_em_andamento:
+                self.__teste_em_andamento = True
+                return True
+
+            self.chamadas_rejeitadas += 1
+            return False
+
+    def registrarSucesso(self):
+        with self.__lock:
+            self.falhas_consecutivas = 0
+            self.__teste_em_andamento = False
+            self.__mudarEstado(self.FECHADO)
+
+    def registrarFalha(self):
+        with self.__lock:
+            self.falhas_consecutivas += 1
+            self.__teste_em_andamento = False
+            if self.estado == self.SEMI_ABERTO or self.falhas_consecutivas >= self.limite_falhas:
+                self.__aberto_em = self.__relogio()
+                self.__mudarEstado(self.ABERTO)
+
+    def metricas(self) -> dict:
+        return {
+            "estado": self.estado,
+            "falhas_consecutivas": self.falhas_consecutivas,
+            "chamadas_rejeitadas": self.chamadas_rejeitadas,
+            "transicoes": dict(self.transicoes),
+        }
+
+@instrumentar("gestor_api")
 class GestorAPI:
-    _instance = None
-    def __new__(cls, *args, **kwargs):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance.__init_once(*args, **kwargs)
-        return cls._instance
-
-    def __init_once(self, api_url="https://pokeapi.co/api/v2/"):
+    """Cliente da PokeAPI. Seguro entre threads: o Container mantém uma instância por processo."""
+
+    def __init__(self, api_url="https://pokeapi.co/api/v2/", cache: CacheEspecies = None, disjuntor: DisjuntorAPI = None, session: requests.Session = None, catalogo=None, cache_negativo: CacheNegativo = None):
         self.api_url = api_url
+        # Catálogo local de espécies (CatalogoEspecies): quando carregado, a PokeAPI sai do caminho quente
+        self.catalogo = catalogo
+        # Sessão compartilhada: reaproveita conexões em vez de abrir uma por chamada
+        self.session = session if session is not None else criarSessaoHTTP(
+            pool_tamanho=HTTP_POOL_TAMANHO, tentativas=HTTP_TENTATIVAS,
+            backoff=HTTP_BACKOFF, jitter=HTTP_BACKOFF_JITTER
+        )
+        self.timeout = (HTTP_TIMEOUT_CONEXAO, HTTP_TIMEOUT_LEITURA)
+        # O total de espécies quase nunca muda: fica memoizado para o processo todo
+        self.max_id = CacheMaxID(self._buscarMaxID, intervalo=MAX_ID_INTERVALO, padrao=MAX_ID_PADRAO)
+        # Os nomes das espécies não mudam, então evitamos refazer a chamada HTTP
+        self.cache = cache if cache is not None else CacheEspecies(
+            capacidade=CACHE_CAPACIDADE, ttl=CACHE_TTL, arquivo=CACHE_ARQUIVO
+        )
+        self.disjuntor = disjuntor if disjuntor is not None else DisjuntorAPI(
+            limite_falhas=DISJUNTOR_LIMITE_FALHAS, tempo_reabertura=DISJUNTOR_TEMPO_REABERTURA
+        )
+        self.cache_negativo = cache_negativo if cache_negativo is not None else CacheNegativo(
+            capacidade=CACHE_NEGATIVO_CAPACIDADE, ttl=CACHE_NEGATIVO_TTL
+        )
+        self.voo_unico = VooUnico()
 
     def conexaoAPI(self):
+        """Health check explícito da PokeAPI (não é chamado a cada requisição)."""
         try:
-            response = requests.get(self.api_url, timeout=5)
-            
+            response = self.session.get(self.api_url, timeout=self.timeout)
+
             if response.status_code == 200:
                 print("Conexão realizada.")
                 return True
             else:
                 print(f"Falha ao conectar. Status: {response.status_code}")
                 return False
-                
+
         except requests.exceptions.RequestException as e:
             print(f"Ocorreu um erro de conexão: {e}")
             return False
 
+    def _get(self, url: str):
+        """GET protegido pelo disjuntor. Qualquer exceção e respostas 5xx contam como falha."""
+        if not self.disjuntor.permitirChamada():
+            raise CircuitoAbertoError("Circuito da PokeAPI aberto, chamada rejeitada")
+
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+        except BaseException:
+            # Toda chamada liberada termina em sucesso ou falha: senão a de teste do semiaberto não acaba
+            self.disjuntor.registrarFalha()
+            raise
+
+        if response.status_code >= 500:
+            self.disjuntor.registrarFalha()
+        else:
+            self.disjuntor.registrarSucesso()
+        return response
+
+    def getPokemonLocal(self, numero_pokedex: int, shiny=False) -> Pokemon | None:
+        """Resolve só pelo catálogo e pelo cache em memória; nunca faz chamada HTTP."""
+        return _pokemonLocal(self.catalogo, self.cache, numero_pokedex, shiny)
+
     def getPokemon(self, numero_pokedex: int, shiny=False) -> Pokemon:
-        if not self.conexaoAPI():
-            print("Erro de Conexão com a API")
+        pokemon = self.getPokemonLocal(numero_pokedex, shiny=shiny)
+        if pokemon is not None:
+            return pokemon
+
+        # 404 recente: nem chega a fazer a chamada
+        if self.cache_negativo.contem(numero_pokedex):
+            return None
+
+        # Buscas simultâneas do mesmo número dividem uma única chamada HTTP
+        nome_pokemon = self.voo_unico.executar(numero_pokedex, lambda: self._buscarNome(numero_pokedex))
+        if nome_pokemon is None:
             return None
-             
+        return Pokemon(numero_pokedex=numero_pokedex, nome=nome_pokemon, shiny=shiny)
+
+    def _buscarNome(self, numero_pokedex: int) -> str | None:
+        """Nome da espécie pela PokeAPI (None se não existir ou se a chamada falhar)."""
         url_pokemon = f"{self.api_url}pokemon/{numero_pokedex}/"
         try:
-            response = requests.get(url_pokemon)
-            
+            response = self._get(url_pokemon)
+
             if response.status_code == 200:
-                dados_json = response.json()
-                lista_forms = dados_json.get("forms", [])
+                nome_pokemon = _extrairNome(response.json())
 
-                if lista_forms:
-                    nome_pokemon = lista_forms[0]["name"]
+                if nome_pokemon is not None:
+                    self.cache.definir(numero_pokedex, nome_pokemon)
                 else:
                     nome_pokemon = "Nome Desconhecido"
+                return nome_pokemon
 
-                pokemon = Pokemon(
-                    numero_pokedex=numero_pokedex,
-                    nome=nome_pokemon,
-                    shiny=shiny
-                )
-                return pokemon
-            
             elif response.status_code == 404:
+                self.cache_negativo.marcar(numero_pokedex)
                 print(f"Erro: Pokémon com o número {numero_pokedex} não encontrado.")
                 return None
-            
+
             else:
                 print(f"Erro ao acessar a API. Código de status: {response.status_code}")
                 return None
 
+        except CircuitoAbertoError as e:
+            print(f"Erro de Conexão com a API: {e}")
+            return None
         except requests.exceptions.RequestException as e:
             print(f"Ocorreu um erro de conexão: {e}")
             return None
-        
+
     def getMaxID(self) -> int:
-        if not self.conexaoAPI():
-            print("Erro de Conexão ao tentar buscar Max ID")
-            return 1025 # Fallback para Gen 9
-            
+        """Total de espécies memoizado; nunca bloqueia a requisição."""
+        if self.catalogo:
+            return self.catalogo.maxID()
+        return self.max_id.obter()
+
+    def atualizarMaxID(self) -> int:
+        """Atualiza o total de espécies agora (usado no startup)."""
+        return self.max_id.atualizar()
+
+    def _buscarMaxID(self) -> int | None:
         url = f"{self.api_url}pokemon-species/?limit=1"
-        
+
         try:
-            response = requests.get(url, timeout=5)
-            
+            response = self._get(url)
+
             if response.status_code == 200:
                 dados = response.json()
                 # Retorna o total ou 1025 se a chave não existir
-                return dados.get("count", 1025)
+                return dados.get("count", MAX_ID_PADRAO)
             else:
                 print(f"Erro ao buscar Max ID. Status: {response.status_code}")
-                return 1025 # Fallback para Gen 9
-                
+                return None
+
+        except CircuitoAbertoError as e:
+            print(f"Erro de Conexão ao tentar buscar Max ID: {e}")
+            return None
         except requests.exceptions.RequestException as e:
             print(f"Exceção ao buscar Max ID: {e}")
-            return 1025 # Fallback para Gen 9
\ No newline at end of file
+            return None
+
+@instrumentar("gestor_api_async")
+class GestorAPIAsync:
+    """Variante assíncrona do GestorAPI (httpx), para buscas concorrentes.
+
+    Compartilha o cache de espécies e o disjuntor com o GestorAPI síncrono
+    quando eles são passados na construção.
+    """
+
+    def __init__(self, api_url="https://pokeapi.co/api/v2/", cache: CacheEspecies = None, disjuntor: DisjuntorAPI = None, client: httpx.AsyncClient = None, max_id: CacheMaxID = None, catalogo=None, cache_negativo: CacheNegativo = None):
+        self.api_url = api_url
+        self.catalogo = catalogo
+        # Quando recebido, o Max ID memoizado do GestorAPI é reaproveitado
+        self.max_id = max_id
+        self.cache = cache if cache is not None else CacheEspecies(
+            capacidade=CACHE_CAPACIDADE, ttl=CACHE_TTL, arquivo=CACHE_ARQUIVO
+        )
+        self.disjuntor = disjuntor if disjuntor is not None else DisjuntorAPI(
+            limite_falhas=DISJUNTOR_LIMITE_FALHAS, tempo_reabertura=DISJUNTOR_TEMPO_REABERTURA
+        )
+        self.cache_negativo = cache_negativo if cache_negativo is not None else CacheNegativo(
+            capacidade=CACHE_NEGATIVO_CAPACIDADE, ttl=CACHE_NEGATIVO_TTL
+        )
+        self.voo_unico = VooUnicoAsync()
+        self.tentativas = HTTP_TENTATIVAS
+        # Cliente recebido na construção (ex.: testes) ou um por event loop, criado sob demanda
+        self.client = client
+        self.__clientes = weakref.WeakKeyDictionary()
+
+    def _cliente(self) -> httpx.AsyncClient:
+        if self.client is not None:
+            return self.client
+        # As conexões de um AsyncClient ficam presas ao loop que as abriu: outro loop ganha outro cliente
+        loop = asyncio.get_running_loop()
+        cliente = self.__clientes.get(loop)
+        if cliente is None:
+            cliente = self.__clientes[loop] = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=HTTP_POOL_TAMANHO, max_keepalive_connections=HTTP_POOL_TAMANHO),
+                timeout=httpx.Timeout(HTTP_TIMEOUT_LEITURA, connect=HTTP_TIMEOUT_CONEXAO),
+            )
+        return cliente
+
+    async def fechar(self):
+        """Fecha o cliente do event loop atual (os de loops já encerrados somem com eles)."""
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+        cliente = self.__clientes.pop(asyncio.get_running_loop(), None)
+        if cliente is not None:
+            await cliente.aclose()
+
+    async def _get(self, url: str) -> httpx.Response:
+        """GET protegido pelo disjuntor, com retentativas e backoff exponencial com jitter."""
+        if not self.disjuntor.permitirChamada():
+            raise CircuitoAbertoError("Circuito da PokeAPI aberto, chamada rejeitada")
+
+        try:
+            for tentativa in range(self.tentativas + 1):
+                ultima = tentativa == self.tentativas
+                try:
+                    response = await self._cliente().get(url)
+                except httpx.TransportError:
+                    if ultima:
+                        raise
+                else:
+                    if response.status_code not in HTTP_STATUS_RETENTATIVA or ultima:
+                        break
+                await asyncio.sleep(HTTP_BACKOFF * (2 ** tentativa) + random.uniform(0, HTTP_BACKOFF_JITTER))
+        except BaseException:
+            # Inclusive cancelamento: a chamada de teste do semiaberto precisa terminar em falha
+            self.disjuntor.registrarFalha()
+            raise
+
+        if response.status_code >= 500:
+            self.disjuntor.registrarFalha()
+        else:
+            self.disjuntor.registrarSucesso()
+        return response
+
+    def getPokemonLocal(self, numero_pokedex: int, shiny=False) -> Pokemon | None:
+        """Resolve só pelo catálogo e pelo cache em memória; nunca faz chamada HTTP."""
+        return _pokemonLocal(self.catalogo, self.cache, numero_pokedex, shiny)
+
+    async def getPokemon(self, numero_pokedex: int, shiny=False) -> Pokemon:
+        pokemon = self.getPokemonLocal(numero_pokedex, shiny=shiny)
+        if pokemon is not None:
+            return pokemon
+
+        # 404 recente: nem chega a fazer a chamada
+        if self.cache_negativo.contem(numero_pokedex):
+            return None
+
+        # Buscas simultâneas do mesmo número dividem uma única chamada HTTP
+        nome_pokemon = await self.voo_unico.executar(numero_pokedex, lambda: self._buscarNome(numero_pokedex))
+        if nome_pokemon is None:
+            return None
+        return Pokemon(numero_pokedex=numero_pokedex, nome=nome_pokemon, shiny=shiny)
+
+    async def _buscarNome(self, numero_pokedex: int) -> str | None:
+        """Nome da espécie pela PokeAPI (None se não existir ou se a chamada falhar)."""
+        url_pokemon = f"{self.api_url}pokemon/{numero_pokedex}/"
+        try:
+            response = await self._get(url_pokemon)
+
+            if response.status_code == 200:
+                nome_pokemon = _extrairNome(response.json())
+
+                if nome_pokemon is not None:
+                    self.cache.definir(numero_pokedex, nome_pokemon)
+                else:
+                    nome_pokemon = "Nome Desconhecido"
+                return nome_pokemon
+
+            elif response.status_code == 404:
+                self.cache_negativo.marcar(numero_pokedex)
+                print(f"Erro: Pokémon com o número {numero_pokedex} não encontrado.")
+                return None
+
+            else:
+                print(f"Erro ao acessar a API. Código de status: {response.status_code}")
+                return None
+
+        except CircuitoAbertoError as e:
+            print(f"Erro de Conexão com a API: {e}")
+            return None
+        except httpx.HTTPError as e:
+            print(f"Ocorreu um erro de conexão: {e}")
+            return None
+
+    async def getMaxID(self) -> int:
+        if self.catalogo:
+            return self.catalogo.maxID()
+        if self.max_id is not None:
+            return self.max_id.obter()
+
+        url = f"{self.api_url}pokemon-species/?limit=1"
+
+        try:
+            response = await self._get(url)
+
+            if response.status_code == 200:
+                return response.json().get("count", MAX_ID_PADRAO)
+            else:
+                print(f"Erro ao buscar Max ID. Status: {response.status_code}")
+                return MAX_ID_PADRAO
+
+        except CircuitoAbertoError as e:
+            print(f"Erro de Conexão ao tentar buscar Max ID: {e}")
+            return MAX_ID_PADRAO
+        except httpx.HTTPError as e:
+            print(f"Exceção ao buscar Max ID: {e}")
+            return MAX_ID_PADRAO
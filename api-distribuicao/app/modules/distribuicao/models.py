@@ -1,8 +1,11 @@
 from shared.database import Base
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Index, Text, DateTime, func
 from sqlalchemy.orm import relationship
 
 class Pokemon:
+    # Sem __dict__ por instância: menos memória e acesso mais rápido aos atributos
+    __slots__ = ("numero_pokedex", "nome", "shiny")
+
     def __init__(self, numero_pokedex: int = 0, nome: str = 'missingno', shiny: bool = False):
         self.numero_pokedex = numero_pokedex
         self.nome = nome
@@ -18,6 +21,8 @@ class Pokemon:
         return self.shiny
 
 class Jogador:
+    __slots__ = ("__id", "__pokemons")
+
     def __init__(self, id: str, pokemons: list):
         self.__id = id
         self.__pokemons = pokemons  # lista de objetos Pokemon
@@ -31,7 +36,8 @@ class Jogador:
 class PokemonORM(Base):
     __tablename__ = 'Pokemon'
 
-    idPokemon = Column(Integer, primary_key=True, index=True)
+    # Número da pokédex, vindo da aplicação (a PK já é o índice)
+    idPokemon = Column(Integer, primary_key=True, autoincrement=False)
     nomePokemon = Column(String(25), nullable=False)
     isShiny = Column(Boolean, default=False)
 
@@ -42,7 +48,7 @@ class PokemonORM(Base):
 class UsuarioORM(Base):
     __tablename__ = 'Usuario'
 
-    idUsuario = Column(String(20), primary_key=True, index=True)
+    idUsuario = Column(String(20), primary_key=True)
 
     # Relação com UsuarioPokemon
     pokemons_colecao = relationship("UsuarioPokemonORM", back_populates="usuario")
@@ -50,6 +56,10 @@ class UsuarioORM(Base):
 # Classe table usuario has pokemon do bd
 class UsuarioPokemonORM(Base):
     __tablename__ = 'UsuarioPokemon'
+    # A PK (idUsuario, idPokemon) cobre listagem e posse; este cobre "quem possui o Pokémon X"
+    __table_args__ = (
+        Index("ix_UsuarioPokemon_idPokemon_idUsuario", "idPokemon", "idUsuario"),
+    )
 
     # As chaves primárias
     idUsuario = Column(String(20), ForeignKey('Usuario.idUsuario', ondelete='CASCADE'), primary_key=True)
@@ -57,4 +67,26 @@ class UsuarioPokemonORM(Base):
 
     # Definição dos relacionamentos
     usuario = relationship("UsuarioORM", back_populates="pokemons_colecao")
-    pokemon_carta = relationship("PokemonORM", back_populates="usuarios_cartas")
\ No newline at end of file
+    pokemon_carta = relationship("PokemonORM", back_populates="usuarios_cartas")
+
+# Classe table catálogo de espécies (pré-carregado, consultado no lugar da PokeAPI)
+class EspecieORM(Base):
+    __tablename__ = 'Especie'
+
+    idEspecie = Column(Integer, primary_key=True, autoincrement=False)
+    nomeEspecie = Column(String(50), nullable=False)
+    tipos = Column(String(50), nullable=True)  # ex.: "grass,poison"
+    raridade = Column(Integer, nullable=True)
+
+# Classe table chaves de idempotência (respostas de operações já aplicadas)
+class IdempotenciaORM(Base):
+    __tablename__ = 'Idempotencia'
+    # Limpeza das chaves vencidas (criadoEm < agora - IDEMPOTENCIA_TTL)
+    __table_args__ = (
+        Index("ix_Idempotencia_criadoEm", "criadoEm"),
+    )
+
+    chave = Column(String(64), primary_key=True)
+    idUsuario = Column(String(20), nullable=False)
+    resposta = Column(Text, nullable=False)  # JSON da resposta original
+    criadoEm = Column(DateTime, nullable=False, server_default=func.now())
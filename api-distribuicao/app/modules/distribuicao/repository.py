@@ -1,10 +1,63 @@
+import json
+import os
+import random
+import threading
+import time
 from abc import ABC, abstractmethod
-from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError, NoResultFound
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import case, delete, exists, insert, literal, or_, and_, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.exc import IntegrityError, OperationalError, SQLAlchemyError
 
 from shared.database import SessionLocal
-from modules.distribuicao.models import Jogador, UsuarioORM, UsuarioPokemonORM, PokemonORM, Pokemon
-from modules.distribuicao.adapters import pokemonToOrmAdapter, OrmTopokemonAdapter, UsuarioToOrmAdapter, OrmToUsuarioAdapter
+from shared.metricas import instrumentar
+from modules.distribuicao.models import Jogador, UsuarioORM, UsuarioPokemonORM, PokemonORM, Pokemon, EspecieORM, IdempotenciaORM
+from modules.distribuicao.adapters import OrmTopokemonAdapter, OrmToUsuarioAdapter
+
+# Retentativas de uma troca abortada por deadlock / espera de lock
+TROCA_TENTATIVAS = int(os.environ.get("TROCA_TENTATIVAS", "3"))
+TROCA_BACKOFF = float(os.environ.get("TROCA_BACKOFF", "0.01"))
+
+# Por quanto tempo uma Idempotency-Key devolve a resposta gravada; depois vale como chave nova
+IDEMPOTENCIA_TTL = float(os.environ.get("IDEMPOTENCIA_TTL", "86400"))
+# Intervalo (s) da limpeza das chaves vencidas enquanto a API roda; 0 desliga
+IDEMPOTENCIA_LIMPEZA_INTERVALO = float(os.environ.get("IDEMPOTENCIA_LIMPEZA_INTERVALO", "3600"))
+
+# Códigos do MySQL: 1213 = deadlock, 1205 = tempo de espera por lock esgotado
+ERROS_CONCORRENCIA_MYSQL = (1213, 1205)
+
+def erroDeConcorrencia(e: OperationalError) -> bool:
+    """True se a transação foi abortada por disputa de lock e pode ser repetida."""
+    args = getattr(e.orig, "args", ())
+    if args and args[0] in ERROS_CONCORRENCIA_MYSQL:
+        return True
+    return "database is locked" in str(e.orig)  # equivalente no SQLite
+
+class ContadorTrocas:
+    """Conta trocas concluídas, rejeitadas, retentativas e abortos por disputa de lock."""
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.concluidas = 0
+        self.rejeitadas = 0
+        self.retentativas = 0
+        self.conflitos = 0
+
+    def registrar(self, campo: str):
+        with self.__lock:
+            setattr(self, campo, getattr(self, campo) + 1)
+
+    def metricas(self) -> dict:
+        return {
+            "concluidas": self.concluidas,
+            "rejeitadas": self.rejeitadas,
+            "retentativas": self.retentativas,
+            "conflitos": self.conflitos,
+        }
+
+contador_trocas = ContadorTrocas()
 
 class IRepository(ABC):
     """Interface base para repositórios"""
@@ -30,15 +83,40 @@ class IRepository(ABC):
         pass
 
 
+def insertIgnorandoDuplicados(db: Session, tabela, linhas: list[dict]):
+    """Um único INSERT multi-linha que ignora linhas cuja chave primária já existe."""
+    if not linhas:
+        return
+
+    dialeto = db.get_bind().dialect.name
+    if dialeto == "mysql":
+        stmt = mysql_insert(tabela).values(linhas)
+        chaves = {c.name: stmt.inserted[c.name] for c in tabela.primary_key.columns}
+        stmt = stmt.on_duplicate_key_update(**chaves)
+    elif dialeto == "sqlite":
+        stmt = sqlite_insert(tabela).values(linhas).on_conflict_do_nothing()
+    else:
+        stmt = insert(tabela).values(linhas)
+    db.execute(stmt)
+
+
+@instrumentar("gerenciador_bd")
 class GerenciadorBD:
 
-    def __init__(self):
-        self.conexaoBD()
+    def __init__(self, session: Session = None):
+        # A sessão normalmente vem da dependência get_db, que a fecha ao fim da requisição
+        if session is not None:
+            self.session = session
+        else:
+            self.conexaoBD()
 
     def conexaoBD(self):
         self.session = SessionLocal()
         self.session.rollback()
 
+    def fechar(self):
+        self.session.close()
+
     def createJogador(self, jogador: Jogador):
         usuario_repo = UsuarioRepository(self.session)
         usuario_repo.create(jogador)
@@ -59,6 +137,34 @@ class GerenciadorBD:
         usuario_pokemon_repo = UsuarioPokemonRepository(self.session, pokemon_repo, usuario_repo)
         return usuario_pokemon_repo.listarPokemonsDoUsuario(id_jogador)
 
+    def getLinhasTimeDoJogador(self, id_jogador: str) -> list[tuple[int, str, bool]]:
+        """Time do jogador como tuplas (idPokemon, nome, shiny), para montar a resposta direto."""
+        usuario_repo = UsuarioRepository(self.session)
+        pokemon_repo = PokemonRepository(self.session)
+        usuario_pokemon_repo = UsuarioPokemonRepository(self.session, pokemon_repo, usuario_repo)
+        return usuario_pokemon_repo.listarLinhasDoUsuario(id_jogador)
+
+    def iterarLinhasDoJogador(self, id_jogador: str, tamanho_lote: int = 500):
+        usuario_repo = UsuarioRepository(self.session)
+        pokemon_repo = PokemonRepository(self.session)
+        usuario_pokemon_repo = UsuarioPokemonRepository(self.session, pokemon_repo, usuario_repo)
+        return usuario_pokemon_repo.iterarLinhasDoUsuario(id_jogador, tamanho_lote)
+
+    def jogadorExiste(self, id_jogador: str) -> bool:
+        return UsuarioRepository(self.session).exists(id_jogador)
+
+    def getPaginaPokemonsDoJogador(self, id_jogador: str, limite: int, apos: int | None = None) -> tuple[list[Pokemon], int | None]:
+        usuario_repo = UsuarioRepository(self.session)
+        pokemon_repo = PokemonRepository(self.session)
+        usuario_pokemon_repo = UsuarioPokemonRepository(self.session, pokemon_repo, usuario_repo)
+        return usuario_pokemon_repo.listarPaginaDoUsuario(id_jogador, limite, apos)
+
+    def iterarPokemonsDoJogador(self, id_jogador: str, tamanho_lote: int = 500):
+        usuario_repo = UsuarioRepository(self.session)
+        pokemon_repo = PokemonRepository(self.session)
+        usuario_pokemon_repo = UsuarioPokemonRepository(self.session, pokemon_repo, usuario_repo)
+        return usuario_pokemon_repo.iterarPokemonsDoUsuario(id_jogador, tamanho_lote)
+
     def removerPokemonDoJogador(self, id_jogador: str, id_pokemon: int) -> bool:
         usuario_repo = UsuarioRepository(self.session)
         pokemon_repo = PokemonRepository(self.session)
@@ -72,30 +178,172 @@ class GerenciadorBD:
         usuario_pokemon_repo.adicionarPokemonJogador(id_jogador, pokemon)
         return True
 
+    def buscarPokemon(self, id_pokemon: int) -> Pokemon | None:
+        """Pokémon já gravado na tabela Pokemon, ou None se ainda não existir."""
+        pokemon_repo = PokemonRepository(self.session)
+        try:
+            return pokemon_repo.read(id_pokemon)
+        except ValueError:
+            return None
+
     def adicionarPokemon(self, pokemon: Pokemon):
         pokemon_repo = PokemonRepository(self.session)
         pokemon_repo.create(pokemon)
         return True
 
+    def adicionarDistribuicao(self, jogador: Jogador, pokemons: list[Pokemon]):
+        """Grava jogador, pokémons e vínculos de uma distribuição em uma única transação."""
+        usuario_repo = UsuarioRepository(self.session)
+        pokemon_repo = PokemonRepository(self.session)
+        usuario_pokemon_repo = UsuarioPokemonRepository(self.session, pokemon_repo, usuario_repo)
+        try:
+            usuario_repo.createEmLote([jogador])
+            pokemon_repo.createEmLote(pokemons)
+            usuario_pokemon_repo.adicionarPokemonsJogadorEmLote(jogador.get_id(), pokemons)
+            self.session.commit()
+        except SQLAlchemyError as e:
+            self.session.rollback()
+            raise ValueError(f"Erro ao gravar distribuição do jogador {jogador.get_id()}: {e}")
+        return True
+
+    def adicionarDistribuicoesEmLote(self, jogadores: list[Jogador]):
+        """Grava as distribuições de vários jogadores em uma única transação (três INSERTs multi-linha)."""
+        usuario_repo = UsuarioRepository(self.session)
+        pokemon_repo = PokemonRepository(self.session)
+        usuario_pokemon_repo = UsuarioPokemonRepository(self.session, pokemon_repo, usuario_repo)
+        try:
+            usuario_repo.createEmLote(jogadores)
+            pokemon_repo.createEmLote([p for j in jogadores for p in j.get_pokemons()])
+            usuario_pokemon_repo.adicionarVinculosEmLote(
+                (j.get_id(), p.get_numero_pokedex()) for j in jogadores for p in j.get_pokemons()
+            )
+            self.session.commit()
+        except SQLAlchemyError as e:
+            self.session.rollback()
+            raise ValueError(f"Erro ao gravar lote de {len(jogadores)} distribuições: {e}")
+        return True
+
+    def trocarPokemons(self, id_remetente: str, id_pokemon_remetente: int, id_destinatario: str, id_pokemon_destinatario: int):
+        """Troca um pokémon de cada jogador em uma única transação.
+
+        Em disputa de lock (deadlock ou timeout de espera), a transação inteira é
+        desfeita e repetida até TROCA_TENTATIVAS vezes, com backoff aleatório.
+        """
+        usuario_repo = UsuarioRepository(self.session)
+        pokemon_repo = PokemonRepository(self.session)
+        usuario_pokemon_repo = UsuarioPokemonRepository(self.session, pokemon_repo, usuario_repo)
+
+        for tentativa in range(TROCA_TENTATIVAS + 1):
+            try:
+                usuario_pokemon_repo.trocarPokemonsJogadores(
+                    id_remetente, id_pokemon_remetente, id_destinatario, id_pokemon_destinatario
+                )
+                self.session.commit()
+                contador_trocas.registrar("concluidas")
+                return True
+            except ValueError:
+                self.session.rollback()
+                contador_trocas.registrar("rejeitadas")
+                raise
+            except OperationalError as e:
+                self.session.rollback()
+                if not erroDeConcorrencia(e):
+                    raise ValueError(f"Erro ao realizar troca: {e}")
+                contador_trocas.registrar("conflitos")
+                if tentativa == TROCA_TENTATIVAS:
+                    raise ValueError("Troca abortada por concorrência, tente novamente")
+                contador_trocas.registrar("retentativas")
+                time.sleep(random.uniform(0, TROCA_BACKOFF * (2 ** tentativa)))
+            except SQLAlchemyError as e:
+                self.session.rollback()
+                raise ValueError(f"Erro ao realizar troca: {e}")
+
+    def buscarRespostaIdempotente(self, chave: str, id_jogador: str) -> dict | None:
+        """Resposta já gravada para a chave de idempotência, ou None se a chave é nova."""
+        try:
+            return IdempotenciaRepository(self.session).buscar(chave, id_jogador)
+        except SQLAlchemyError as e:
+            self.session.rollback()
+            raise ValueError(f"Erro ao buscar chave de idempotência: {e}")
+
+    def purgarIdempotencia(self) -> int:
+        """Apaga as chaves de idempotência vencidas e devolve quantas foram apagadas."""
+        try:
+            return IdempotenciaRepository(self.session).purgarExpiradas()
+        except SQLAlchemyError as e:
+            self.session.rollback()
+            raise ValueError(f"Erro ao limpar chaves de idempotência: {e}")
+
+    def substituirPokemonDoJogador(self, id_jogador: str, id_pokemon_removido: int, pokemon_novo: Pokemon, resposta: dict, chave: str = None) -> dict:
+        """Troca um pokémon do jogador por outro em uma única transação.
+
+        Com `chave`, a resposta é gravada na mesma transação: uma repetição da
+        requisição devolve a resposta original em vez de aplicar a troca de novo.
+        A chave é gravada antes da troca, então repetições simultâneas esperam
+        pela trava da chave (e não pela linha do vínculo, que já terá sido trocada).
+        """
+        usuario_repo = UsuarioRepository(self.session)
+        pokemon_repo = PokemonRepository(self.session)
+        usuario_pokemon_repo = UsuarioPokemonRepository(self.session, pokemon_repo, usuario_repo)
+        idempotencia_repo = IdempotenciaRepository(self.session)
+        try:
+            if chave is not None:
+                idempotencia_repo.registrar(chave, id_jogador, resposta)
+            pokemon_repo.createEmLote([pokemon_novo])
+            usuario_pokemon_repo.substituirPokemonJogador(id_jogador, id_pokemon_removido, pokemon_novo.get_numero_pokedex())
+            self.session.commit()
+        except ValueError:
+            self.session.rollback()
+            # A troca pode ter falhado por já ter sido aplicada por uma repetição com a mesma chave
+            resposta_gravada = idempotencia_repo.buscar(chave, id_jogador) if chave is not None else None
+            if resposta_gravada is None:
+                raise
+            return resposta_gravada
+        except IntegrityError as e:
+            self.session.rollback()
+            # Outra requisição com a mesma chave terminou primeiro: devolve a resposta dela
+            resposta_gravada = idempotencia_repo.buscar(chave, id_jogador) if chave is not None else None
+            if resposta_gravada is None:
+                raise ValueError(f"Erro ao trocar Pokémon do jogador {id_jogador}: {e}")
+            return resposta_gravada
+        except SQLAlchemyError as e:
+            self.session.rollback()
+            raise ValueError(f"Erro ao trocar Pokémon do jogador {id_jogador}: {e}")
+        return resposta
+
 class PokemonRepository(IRepository):
     def __init__(self, db: Session):
         self.db = db
 
     def create(self, pokemon: Pokemon):
         """Adiciona um pokémon. Erro se já existir."""
-        if self.exists(pokemon.get_numero_pokedex()):
+        # Um único INSERT: a chave primária acusa o pokémon duplicado
+        try:
+            self.db.execute(
+                insert(PokemonORM).values(
+                    idPokemon=pokemon.get_numero_pokedex(),
+                    nomePokemon=pokemon.get_nome(),
+                    isShiny=pokemon.is_shiny(),
+                )
+            )
+            self.db.commit()
+        except IntegrityError:
+            self.db.rollback()
             raise ValueError(
                 f"Pokémon com ID {pokemon.get_numero_pokedex()} já existe"
             )
 
-        novo_pokemon_orm = pokemonToOrmAdapter(pokemon)
-        try:
-            self.db.add(novo_pokemon_orm)
-            self.db.commit()
-            self.db.refresh(novo_pokemon_orm)
-        except IntegrityError as e:
-            self.db.rollback()
-            raise ValueError(f"Erro ao adicionar pokémon: {e}")
+    def createEmLote(self, pokemons: list[Pokemon]):
+        """Insere vários pokémons em um só INSERT, ignorando os que já existem. Não faz commit."""
+        linhas = {
+            p.get_numero_pokedex(): {
+                "idPokemon": p.get_numero_pokedex(),
+                "nomePokemon": p.get_nome(),
+                "isShiny": p.is_shiny(),
+            }
+            for p in pokemons
+        }
+        insertIgnorandoDuplicados(self.db, PokemonORM.__table__, list(linhas.values()))
 
     def delete(self, pokemon: Pokemon):
         """Remove um pokémon. Erro se não existir."""
@@ -133,12 +381,9 @@ class PokemonRepository(IRepository):
 
     def exists(self, numero_pokedex: int) -> bool:
         """Verifica se um pokémon existe"""
-        return (
-            self.db.query(PokemonORM)
-            .filter(PokemonORM.idPokemon == numero_pokedex)
-            .first()
-            is not None
-        )
+        return bool(self.db.scalar(
+            select(exists().where(PokemonORM.idPokemon == numero_pokedex))
+        ))
 
 class UsuarioRepository(IRepository):
     def __init__(self, db: Session):
@@ -146,20 +391,20 @@ class UsuarioRepository(IRepository):
 
     def create(self, usuario: Jogador):
         """Adiciona um jogador. Erro se já existir."""
-        if self.exists(usuario.get_id()):
+        # Um único INSERT: a chave primária acusa o jogador duplicado
+        try:
+            self.db.execute(insert(UsuarioORM).values(idUsuario=usuario.get_id()))
+            self.db.commit()
+        except IntegrityError:
+            self.db.rollback()
             raise ValueError(
                 f"Usuário com ID {usuario.get_id()} já existe"
             )
 
-        novo_usuario_orm = UsuarioToOrmAdapter(usuario)
-
-        try:
-            self.db.add(novo_usuario_orm)
-            self.db.commit()
-            self.db.refresh(novo_usuario_orm)
-        except IntegrityError as e:
-            self.db.rollback()
-            raise ValueError(f"Erro ao adicionar usuário: {e}")
+    def createEmLote(self, usuarios: list[Jogador]):
+        """Insere vários jogadores em um só INSERT, ignorando os que já existem. Não faz commit."""
+        linhas = [{"idUsuario": u.get_id()} for u in {u.get_id(): u for u in usuarios}.values()]
+        insertIgnorandoDuplicados(self.db, UsuarioORM.__table__, linhas)
 
     def delete(self, usuario: Jogador):
         """Remove um jogador."""
@@ -182,11 +427,12 @@ class UsuarioRepository(IRepository):
             raise ValueError(f"Erro ao remover usuário: {e}")
 
     def read(self, id_usuario: str) -> Jogador:
-        """Busca um usuário por ID."""
-        usuario_orm = (
-            self.db.query(UsuarioORM)
-            .filter(UsuarioORM.idUsuario == id_usuario)
-            .first()
+        """Busca um usuário por ID, com o time."""
+        # Vínculos e pokémons carregados em lote (3 queries no total), e não um SELECT por carta
+        usuario_orm = self.db.scalar(
+            select(UsuarioORM)
+            .where(UsuarioORM.idUsuario == id_usuario)
+            .options(selectinload(UsuarioORM.pokemons_colecao).selectinload(UsuarioPokemonORM.pokemon_carta))
         )
 
         if usuario_orm is None:
@@ -198,12 +444,9 @@ class UsuarioRepository(IRepository):
 
     def exists(self, id_usuario: str) -> bool:
         """Verifica se o usuário existe."""
-        return (
-            self.db.query(UsuarioORM)
-            .filter(UsuarioORM.idUsuario == id_usuario)
-            .first()
-            is not None
-        )
+        return bool(self.db.scalar(
+            select(exists().where(UsuarioORM.idUsuario == id_usuario))
+        ))
 
 class UsuarioPokemonRepository:
     def __init__(self, db: Session, pokemon_repo: PokemonRepository, usuario_repo: UsuarioRepository):
@@ -213,64 +456,267 @@ class UsuarioPokemonRepository:
 
     def adicionarPokemonJogador(self, id_usuario: str, pokemon: Pokemon):
         """Adiciona um pokémon ao jogador."""
-        if not self.usuario_repo.exists(id_usuario):
-            raise ValueError(f"Usuário com ID {id_usuario} não encontrado")
+        id_pokemon = pokemon.get_numero_pokedex()
 
-        # Garante que o Pokémon existe
-        self.pokemon_repo.read(pokemon.get_numero_pokedex())
-
-        nova_carta = UsuarioPokemonORM(
-            idUsuario=id_usuario,
-            idPokemon=pokemon.get_numero_pokedex(),
+        # INSERT ... SELECT: só insere se o usuário e o pokémon existirem, em um único statement
+        origem = (
+            select(UsuarioORM.idUsuario, literal(id_pokemon))
+            .where(UsuarioORM.idUsuario == id_usuario)
+            .where(exists().where(PokemonORM.idPokemon == id_pokemon))
         )
-
         try:
-            self.db.add(nova_carta)
-            self.db.commit()
+            resultado = self.db.execute(
+                insert(UsuarioPokemonORM).from_select(["idUsuario", "idPokemon"], origem)
+            )
         except IntegrityError:
             self.db.rollback()
             raise ValueError(
-                f"Usuário {id_usuario} já possui o Pokémon {pokemon.get_numero_pokedex()}"
+                f"Usuário {id_usuario} já possui o Pokémon {id_pokemon}"
             )
 
+        if resultado.rowcount == 0:
+            # Caminho de erro: descobre qual dos dois não existe
+            self.db.rollback()
+            if not self.usuario_repo.exists(id_usuario):
+                raise ValueError(f"Usuário com ID {id_usuario} não encontrado")
+            raise ValueError(f"Pokémon com ID {id_pokemon} não encontrado")
+
+        self.db.commit()
+
+    def adicionarPokemonsJogadorEmLote(self, id_usuario: str, pokemons: list[Pokemon]):
+        """Vincula vários pokémons ao jogador em um só INSERT, ignorando vínculos já existentes. Não faz commit."""
+        self.adicionarVinculosEmLote((id_usuario, p.get_numero_pokedex()) for p in pokemons)
+
+    def adicionarVinculosEmLote(self, vinculos):
+        """Insere pares (id_usuario, id_pokemon) em um só INSERT, ignorando os já existentes. Não faz commit."""
+        linhas = [{"idUsuario": id_usuario, "idPokemon": id_pokemon} for id_usuario, id_pokemon in dict.fromkeys(vinculos)]
+        insertIgnorandoDuplicados(self.db, UsuarioPokemonORM.__table__, linhas)
+
     def removerPokemonJogador(self, id_usuario: str, id_pokemon: int) -> bool:
         """Remove um pokémon da coleção do jogador."""
+        resultado = self.db.execute(
+            delete(UsuarioPokemonORM).where(
+                UsuarioPokemonORM.idUsuario == id_usuario,
+                UsuarioPokemonORM.idPokemon == id_pokemon,
+            )
+        )
+        self.db.commit()
+        return resultado.rowcount > 0
+
+    def trocarPokemonsJogadores(self, id_remetente: str, id_pokemon_remetente: int, id_destinatario: str, id_pokemon_destinatario: int):
+        """Troca a posse de dois vínculos (remetente, pokémon) <-> (destinatário, pokémon). Não faz commit.
+
+        Os dois vínculos são travados (SELECT ... FOR UPDATE) sempre na mesma ordem
+        de chave primária, então trocas concorrentes envolvendo os mesmos jogadores
+        esperam umas pelas outras em vez de entrar em deadlock. A troca é um único
+        UPDATE do idUsuario, sem apagar e reinserir as linhas.
+        """
+        if id_remetente == id_destinatario:
+            raise ValueError("Um jogador não pode trocar com ele mesmo")
+        if id_pokemon_remetente == id_pokemon_destinatario:
+            raise ValueError(f"Os dois jogadores oferecem o mesmo Pokémon {id_pokemon_remetente}")
+
+        vinculos = sorted([(id_remetente, id_pokemon_remetente), (id_destinatario, id_pokemon_destinatario)])
+        for id_usuario, id_pokemon in vinculos:
+            travado = self.db.execute(
+                select(UsuarioPokemonORM.idUsuario)
+                .where(UsuarioPokemonORM.idUsuario == id_usuario, UsuarioPokemonORM.idPokemon == id_pokemon)
+                .with_for_update()
+            ).first()
+            if travado is None:
+                raise ValueError(f"Usuário {id_usuario} não possui o Pokémon {id_pokemon}")
+
         try:
-            relacao = (
-                self.db.query(UsuarioPokemonORM).filter(
-                    UsuarioPokemonORM.idUsuario == id_usuario,
-                    UsuarioPokemonORM.idPokemon == id_pokemon,
-                ).one()
+            self.db.execute(
+                update(UsuarioPokemonORM)
+                .where(or_(
+                    and_(UsuarioPokemonORM.idUsuario == id_remetente, UsuarioPokemonORM.idPokemon == id_pokemon_remetente),
+                    and_(UsuarioPokemonORM.idUsuario == id_destinatario, UsuarioPokemonORM.idPokemon == id_pokemon_destinatario),
+                ))
+                .values(idUsuario=case(
+                    (UsuarioPokemonORM.idUsuario == id_remetente, id_destinatario),
+                    else_=id_remetente,
+                ))
+                .execution_options(synchronize_session=False)
             )
+        except IntegrityError:
+            # A chave primária acusa quem já tinha o Pokémon que ia receber
+            raise ValueError("Um dos jogadores já possui o Pokémon que receberia na troca")
 
-            self.db.delete(relacao)
-            self.db.commit()
-            return True
+    def substituirPokemonJogador(self, id_usuario: str, id_pokemon_removido: int, id_pokemon_novo: int):
+        """Troca o pokémon de um vínculo do jogador com um único UPDATE. Não faz commit."""
+        try:
+            resultado = self.db.execute(
+                update(UsuarioPokemonORM)
+                .where(UsuarioPokemonORM.idUsuario == id_usuario, UsuarioPokemonORM.idPokemon == id_pokemon_removido)
+                .values(idPokemon=id_pokemon_novo)
+                .execution_options(synchronize_session=False)
+            )
+        except IntegrityError:
+            raise ValueError(f"Usuário {id_usuario} já possui o Pokémon {id_pokemon_novo}")
+
+        if resultado.rowcount == 0:
+            raise ValueError(f"Usuário {id_usuario} não possui o Pokémon {id_pokemon_removido}")
+
+    def listarLinhasDoUsuario(self, id_usuario: str) -> list[tuple[int, str, bool]]:
+        """Time do usuário como tuplas (idPokemon, nome, shiny), sem montar entidades ORM."""
+        # Um único SELECT com outer join: nenhuma linha = usuário inexistente;
+        # uma linha com pokémon nulo = usuário com time vazio
+        linhas = self.db.execute(
+            select(UsuarioORM.idUsuario, PokemonORM.idPokemon, PokemonORM.nomePokemon, PokemonORM.isShiny)
+            .outerjoin(UsuarioPokemonORM, UsuarioPokemonORM.idUsuario == UsuarioORM.idUsuario)
+            .outerjoin(PokemonORM, PokemonORM.idPokemon == UsuarioPokemonORM.idPokemon)
+            .where(UsuarioORM.idUsuario == id_usuario)
+        ).all()
+
+        if not linhas:
+            raise ValueError(f"Usuário com ID {id_usuario} não encontrado")
 
-        except NoResultFound:
-            return False
+        return [(id_pokemon, nome, shiny) for _, id_pokemon, nome, shiny in linhas if id_pokemon is not None]
 
     def listarPokemonsDoUsuario(self, id_usuario: str) -> list[Pokemon]:
         """Lista todos os pokémons de um usuário."""
-        if not self.usuario_repo.exists(id_usuario):
+        return [Pokemon(id_pokemon, nome, shiny) for id_pokemon, nome, shiny in self.listarLinhasDoUsuario(id_usuario)]
+
+    def listarPaginaDoUsuario(self, id_usuario: str, limite: int, apos: int | None = None) -> tuple[list[Pokemon], int | None]:
+        """Uma página do time, ordenada por idPokemon, a partir do cursor `apos` (exclusivo).
+
+        Retorna os pokémons e o cursor da próxima página (None na última).
+        """
+        # O cursor vai no ON do join: o usuário continua aparecendo mesmo sem mais itens
+        filtro_vinculo = UsuarioPokemonORM.idUsuario == UsuarioORM.idUsuario
+        if apos is not None:
+            filtro_vinculo = and_(filtro_vinculo, UsuarioPokemonORM.idPokemon > apos)
+
+        linhas = self.db.execute(
+            select(UsuarioORM.idUsuario, PokemonORM.idPokemon, PokemonORM.nomePokemon, PokemonORM.isShiny)
+            .outerjoin(UsuarioPokemonORM, filtro_vinculo)
+            .outerjoin(PokemonORM, PokemonORM.idPokemon == UsuarioPokemonORM.idPokemon)
+            .where(UsuarioORM.idUsuario == id_usuario)
+            .order_by(UsuarioPokemonORM.idPokemon)
+            .limit(limite + 1)  # um a mais só para saber se há próxima página
+        ).all()
+
+        if not linhas:
             raise ValueError(f"Usuário com ID {id_usuario} não encontrado")
 
-        # join para buscar os poke
-        resultados = (
-            self.db.query(PokemonORM)
-            .join(UsuarioPokemonORM, PokemonORM.idPokemon == UsuarioPokemonORM.idPokemon)
-            .filter(UsuarioPokemonORM.idUsuario == id_usuario)
-            .all()
+        pokemons = [Pokemon(id_pokemon, nome, shiny) for _, id_pokemon, nome, shiny in linhas[:limite] if id_pokemon is not None]
+        proximo = pokemons[-1].get_numero_pokedex() if len(linhas) > limite else None
+        return pokemons, proximo
+
+    def iterarLinhasDoUsuario(self, id_usuario: str, tamanho_lote: int = 500):
+        """Percorre o time inteiro com um cursor do lado do servidor, `tamanho_lote` linhas por vez.
+
+        Gera tuplas (idPokemon, nome, shiny).
+        """
+        resultado = self.db.execute(
+            select(PokemonORM.idPokemon, PokemonORM.nomePokemon, PokemonORM.isShiny)
+            .join(UsuarioPokemonORM, UsuarioPokemonORM.idPokemon == PokemonORM.idPokemon)
+            .where(UsuarioPokemonORM.idUsuario == id_usuario)
+            .order_by(PokemonORM.idPokemon)
+            .execution_options(stream_results=True, yield_per=tamanho_lote)
         )
-
-        return [OrmTopokemonAdapter(pokemon_orm) for pokemon_orm in resultados]
+        try:
+            for linha in resultado:
+                yield tuple(linha)
+        finally:
+            resultado.close()
+
+    def iterarPokemonsDoUsuario(self, id_usuario: str, tamanho_lote: int = 500):
+        for id_pokemon, nome, shiny in self.iterarLinhasDoUsuario(id_usuario, tamanho_lote):
+            yield Pokemon(numero_pokedex=id_pokemon, nome=nome, shiny=shiny)
+
+    def listarDonosDoPokemon(self, id_pokemon: int) -> list[str]:
+        """IDs dos usuários que possuem o Pokémon (só lê o índice idPokemon, idUsuario)."""
+        return list(self.db.scalars(
+            select(UsuarioPokemonORM.idUsuario)
+            .where(UsuarioPokemonORM.idPokemon == id_pokemon)
+            .order_by(UsuarioPokemonORM.idUsuario)
+        ))
 
     def usuarioPossuiPokemon(self, id_usuario: str, id_pokemon: int) -> bool:
         """Verifica se o usuário possui um Pokémon."""
-        return (
-            self.db.query(UsuarioPokemonORM)
-            .filter(
+        return bool(self.db.scalar(
+            select(exists().where(
                 UsuarioPokemonORM.idUsuario == id_usuario,
                 UsuarioPokemonORM.idPokemon == id_pokemon,
-            ).first() is not None
-        )
\ No newline at end of file
+            ))
+        ))
+
+
+class EspecieRepository:
+    """Acesso ao catálogo local de espécies."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def createEmLote(self, especies: dict[int, str]) -> int:
+        """Importa o catálogo (id -> nome) em um único INSERT, ignorando os já existentes."""
+        linhas = [{"idEspecie": id_especie, "nomeEspecie": nome} for id_especie, nome in especies.items()]
+        try:
+            insertIgnorandoDuplicados(self.db, EspecieORM.__table__, linhas)
+            self.db.commit()
+        except SQLAlchemyError as e:
+            self.db.rollback()
+            raise ValueError(f"Erro ao importar catálogo de espécies: {e}")
+        return len(linhas)
+
+    def listarNomes(self) -> dict[int, str]:
+        """Retorna o catálogo inteiro como id -> nome."""
+        linhas = self.db.execute(select(EspecieORM.idEspecie, EspecieORM.nomeEspecie)).all()
+        return {id_especie: nome for id_especie, nome in linhas}
+
+
+def _agoraUTC() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+class IdempotenciaRepository:
+    """Respostas de operações já aplicadas, por chave de idempotência, válidas por `ttl` segundos."""
+
+    def __init__(self, db: Session, ttl: float = None, relogio=_agoraUTC):
+        self.db = db
+        self.ttl = IDEMPOTENCIA_TTL if ttl is None else ttl
+        self.__relogio = relogio  # datetime em UTC, sem fuso (como gravado em criadoEm)
+
+    def __limite(self) -> datetime:
+        return self.__relogio() - timedelta(seconds=self.ttl)
+
+    def buscar(self, chave: str, id_usuario: str) -> dict | None:
+        """Resposta gravada para a chave; chaves vencidas contam como novas."""
+        linha = self.db.execute(
+            select(IdempotenciaORM.idUsuario, IdempotenciaORM.resposta)
+            .where(IdempotenciaORM.chave == chave, IdempotenciaORM.criadoEm >= self.__limite())
+        ).first()
+        if linha is None:
+            return None
+        if linha.idUsuario != id_usuario:
+            raise ValueError("Chave de idempotência já usada por outro jogador")
+        return json.loads(linha.resposta)
+
+    def registrar(self, chave: str, id_usuario: str, resposta: dict):
+        """Grava a resposta da operação. Não faz commit: vai na mesma transação da operação."""
+        # Uma chave vencida ainda não limpa pode ser reaproveitada
+        self.db.execute(
+            delete(IdempotenciaORM)
+            .where(IdempotenciaORM.chave == chave, IdempotenciaORM.criadoEm < self.__limite())
+        )
+        self.db.execute(
+            insert(IdempotenciaORM).values(
+                chave=chave, idUsuario=id_usuario, resposta=json.dumps(resposta), criadoEm=self.__relogio()
+            )
+        )
+
+    def purgarExpiradas(self, tamanho_lote: int = 1000) -> int:
+        """Apaga as chaves vencidas em lotes (um commit por lote, para não segurar locks)."""
+        limite = self.__limite()
+        total = 0
+        while True:
+            chaves = list(self.db.scalars(
+                select(IdempotenciaORM.chave).where(IdempotenciaORM.criadoEm < limite).limit(tamanho_lote)
+            ))
+            if chaves:
+                self.db.execute(delete(IdempotenciaORM).where(IdempotenciaORM.chave.in_(chaves)))
+            self.db.commit()
+            total += len(chaves)
+            if len(chaves) < tamanho_lote:
+                return total
@@ -1,9 +1,15 @@
-from fastapi import APIRouter
-from pydantic import BaseModel
+import asyncio
+
+from fastapi import APIRouter, Depends, Header, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 
 from modules.distribuicao.service import GestorCartas
-from modules.distribuicao.external import GestorAPI
-from modules.distribuicao.repository import GerenciadorBD
+from modules.distribuicao.external import GestorAPIAsync
+from modules.distribuicao.container import Container, obterContainer, obterGestorCartas, obterGestorAPIAsync
+from modules.distribuicao.models import Pokemon
+from shared import respostas
+from shared.respostas import responder, serializarJSON
 
 router = APIRouter()
 
@@ -19,6 +25,12 @@ class DistribuicaoResponse(BaseModel):
     codigo: str
     pokemons: list[PokemonResponse] = []
 
+class DistribuicaoLoteSchema(BaseModel):
+    player_ids: list[str] = Field(min_length=1, max_length=10000)
+
+class DistribuicaoLoteResponse(DistribuicaoResponse):
+    player_id: str
+
 class TrocaPokemonSchema(BaseModel):
     removed_pokemon_id: int
     removed_pokemon_shiny: bool
@@ -37,47 +49,93 @@ class PokemonSchema(BaseModel):
     pokemon_id: int
     pokemon_shiny: bool
 
+def formatarDistribuicao(resultado: dict) -> dict:
+    """Converte o resultado no formato de DistribuicaoResponse, só com tipos nativos."""
+    resultado["pokemons"] = [
+        {"numero_pokedex": p.numero_pokedex, "nome": p.nome, "shiny": p.shiny} if isinstance(p, Pokemon) else p
+        for p in resultado.get("pokemons", [])
+    ]
+    return resultado
+
 @router.get("/players/{player_id}/team")
-def time_jogador(player_id: str):
-    status = GestorCartas(GestorAPI(), GerenciadorBD()).listarTime(player_id)
-    return status
+def time_jogador(player_id: str,
+                 limit: int | None = Query(default=None, ge=1, le=1000),
+                 cursor: int | None = Query(default=None, ge=0),
+                 stream: bool = False,
+                 gestor: GestorCartas = Depends(obterGestorCartas),
+                 c: Container = Depends(obterContainer)):
+    if not stream:
+        # Sem `limit`, devolve o time inteiro (como antes); com `limit`, uma página e o `next_cursor`
+        return responder(gestor.listarTime(player_id, limit, cursor))
+
+    if not gestor.existeJogador(player_id):
+        return {"status": 404, "message": f"Usuário com ID {player_id} não encontrado", "data": {}}
+
+    def linhas():
+        # Sessão própria: o cursor do servidor precisa viver até o fim do stream
+        with c.sessoes() as db:
+            for item in c.gestorCartas(db).iterarTime(player_id):
+                yield serializarJSON(item) + b"\n"
+
+    return StreamingResponse(linhas(), media_type="application/x-ndjson")
 
 @router.post("/players/{player_id}/distribution", response_model=DistribuicaoResponse)
-def distribuicao_inicial(player_id: str):
-    resultado = GestorCartas(GestorAPI(), GerenciadorBD()).gerarPokemonsIniciais(player_id)
-    return resultado
+async def distribuicao_inicial(player_id: str, response: Response, gestor: GestorCartas = Depends(obterGestorCartas)):
+    resultado = await gestor.gerarPokemonsIniciaisAsync(player_id)
+    # Uma distribuição que não foi gravada não é respondida como 200
+    response.status_code = int(resultado.get("codigo", 200))
+    return responder(formatarDistribuicao(resultado), response.status_code)
+
+@router.post("/distributions/batch")
+def distribuicao_em_lote(dados_lote: DistribuicaoLoteSchema, c: Container = Depends(obterContainer)):
+    """Distribui para vários jogadores; a resposta é NDJSON, uma linha por jogador."""
+    def linhas():
+        # Sessão própria: a do Depends(get_db) pode já estar fechada quando o stream roda
+        with c.sessoes() as db:
+            for resultado in c.gestorCartas(db).gerarPokemonsIniciaisEmLote(dados_lote.player_ids):
+                if respostas.RESPOSTA_JSON_RAPIDA:
+                    yield serializarJSON(formatarDistribuicao(resultado)) + b"\n"
+                else:
+                    yield DistribuicaoLoteResponse.model_validate(formatarDistribuicao(resultado)).model_dump_json() + "\n"
+
+    return StreamingResponse(linhas(), media_type="application/x-ndjson")
 
 @router.delete("/players/{player_id}/team")
-def remove_pokemon_jogador(player_id: str, dados_pokemon: PokemonSchema):
-    id_pokemon = dados_pokemon.pokemon_id
-    is_shiny = dados_pokemon.pokemon_shiny
-    pokemon_removido = GestorAPI().getPokemon(numero_pokedex=id_pokemon, shiny=is_shiny)
-    resultado = GestorCartas(GestorAPI(), GerenciadorBD()).removerPokemon(player_id, pokemon_removido)
+def remove_pokemon_jogador(player_id: str, dados_pokemon: PokemonSchema,
+                           gestor: GestorCartas = Depends(obterGestorCartas)):
+    # A remoção só precisa do ID: não consulta a PokeAPI
+    resultado = gestor.removerPokemon(player_id, dados_pokemon.pokemon_id)
     return resultado
 
 @router.post("/players/{player_id}/team")
-def adiciona_pokemon_jogador(player_id: str, dados_pokemon: PokemonSchema):
+async def adiciona_pokemon_jogador(player_id: str, dados_pokemon: PokemonSchema,
+                                   gestor: GestorCartas = Depends(obterGestorCartas),
+                                   api_async: GestorAPIAsync = Depends(obterGestorAPIAsync)):
     id_pokemon = dados_pokemon.pokemon_id
     is_shiny = dados_pokemon.pokemon_shiny
-    pokemon_adicionado = GestorAPI().getPokemon(numero_pokedex=id_pokemon, shiny=is_shiny)
-    resultado = GestorCartas(GestorAPI(), GerenciadorBD()).adicionarPokemon(player_id, pokemon_adicionado)
+    # Catálogo/cache e tabela Pokemon primeiro; a PokeAPI só em um miss de verdade
+    pokemon_adicionado = await asyncio.to_thread(gestor.resolverPokemonLocal, id_pokemon, is_shiny)
+    if pokemon_adicionado is None:
+        pokemon_adicionado = await api_async.getPokemon(numero_pokedex=id_pokemon, shiny=is_shiny)
+    # O acesso ao banco é síncrono: roda fora do event loop
+    resultado = await asyncio.to_thread(gestor.adicionarPokemon, player_id, pokemon_adicionado)
     return resultado
 
-#TODO:
 @router.patch("/players/{player_id}/team")
-def troca_pokemons_jogador(player_id: int, dados_troca: TrocaPokemonSchema):
+def troca_pokemons_jogador(player_id: str, dados_troca: TrocaPokemonSchema,
+                           idempotency_key: str | None = Header(default=None, max_length=64),
+                           gestor: GestorCartas = Depends(obterGestorCartas)):
     id_removido = dados_troca.removed_pokemon_id
-    shiny_removido = dados_troca.removed_pokemon_shiny
     id_adicionado = dados_troca.add_pokemon_id
     shiny_adicionado = dados_troca.add_pokemon_shiny
-    return {"message": "Endpoint não implementado"}
+    resultado = gestor.substituirPokemon(player_id, id_removido, id_adicionado, shiny_adicionado, idempotency_key)
+    return resultado
 
 @router.post("/trades")
-def troca_entre_players(dados_troca: TrocaPlayerSchema):
+def troca_entre_players(dados_troca: TrocaPlayerSchema, gestor: GestorCartas = Depends(obterGestorCartas)):
     sender_id = dados_troca.sender_id
     sender_poke_id = dados_troca.sender_pokemon_id
-    sender_is_shiny = dados_troca.sender_pokemon_shiny
     receiver_id = dados_troca.receiver_id
     receiver_poke_id = dados_troca.receiver_pokemon_id
-    receiver_is_shiny = dados_troca.receiver_pokemon_shiny
-    return {"message": "Endpoint não implementado"}
\ No newline at end of file
+    resultado = gestor.trocarPokemons(sender_id, sender_poke_id, receiver_id, receiver_poke_id)
+    return resultado
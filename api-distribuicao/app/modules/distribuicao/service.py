@@ -1,74 +1,184 @@
+import asyncio
 import json
-import random
+import os
 
-from modules.distribuicao.external import GestorAPI
+from modules.distribuicao.cache import CacheTimes
+from modules.distribuicao.external import GestorAPI, GestorAPIAsync
 from modules.distribuicao.models import Pokemon, Jogador
 from modules.distribuicao.schemas import StatusDistribuicao, Status
 from modules.distribuicao.repository import GerenciadorBD
+from modules.distribuicao.sorteio import MotorSorteio, CARTAS_POR_DISTRIBUICAO
+from shared.metricas import instrumentar
 
+# Evita laço infinito quando a API não devolve pokémons válidos (ex.: circuito aberto)
+MAX_TENTATIVAS_SORTEIO = 50
+
+# Jogadores gravados por transação na distribuição em lote
+DISTRIBUICAO_LOTE_TAMANHO = int(os.environ.get("DISTRIBUICAO_LOTE_TAMANHO", "500"))
+
+@instrumentar("gestor_cartas")
 class GestorCartas:
-    _instance = None
-    def __new__(cls, *args, **kwargs):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance.__init_once(*args, **kwargs)
-        return cls._instance
-
-    def __init_once(self, api:GestorAPI, bd:GerenciadorBD):
+    def __init__(self, api:GestorAPI, bd:GerenciadorBD, api_async:GestorAPIAsync = None, cache_times:CacheTimes = None, sorteio:MotorSorteio = None):
         self.__pokemons = []
         self.__api = api
         self.__bd = bd
+        self.__api_async = api_async
+        self.__cache_times = cache_times
+        self.__sorteio = sorteio if sorteio is not None else MotorSorteio()
+
+    def __invalidarTime(self, idJogador):
+        if self.__cache_times is not None:
+            self.__cache_times.invalidar(idJogador)
 
     def gerarPokemonsIniciais(self, idJogador:str):
         sd = StatusDistribuicao()
-        pokemon = Pokemon()
-        pokemons_id = []
+        sorteados = set()
         pokemons = []
         try:
-            while len(pokemons_id) < 5:
-                pokemon_id = random.randint(1, self.__api.getMaxID())
-                if pokemon_id not in pokemons_id:
-                    isShiny = random.randint(1, 256) == 1
+            # O total de espécies é resolvido uma única vez por distribuição
+            max_id = self.__api.getMaxID()
+            while len(pokemons) < CARTAS_POR_DISTRIBUICAO:
+                novos_ids, shiny = self.__sortearFaltantes(max_id, CARTAS_POR_DISTRIBUICAO - len(pokemons), sorteados)
+                for pokemon_id, isShiny in zip(novos_ids, shiny):
                     pokemon = self.__api.getPokemon(pokemon_id, shiny=isShiny)
                     if pokemon != None:
                         pokemons.append(pokemon)
-                        pokemons_id.append(pokemon_id)
-                    else:
-                        pass
-            
-            jogador = Jogador(id=idJogador, pokemons=pokemons)
-            
-            #------------------------------------------------------------------------
-            try:
-                self.__bd.createJogador(jogador)
-            except ValueError as e:
-                print(f"Erro: {e}")
-            #------------------------------------------------------------------------
-            try:
-                for p in pokemons:
-                    self.__bd.adicionarPokemon(p)
-            except ValueError as e:
-                print(f"Erro: {e}")
-            #------------------------------------------------------------------------
+
+            self.__persistirDistribuicao(idJogador, pokemons)
+            return self.__respostaDistribuicao(sd, pokemons)
+        except (AttributeError, RuntimeError, ValueError) as e:
+            return self.__erroDistribuicao(sd, e)
+
+    def __sortearFaltantes(self, max_id: int, faltam: int, sorteados: set) -> tuple[list[int], list[bool]]:
+        """Sorteia só as cartas que faltam; ids já tentados (inclusive inválidos) não voltam."""
+        if len(sorteados) + faltam > min(max_id, MAX_TENTATIVAS_SORTEIO):
+            raise RuntimeError("limite de tentativas de sorteio atingido")
+
+        ids, shiny = self.__sorteio.sortear(1, max_id, k=faltam, excluir=sorteados)
+        novos_ids = [int(i) for i in ids[0]]
+        sorteados.update(novos_ids)
+        return novos_ids, [bool(f) for f in shiny[0]]
+
+    async def gerarPokemonsIniciaisAsync(self, idJogador: str, limite_concorrencia: int = 5):
+        """Mesma distribuição, mas buscando os 5 pokémons de forma concorrente."""
+        sd = StatusDistribuicao()
+        sorteados = set()
+        pokemons = []
+        semaforo = asyncio.Semaphore(limite_concorrencia)
+
+        async def buscar(pokemon_id: int, isShiny: bool):
+            async with semaforo:
+                return await self.__api_async.getPokemon(pokemon_id, shiny=isShiny)
+
+        try:
+            max_id = await self.__api_async.getMaxID()
+            while len(pokemons) < CARTAS_POR_DISTRIBUICAO:
+                # Sorteia só o que falta e busca tudo de uma vez; ids inválidos são sorteados de novo
+                novos_ids, shiny = self.__sortearFaltantes(max_id, CARTAS_POR_DISTRIBUICAO - len(pokemons), sorteados)
+                resultados = await asyncio.gather(*(buscar(i, f) for i, f in zip(novos_ids, shiny)))
+                pokemons.extend(p for p in resultados if p is not None)
+
+            await asyncio.to_thread(self.__persistirDistribuicao, idJogador, pokemons)
+            return self.__respostaDistribuicao(sd, pokemons)
+        except (AttributeError, RuntimeError, ValueError) as e:
+            return self.__erroDistribuicao(sd, e)
+
+    def __persistirDistribuicao(self, idJogador: str, pokemons: list[Pokemon]):
+        jogador = Jogador(id=idJogador, pokemons=pokemons)
+
+        # Jogador, pokémons e vínculos vão juntos em uma única transação.
+        # Se ela falhar (ValueError), a distribuição inteira é respondida como erro
+        try:
+            self.__bd.adicionarDistribuicao(jogador, pokemons)
+        finally:
+            self.__invalidarTime(idJogador)
+
+    def __respostaDistribuicao(self, sd: StatusDistribuicao, pokemons: list[Pokemon]) -> dict:
+        sd.set_status(Status.SUCESSO)
+        sd.set_mensagem("Os 5 pokémons iniciais foram gerados com sucesso.")
+        sd.set_codigo("200")
+        status = sd.get_resumo()
+        status["pokemons"] = pokemons
+        return status
+
+    def __erroDistribuicao(self, sd: StatusDistribuicao, e: Exception) -> dict:
+        sd.set_status(Status.ERRO)
+        sd.set_mensagem(f"Erro ao gerar pokémons iniciais: {e}")
+        sd.set_codigo("500")
+        return sd.get_resumo()
+
+    def gerarPokemonsIniciaisEmLote(self, idsJogadores: list[str], tamanho_lote: int = DISTRIBUICAO_LOTE_TAMANHO):
+        """Distribui os pokémons iniciais de vários jogadores, gerando um resultado por jogador.
+
+        Um único sorteio para todos, uma busca de nome por espécie sorteada (e não
+        por carta) e uma transação a cada `tamanho_lote` jogadores. Os resultados
+        saem à medida que cada transação termina.
+        """
+        idsJogadores = list(dict.fromkeys(idsJogadores))
+        try:
+            sorteados = self.__sortearLote(len(idsJogadores))
+        except (AttributeError, RuntimeError, ValueError) as e:
+            for idJogador in idsJogadores:
+                yield {"player_id": idJogador, **self.__erroDistribuicao(StatusDistribuicao(), e)}
+            return
+
+        for inicio in range(0, len(idsJogadores), tamanho_lote):
+            jogadores = []
+            resultados = []
+            for idJogador, pokemons in zip(idsJogadores[inicio:inicio + tamanho_lote], sorteados[inicio:inicio + tamanho_lote]):
+                if pokemons is None:
+                    erro = RuntimeError("limite de tentativas de sorteio atingido")
+                    resultados.append({"player_id": idJogador, **self.__erroDistribuicao(StatusDistribuicao(), erro)})
+                    continue
+                jogadores.append(Jogador(id=idJogador, pokemons=pokemons))
+                resultados.append({"player_id": idJogador, **self.__respostaDistribuicao(StatusDistribuicao(), pokemons)})
+
             try:
-                for p in pokemons:
-                    self.__bd.adicionarPokemonAoJogador(jogador.get_id(), p)
+                self.__bd.adicionarDistribuicoesEmLote(jogadores)
             except ValueError as e:
                 print(f"Erro: {e}")
-            #------------------------------------------------------------------------
+                erros = {j.get_id() for j in jogadores}
+                resultados = [
+                    {"player_id": r["player_id"], **self.__erroDistribuicao(StatusDistribuicao(), e)} if r["player_id"] in erros else r
+                    for r in resultados
+                ]
+            finally:
+                for jogador in jogadores:
+                    self.__invalidarTime(jogador.get_id())
 
+            yield from resultados
 
-            sd.set_status(Status.SUCESSO)
-            sd.set_mensagem("Os 5 pokémons iniciais foram gerados com sucesso.")
-            sd.set_codigo("200")
-            status = sd.get_resumo()
-            status["pokemons"] = pokemons
-            return status
-        except AttributeError as e:
-            sd.set_status(Status.ERRO)
-            sd.set_mensagem(f"Erro ao gerar pokémons iniciais: {e}")
-            sd.set_codigo("500")
-            return sd.get_resumo()
+    def __sortearLote(self, quantidade: int) -> list[list[Pokemon] | None]:
+        """Sorteia as cartas de `quantidade` jogadores; None para quem não pôde ser atendido."""
+        max_id = self.__api.getMaxID()
+        ids, shiny = self.__sorteio.sortear(quantidade, max_id)
+
+        # Cada espécie sorteada é buscada uma única vez, para o lote inteiro
+        nomes = {}
+        invalidos = set()
+        pendentes = list(range(quantidade))
+        while pendentes:
+            for pokemon_id in {int(i) for i in ids[pendentes].ravel()} - nomes.keys() - invalidos:
+                pokemon = self.__api.getPokemon(pokemon_id)
+                if pokemon is not None:
+                    nomes[pokemon_id] = pokemon.get_nome()
+                else:
+                    invalidos.add(pokemon_id)
+
+            # Linhas com alguma espécie inválida são sorteadas de novo, sem as inválidas
+            pendentes = [linha for linha in pendentes if not invalidos.isdisjoint(ids[linha].tolist())]
+            if not pendentes or len(invalidos) > MAX_TENTATIVAS_SORTEIO:
+                break
+            ids[pendentes], shiny[pendentes] = self.__sorteio.sortear(len(pendentes), max_id, excluir=invalidos)
+
+        falharam = set(pendentes)
+        return [
+            None if linha in falharam else [
+                Pokemon(numero_pokedex=int(i), nome=nomes[int(i)], shiny=bool(f))
+                for i, f in zip(ids[linha], shiny[linha])
+            ]
+            for linha in range(quantidade)
+        ]
     
     def adicionarPokemon(self, idJogador: int, pokemon: Pokemon) -> dict:
         sd = StatusDistribuicao()
@@ -84,6 +194,8 @@ class GestorCartas:
                 self.__bd.adicionarPokemonAoJogador(idJogador, pokemon)
             except ValueError as e:
                 print(f"Erro: {e}")
+            finally:
+                self.__invalidarTime(idJogador)
             #------------------------------------------------------------------------
             sd.set_status(Status.SUCESSO)
             sd.set_mensagem(f"{pokemon.get_nome()} foi adicionado à coleção do jogador {idJogador}.")
@@ -105,30 +217,125 @@ class GestorCartas:
             return sd.get_resumo()
 
 
-    def removerPokemon(self, idJogador: int, pokemon: Pokemon) :
+    def resolverPokemonLocal(self, numeroPokedex: int, shiny: bool = False) -> Pokemon | None:
+        """Resolve a espécie sem rede: catálogo/cache em memória e, depois, a tabela Pokemon."""
+        pokemon = self.__api.getPokemonLocal(numeroPokedex, shiny=shiny)
+        if pokemon is None:
+            gravado = self.__bd.buscarPokemon(numeroPokedex)
+            if gravado is not None:
+                pokemon = Pokemon(numero_pokedex=numeroPokedex, nome=gravado.get_nome(), shiny=shiny)
+        return pokemon
+
+    def resolverPokemon(self, numeroPokedex: int, shiny: bool = False) -> Pokemon | None:
+        """Como `resolverPokemonLocal`, chamando a PokeAPI só quando ninguém conhece a espécie."""
+        pokemon = self.resolverPokemonLocal(numeroPokedex, shiny)
+        if pokemon is None:
+            pokemon = self.__api.getPokemon(numeroPokedex, shiny=shiny)
+        return pokemon
+
+    def removerPokemon(self, idJogador: int, pokemon: Pokemon | int) :
+        """Remove a carta do jogador. Basta o número da pokédex: nada é buscado na PokeAPI."""
         sd = StatusDistribuicao()
+        if isinstance(pokemon, Pokemon):
+            numero, nome = pokemon.get_numero_pokedex(), pokemon.get_nome()
+        else:
+            numero = pokemon
+            # O nome só entra na mensagem: vem da memória, se já for conhecido
+            conhecido = self.__api.getPokemonLocal(numero)
+            nome = conhecido.get_nome() if conhecido is not None else f"Pokémon {numero}"
         try:
-            self.__bd.removerPokemonDoJogador(idJogador, pokemon.get_numero_pokedex())
+            self.__bd.removerPokemonDoJogador(idJogador, numero)
         except ValueError as e:
             print(f"Erro: {e}")
+        finally:
+            self.__invalidarTime(idJogador)
         sd.set_status(Status.SUCESSO)
-        sd.set_mensagem(f"{pokemon.get_nome()} foi removido da coleção do jogador {idJogador}.")
+        sd.set_mensagem(f"{nome} foi removido da coleção do jogador {idJogador}.")
         sd.set_codigo("200")
         return sd.get_resumo()
     
-    def listarTime(self, idJogador: str):
+    def trocarPokemons(self, idRemetente: str, idPokemonRemetente: int, idDestinatario: str, idPokemonDestinatario: int) -> dict:
+        """Troca um pokémon do remetente por um do destinatário, atomicamente."""
+        sd = StatusDistribuicao()
         try:
-            # 1. Busca a lista de objetos Pokemon (Do domínio) usando o método existente no BD
-            # Isso retorna uma lista de objetos da classe Pokemon
-            lista_pokemons_dominio = self.__bd.getPokemonsDoJogador(idJogador)
-
-            # 2. Transforma os objetos de domínio em dicionários simples para o JSON
-            lista_formatada = []
-            for pokemon in lista_pokemons_dominio:
-                lista_formatada.append({
-                    "pokemon_name": pokemon.get_nome(),
-                    "is_shiny": pokemon.is_shiny()
-                })
+            self.__bd.trocarPokemons(idRemetente, idPokemonRemetente, idDestinatario, idPokemonDestinatario)
+            sd.set_status(Status.SUCESSO)
+            sd.set_mensagem(
+                f"Troca realizada: {idRemetente} recebeu o Pokémon {idPokemonDestinatario} "
+                f"e {idDestinatario} recebeu o Pokémon {idPokemonRemetente}."
+            )
+            sd.set_codigo("200")
+        except ValueError as e:
+            # Erros esperados (jogador não possui o pokémon, destino já possui, concorrência, etc)
+            sd.set_status(Status.ERRO)
+            sd.set_mensagem(str(e))
+            sd.set_codigo("400")
+        finally:
+            self.__invalidarTime(idRemetente)
+            self.__invalidarTime(idDestinatario)
+        return sd.get_resumo()
+
+    def substituirPokemon(self, idJogador: str, idRemovido: int, idAdicionado: int, shinyAdicionado: bool = False, chave: str = None) -> dict:
+        """Troca um pokémon do jogador por outro (remoção + adição em uma transação).
+
+        Com `chave` (Idempotency-Key), repetições da mesma requisição devolvem a
+        resposta original sem aplicar a troca de novo.
+        """
+        sd = StatusDistribuicao()
+        try:
+            if chave is not None:
+                resposta_gravada = self.__bd.buscarRespostaIdempotente(chave, idJogador)
+                if resposta_gravada is not None:
+                    return resposta_gravada
+
+            # Catálogo, cache e tabela Pokemon antes da PokeAPI
+            pokemon_novo = self.resolverPokemon(idAdicionado, shiny=shinyAdicionado)
+            if pokemon_novo is None:
+                raise ValueError(f"Pokémon com ID {idAdicionado} não encontrado")
+
+            sd.set_status(Status.SUCESSO)
+            sd.set_mensagem(
+                f"Pokémon {idRemovido} trocado por {pokemon_novo.get_nome()} na coleção do jogador {idJogador}."
+            )
+            sd.set_codigo("200")
+            try:
+                return self.__bd.substituirPokemonDoJogador(idJogador, idRemovido, pokemon_novo, sd.get_resumo(), chave)
+            finally:
+                self.__invalidarTime(idJogador)
+        except ValueError as e:
+            sd.set_status(Status.ERRO)
+            sd.set_mensagem(str(e))
+            sd.set_codigo("400")
+            return sd.get_resumo()
+
+    @staticmethod
+    def __formatarPokemon(pokemon: Pokemon) -> dict:
+        return {
+            "pokemon_name": pokemon.get_nome(),
+            "is_shiny": pokemon.is_shiny()
+        }
+
+    def listarTime(self, idJogador: str, limite: int = None, cursor: int = None):
+        if limite is not None:
+            return self.listarPaginaTime(idJogador, limite, cursor)
+        try:
+            # 0. Tenta o cache de times (invalidado a cada escrita no time do jogador)
+            lista_formatada = None
+            if self.__cache_times is not None:
+                lista_formatada = self.__cache_times.obter(idJogador)
+
+            if lista_formatada is None:
+                # Geração lida antes do banco: se uma escrita invalidar o time no meio, o resultado não vai para o cache
+                geracao = self.__cache_times.geracao(idJogador) if self.__cache_times is not None else None
+                # 1. Busca as linhas (id, nome, shiny) direto do banco, sem objetos ORM nem de domínio
+                # 2. e monta cada item da resposta a partir da tupla
+                lista_formatada = [
+                    {"pokemon_name": nome, "is_shiny": shiny}
+                    for _, nome, shiny in self.__bd.getLinhasTimeDoJogador(idJogador)
+                ]
+
+                if self.__cache_times is not None:
+                    self.__cache_times.definir(idJogador, lista_formatada, geracao)
 
             # 3. Monta a resposta no formato exato solicitado
             return {
@@ -153,4 +360,39 @@ class GestorCartas:
                 "status": 500,
                 "message": f"Erro interno ao listar time: {str(e)}",
                 "data": {}
-            }
\ No newline at end of file
+            }
+
+    def listarPaginaTime(self, idJogador: str, limite: int, cursor: int = None):
+        """Uma página do time (keyset em idPokemon); `next_cursor` é None na última página."""
+        try:
+            pokemons, proximo = self.__bd.getPaginaPokemonsDoJogador(idJogador, limite, cursor)
+            return {
+                "status": 200,
+                "message": "Time adquirido com sucesso",
+                "data": {
+                    "player": idJogador,
+                    "operation": "LIST_TEAM",
+                    "team": [self.__formatarPokemon(pokemon) for pokemon in pokemons],
+                    "next_cursor": proximo
+                }
+            }
+        except ValueError as e:
+            return {
+                "status": 404,
+                "message": str(e),
+                "data": {}
+            }
+        except Exception as e:
+            return {
+                "status": 500,
+                "message": f"Erro interno ao listar time: {str(e)}",
+                "data": {}
+            }
+
+    def existeJogador(self, idJogador: str) -> bool:
+        return self.__bd.jogadorExiste(idJogador)
+
+    def iterarTime(self, idJogador: str, tamanho_lote: int = 500):
+        """Gera o time item a item, lendo do banco em lotes (memória constante)."""
+        for _, nome, shiny in self.__bd.iterarLinhasDoJogador(idJogador, tamanho_lote):
+            yield {"pokemon_name": nome, "is_shiny": shiny}
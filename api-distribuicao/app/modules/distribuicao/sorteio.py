@@ -0,0 +1,143 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+from shared.metricas import cronometrar
+
+SORTEIO_SEMENTE = int(os.environ["SORTEIO_SEMENTE"]) if os.environ.get("SORTEIO_SEMENTE") else None
+SORTEIO_PESOS_ARQUIVO = os.environ.get("SORTEIO_PESOS_ARQUIVO") or None
+CHANCE_SHINY = 1 / 256
+CARTAS_POR_DISTRIBUICAO = 5
+
+
+class MotorSorteio:
+    """Sorteia, de uma vez, os IDs únicos e as flags de shiny de muitas distribuições.
+
+    Sem pesos, cada linha é uma amostra uniforme sem reposição (linhas com IDs
+    repetidos são sorteadas de novo). Com pesos de raridade, sorteia carta a
+    carta pela distribuição acumulada, ressorteando só as posições que colidem
+    com cartas já escolhidas na linha. Quando poucas espécies concentram o peso
+    (colisões frequentes), usa Gumbel-top-k em blocos. Peso 0 exclui a espécie.
+
+    Com a mesma `semente`, a mesma sequência de chamadas produz exatamente os
+    mesmos sorteios (auditoria).
+
+    `invalidos` (ex.: o CacheNegativo do GestorAPI) informa, a cada sorteio, IDs
+    que a PokeAPI não reconhece; eles são excluídos antes de qualquer chamada.
+    """
+
+    def __init__(self, semente: int | None = None, pesos: dict[int, float] = None, chance_shiny: float = CHANCE_SHINY, tamanho_bloco: int = 4096, invalidos=None):
+        self.semente = semente
+        self.invalidos = invalidos
+        self.pesos = dict(pesos or {})
+        self.chance_shiny = chance_shiny
+        self.tamanho_bloco = tamanho_bloco
+        self.__rng = np.random.default_rng(semente)
+        self.__lock = threading.Lock()  # o Generator do NumPy não é seguro entre threads
+        self.__cache_pesos = None  # (max_id, vetor de log-pesos)
+
+    def carregarPesos(self, caminho: str) -> int:
+        """Carrega pesos de raridade no formato {"150": 0.05, ...}."""
+        with open(caminho, encoding="utf-8") as f:
+            self.pesos = {int(id_especie): float(peso) for id_especie, peso in json.load(f).items()}
+        self.__cache_pesos = None
+        return len(self.pesos)
+
+    def __logPesos(self, max_id: int) -> np.ndarray:
+        if self.__cache_pesos is None or self.__cache_pesos[0] != max_id:
+            pesos = np.ones(max_id)
+            for id_especie, peso in self.pesos.items():
+                if 1 <= id_especie <= max_id:
+                    pesos[id_especie - 1] = peso
+            with np.errstate(divide="ignore"):
+                self.__cache_pesos = (max_id, np.log(pesos))
+        return self.__cache_pesos[1]
+
+    @cronometrar("sorteio")
+    def sortear(self, quantidade: int, max_id: int, k: int = CARTAS_POR_DISTRIBUICAO, excluir=()) -> tuple[np.ndarray, np.ndarray]:
+        """Retorna (ids, shiny), ambos com formato (quantidade, k)."""
+        if k <= 0 or quantidade <= 0:
+            return np.empty((max(quantidade, 0), max(k, 0)), dtype=np.int64), np.empty((max(quantidade, 0), max(k, 0)), dtype=bool)
+
+        if self.invalidos is not None:
+            excluir = set(excluir).union(self.invalidos.ids())
+        excluir = [i for i in set(excluir) if 1 <= i <= max_id]
+        # Poucos excluídos sem pesos: continua uniforme, rejeitando as linhas com algum excluído
+        uniforme = not self.pesos and len(excluir) * k <= max_id
+
+        if uniforme:
+            log_pesos = None
+            disponiveis = max_id - len(excluir)
+        else:
+            log_pesos = self.__logPesos(max_id)
+            if excluir:
+                log_pesos = log_pesos.copy()
+                log_pesos[np.asarray(excluir) - 1] = -np.inf
+            disponiveis = int(np.isfinite(log_pesos).sum())
+
+        if disponiveis < k:
+            raise ValueError(f"Apenas {disponiveis} espécies disponíveis para sortear {k} cartas")
+
+        with self.__lock:
+            # Rejeição só compensa quando colisões são raras (k² pequeno perto do total)
+            if uniforme and k * k <= max_id:
+                ids = self.__sortearUniforme(quantidade, max_id, k, np.asarray(excluir, dtype=np.int64))
+            else:
+                if log_pesos is None:
+                    log_pesos = self.__logPesos(max_id)
+                    if excluir:
+                        log_pesos = log_pesos.copy()
+                        log_pesos[np.asarray(excluir) - 1] = -np.inf
+                pesos = np.exp(log_pesos)
+                pesos /= pesos.sum()
+                # Peso somado das k-1 espécies mais prováveis: chance máxima de colisão por carta
+                concentracao = np.partition(pesos, pesos.size - k + 1)[pesos.size - k + 1:].sum() if k > 1 else 0.0
+                if concentracao <= 0.5:
+                    ids = self.__sortearPorCarta(quantidade, pesos, k)
+                else:
+                    ids = self.__sortearGumbel(quantidade, log_pesos, k)
+            shiny = self.__rng.random((quantidade, k)) < self.chance_shiny
+        return ids, shiny
+
+    def __sortearUniforme(self, quantidade: int, max_id: int, k: int, excluir: np.ndarray) -> np.ndarray:
+        ids = self.__rng.integers(1, max_id + 1, size=(quantidade, k))
+        while True:
+            ordenados = np.sort(ids, axis=1)
+            rejeitadas = (ordenados[:, 1:] == ordenados[:, :-1]).any(axis=1)
+            if excluir.size:
+                rejeitadas |= np.isin(ids, excluir).any(axis=1)
+            total = int(rejeitadas.sum())
+            if total == 0:
+                return ids
+            ids[rejeitadas] = self.__rng.integers(1, max_id + 1, size=(total, k))
+
+    def __sortearPorCarta(self, quantidade: int, pesos: np.ndarray, k: int) -> np.ndarray:
+        acumulado = np.cumsum(pesos)
+        acumulado /= acumulado[-1]
+
+        def sortearIndices(total: int) -> np.ndarray:
+            indices = np.searchsorted(acumulado, self.__rng.random(total), side="right")
+            return np.minimum(indices, acumulado.size - 1)
+
+        ids = np.empty((quantidade, k), dtype=np.int64)
+        for coluna in range(k):
+            ids[:, coluna] = sortearIndices(quantidade)
+            repetidas = (ids[:, :coluna] == ids[:, coluna:coluna + 1]).any(axis=1)
+            while repetidas.any():
+                linhas = np.flatnonzero(repetidas)
+                ids[linhas, coluna] = sortearIndices(linhas.size)
+                repetidas[linhas] = (ids[linhas, :coluna] == ids[linhas, coluna:coluna + 1]).any(axis=1)
+        return ids + 1
+
+    def __sortearGumbel(self, quantidade: int, log_pesos: np.ndarray, k: int) -> np.ndarray:
+        ids = np.empty((quantidade, k), dtype=np.int64)
+        for inicio in range(0, quantidade, self.tamanho_bloco):
+            fim = min(inicio + self.tamanho_bloco, quantidade)
+            chaves = self.__rng.gumbel(size=(fim - inicio, log_pesos.size)) + log_pesos
+            melhores = np.argpartition(-chaves, k - 1, axis=1)[:, :k]
+            # Ordena os k escolhidos pela chave: equivale a sortear um por um sem reposição
+            ordem = np.argsort(-np.take_along_axis(chaves, melhores, axis=1), axis=1)
+            ids[inicio:fim] = np.take_along_axis(melhores, ordem, axis=1) + 1
+        return ids
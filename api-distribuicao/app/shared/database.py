@@ -1,5 +1,5 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.orm import declarative_base
 from dotenv import load_dotenv
@@ -12,14 +12,73 @@ DB_HOST = os.environ.get("DB_HOST", "localhost")
 DB_PORT = os.environ.get("DB_PORT", "3306")
 DB_NAME = os.environ.get("DB_NAME", "distribuicao_de_cartas")
 
+# Configuração do pool de conexões
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))  # abaixo do wait_timeout do MySQL
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "sim")
+
 DB_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-engine = create_engine(DB_URL)
+engine = create_engine(
+    DB_URL,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+)
 
 Base = declarative_base()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-try:
-    engine.connect()
-    print("Conexão com o banco concluída com sucesso.")
-except Exception as e:
-    print(f"Erro ao conectar ao banco de dados: {e}")
\ No newline at end of file
+class ContadorPool:
+    """Conta checkouts/checkins de conexões de um engine."""
+
+    def __init__(self, engine_alvo):
+        self.checkouts = 0
+        self.checkins = 0
+        event.listen(engine_alvo, "checkout", self.__checkout)
+        event.listen(engine_alvo, "checkin", self.__checkin)
+
+    def __checkout(self, *args):
+        self.checkouts += 1
+
+    def __checkin(self, *args):
+        self.checkins += 1
+
+contador_pool = ContadorPool(engine)
+
+def get_db():
+    """Dependência do FastAPI: uma sessão por requisição, sempre fechada ao final."""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def estatisticasPool(engine_alvo=None, contador: ContadorPool = None) -> dict:
+    """Estado atual do pool de conexões (em uso, ociosas, overflow) e total de checkouts."""
+    engine_alvo = engine_alvo if engine_alvo is not None else engine
+    contador = contador if contador is not None else contador_pool
+    pool = engine_alvo.pool
+    return {
+        "tamanho": pool.size(),
+        "em_uso": pool.checkedout(),
+        "ociosas": pool.checkedin(),
+        "overflow": max(0, pool.overflow()),  # o QueuePool conta negativo enquanto há vagas
+        "max_overflow": getattr(pool, "_max_overflow", 0),
+        "checkouts": contador.checkouts,
+        "checkins": contador.checkins,
+    }
+
+def testarConexao() -> bool:
+    """Abre e devolve uma conexão ao pool para verificar se o banco responde."""
+    try:
+        with engine.connect():
+            pass
+        print("Conexão com o banco concluída com sucesso.")
+        return True
+    except Exception as e:
+        print(f"Erro ao conectar ao banco de dados: {e}")
+        return False
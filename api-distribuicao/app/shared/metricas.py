@@ -0,0 +1,211 @@
+import functools
+import inspect
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Ligadas por padrão: o custo por chamada é um perf_counter e um lock curto
+METRICAS_ATIVAS = os.environ.get("METRICAS_ATIVAS", "true").lower() not in ("0", "false", "nao", "não")
+
+# Limites dos buckets (segundos): de acertos no catálogo (µs) a chamadas HTTP lentas
+BUCKETS_PADRAO = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _formatarRotulos(nomes: tuple, valores: tuple, extra: str = "") -> str:
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _formatarNumero(valor) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(int(valor))
+
+class Contador:
+    """Contador monotônico, com uma série por combinação de rótulos."""
+    tipo = "counter"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: tuple = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self.__series: dict[tuple, float] = {}
+        self.__lock = threading.Lock()
+
+    def incrementar(self, *valores_rotulos, valor: float = 1):
+        with self.__lock:
+            self.__series[valores_rotulos] = self.__series.get(valores_rotulos, 0) + valor
+
+    def valor(self, *valores_rotulos) -> float:
+        return self.__series.get(valores_rotulos, 0)
+
+    def exportar(self) -> list[str]:
+        with self.__lock:
+            series = sorted(self.__series.items())
+        return [f"{self.nome}{_formatarRotulos(self.rotulos, r)} {_formatarNumero(v)}" for r, v in series]
+
+class Histograma:
+    """Histograma de durações com buckets fixos (contagens acumuladas só na exportação)."""
+    tipo = "histogram"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: tuple = (), buckets: tuple = BUCKETS_PADRAO):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self.buckets = tuple(sorted(buckets))
+        # Por série: [contagem por bucket (+Inf no fim), soma, total]
+        self.__series: dict[tuple, list] = {}
+        self.__lock = threading.Lock()
+
+    def observar(self, valor: float, *valores_rotulos):
+        indice = bisect_left(self.buckets, valor)
+        with self.__lock:
+            serie = self.__series.get(valores_rotulos)
+            if serie is None:
+                serie = self.__series[valores_rotulos] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            serie[0][indice] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def contagem(self, *valores_rotulos) -> int:
+        serie = self.__series.get(valores_rotulos)
+        return serie[2] if serie else 0
+
+    def exportar(self) -> list[str]:
+        with self.__lock:
+            series = sorted((r, (list(s[0]), s[1], s[2])) for r, s in self.__series.items())
+        linhas = []
+        for rotulos, (contagens, soma, total) in series:
+            acumulado = 0
+            for limite, contagem in zip(self.buckets + (float("inf"),), contagens):
+                acumulado += contagem
+                le = f'le="{_formatarNumero(float(limite))}"'
+                linhas.append(f"{self.nome}_bucket{_formatarRotulos(self.rotulos, rotulos, le)} {acumulado}")
+            linhas.append(f"{self.nome}_sum{_formatarRotulos(self.rotulos, rotulos)} {_formatarNumero(soma)}")
+            linhas.append(f"{self.nome}_count{_formatarRotulos(self.rotulos, rotulos)} {total}")
+        return linhas
+
+class RegistroMetricas:
+    """Registro das métricas do processo e exportação no formato texto do Prometheus."""
+
+    def __init__(self):
+        self.__metricas: dict[str, Contador | Histograma] = {}
+        self.__lock = threading.Lock()
+
+    def __registrar(self, classe, nome: str, ajuda: str, **kwargs):
+        with self.__lock:
+            if nome not in self.__metricas:
+                self.__metricas[nome] = classe(nome, ajuda, **kwargs)
+            return self.__metricas[nome]
+
+    def contador(self, nome: str, ajuda: str, rotulos: tuple = ()) -> Contador:
+        return self.__registrar(Contador, nome, ajuda, rotulos=rotulos)
+
+    def histograma(self, nome: str, ajuda: str, rotulos: tuple = (), buckets: tuple = BUCKETS_PADRAO) -> Histograma:
+        return self.__registrar(Histograma, nome, ajuda, rotulos=rotulos, buckets=buckets)
+
+    def exportar(self) -> str:
+        linhas = []
+        for metrica in list(self.__metricas.values()):
+            linhas.append(f"# HELP {metrica.nome} {metrica.ajuda}")
+            linhas.append(f"# TYPE {metrica.nome} {metrica.tipo}")
+            linhas.extend(metrica.exportar())
+        return "\n".join(linhas) + "\n"
+
+registro = RegistroMetricas()
+
+duracao_operacoes = registro.histograma(
+    "distribuicao_operacao_duracao_segundos", "Duração das operações por componente",
+    rotulos=("componente", "operacao"),
+)
+erros_operacoes = registro.contador(
+    "distribuicao_operacao_erros_total", "Exceções lançadas pelas operações, por tipo",
+    rotulos=("componente", "operacao", "erro"),
+)
+
+def cronometrar(componente: str, operacao: str = None):
+    """Decorador: mede a duração e conta as exceções de uma função (sync, async ou geradora).
+
+    Nas funções geradoras o tempo vai da criação até o fim da iteração.
+    """
+    def decorador(funcao):
+        if not METRICAS_ATIVAS:
+            return funcao
+        nome = operacao or funcao.__name__
+
+        def registrarErro(e: BaseException):
+            erros_operacoes.incrementar(componente, nome, type(e).__name__)
+
+        if inspect.iscoroutinefunction(funcao):
+            @functools.wraps(funcao)
+            async def envoltorio_async(*args, **kwargs):
+                inicio = time.perf_counter()
+                try:
+                    return await funcao(*args, **kwargs)
+                except Exception as e:
+                    registrarErro(e)
+                    raise
+                finally:
+                    duracao_operacoes.observar(time.perf_counter() - inicio, componente, nome)
+            return envoltorio_async
+
+        if inspect.isgeneratorfunction(funcao):
+            @functools.wraps(funcao)
+            def envoltorio_gerador(*args, **kwargs):
+                inicio = time.perf_counter()
+                try:
+                    return (yield from funcao(*args, **kwargs))
+                except Exception as e:
+                    registrarErro(e)
+                    raise
+                finally:
+                    duracao_operacoes.observar(time.perf_counter() - inicio, componente, nome)
+            return envoltorio_gerador
+
+        @functools.wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return funcao(*args, **kwargs)
+            except Exception as e:
+                registrarErro(e)
+                raise
+            finally:
+                duracao_operacoes.observar(time.perf_counter() - inicio, componente, nome)
+        return envoltorio
+    return decorador
+
+def instrumentar(componente: str):
+    """Decorador de classe: aplica `cronometrar` a todos os métodos públicos da classe."""
+    def decorador(classe):
+        for nome, atributo in list(vars(classe).items()):
+            if not nome.startswith("_") and inspect.isfunction(atributo):
+                setattr(classe, nome, cronometrar(componente, nome)(atributo))
+        return classe
+    return decorador
+
+def exportarEstado(prefixo: str, ajuda: str, valores: dict) -> str:
+    """Converte um dict de `metricas()` em gauges do Prometheus.
+
+    Números viram `prefixo_chave`; textos (ex.: estado do disjuntor) viram
+    `prefixo_chave{valor="..."} 1`; dicts aninhados ganham o rótulo `chave`.
+    """
+    linhas = []
+    for chave, valor in valores.items():
+        nome = f"{prefixo}_{chave}"
+        if isinstance(valor, dict):
+            series = [(f'{{chave="{_escapar(k)}"}}', v) for k, v in valor.items() if isinstance(v, (int, float))]
+        elif isinstance(valor, (bool, int, float)):
+            series = [("", valor)]
+        elif valor is not None:
+            series = [(f'{{valor="{_escapar(valor)}"}}', 1)]
+        else:
+            continue
+        linhas.append(f"# HELP {nome} {ajuda}")
+        linhas.append(f"# TYPE {nome} gauge")
+        linhas.extend(f"{nome}{rotulos} {_formatarNumero(v)}" for rotulos, v in series)
+    return "\n".join(linhas) + "\n" if linhas else ""
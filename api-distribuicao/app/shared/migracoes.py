@@ -0,0 +1,85 @@
+"""Migrações versionadas do esquema: arquivos `migracoes/NNN_descricao.sql`.
+
+Cada arquivo é aplicado uma única vez, em ordem, e registrado na tabela
+VersaoEsquema. Uso: python -m shared.migracoes
+"""
+import os
+import re
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, insert, select
+from sqlalchemy.pool import SingletonThreadPool, StaticPool
+
+PASTA_MIGRACOES = os.path.join(os.path.dirname(os.path.dirname(__file__)), "migracoes")
+# Aplica as migrações pendentes ao subir a API (senão, rode o comando acima no deploy)
+MIGRACOES_AUTOMATICAS = os.environ.get("MIGRACOES_AUTOMATICAS", "false").lower() in ("1", "true", "sim")
+
+_ARQUIVO_MIGRACAO = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+# Fora do Base: não é criada pelo create_all dos modelos
+versao_esquema = Table(
+    "VersaoEsquema", MetaData(),
+    Column("versao", Integer, primary_key=True, autoincrement=False),
+    Column("nome", String(100), nullable=False),
+    Column("aplicadaEm", DateTime, nullable=False, server_default=func.now()),
+)
+
+def listarMigracoes(pasta: str = PASTA_MIGRACOES) -> list[tuple[int, str, str]]:
+    """(versão, nome, caminho) de cada arquivo de migração, em ordem de versão."""
+    migracoes = {}
+    for arquivo in os.listdir(pasta):
+        encontrado = _ARQUIVO_MIGRACAO.match(arquivo)
+        if encontrado is None:
+            continue
+        versao = int(encontrado.group(1))
+        if versao in migracoes:
+            raise ValueError(f"Versão de migração {versao} repetida: {migracoes[versao][1]} e {arquivo}")
+        migracoes[versao] = (versao, encontrado.group(2), os.path.join(pasta, arquivo))
+    return [migracoes[versao] for versao in sorted(migracoes)]
+
+def lerStatements(caminho: str) -> list[str]:
+    """Statements de um arquivo SQL: ignora comentários `--` e separa por `;`."""
+    with open(caminho, encoding="utf-8") as f:
+        linhas = [linha for linha in f if not linha.lstrip().startswith("--")]
+    return [statement.strip() for statement in "".join(linhas).split(";") if statement.strip()]
+
+def versoesAplicadas(conn) -> set[int]:
+    with conn.begin():
+        versao_esquema.create(conn, checkfirst=True)
+        return set(conn.scalars(select(versao_esquema.c.versao)))
+
+def aplicarMigracoes(engine_alvo=None, pasta: str = PASTA_MIGRACOES) -> list[int]:
+    """Aplica as migrações pendentes e devolve as versões aplicadas agora.
+
+    Cada arquivo roda em uma transação própria; a versão só é registrada se
+    todos os statements passarem. (No MySQL, DDL faz commit implícito: uma
+    migração que falhe no meio precisa ser corrigida à mão.)
+
+    Os arquivos podem mudar variáveis da sessão (ex.: FOREIGN_KEY_CHECKS), então
+    a conexão usada é descartada no fim, em vez de voltar ao pool da aplicação.
+    """
+    if engine_alvo is None:
+        from shared.database import engine as engine_alvo
+    conn = engine_alvo.connect()
+    try:
+        aplicadas = versoesAplicadas(conn)
+        novas = []
+        for versao, nome, caminho in listarMigracoes(pasta):
+            if versao in aplicadas:
+                continue
+            with conn.begin():
+                for statement in lerStatements(caminho):
+                    conn.exec_driver_sql(statement)
+                conn.execute(insert(versao_esquema).values(versao=versao, nome=nome))
+            print(f"Migração {versao:03d}_{nome} aplicada.")
+            novas.append(versao)
+        return novas
+    finally:
+        # Pools de conexão única (SQLite em memória) perderiam o próprio banco
+        if not isinstance(engine_alvo.pool, (SingletonThreadPool, StaticPool)):
+            conn.invalidate()
+        conn.close()
+
+if __name__ == "__main__":
+    aplicadas = aplicarMigracoes()
+    if not aplicadas:
+        print("Esquema já está na versão mais recente.")
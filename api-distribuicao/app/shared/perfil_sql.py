@@ -0,0 +1,77 @@
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+# Modo de depuração: conta os statements SQL de cada requisição HTTP
+PERFIL_SQL = os.environ.get("PERFIL_SQL", "false").lower() in ("1", "true", "sim")
+# Acima deste número de statements a requisição é logada (com os repetidos)
+PERFIL_SQL_LIMITE = int(os.environ.get("PERFIL_SQL_LIMITE", "10"))
+
+class PerfilSQL:
+    """Statements executados dentro de um escopo (ex.: uma requisição) e o tempo gasto neles."""
+
+    def __init__(self):
+        self.statements: list[str] = []
+        self.tempo = 0.0
+
+    @property
+    def total(self) -> int:
+        return len(self.statements)
+
+    def duplicados(self) -> dict[str, int]:
+        """Statements repetidos (mesmo SQL, parâmetros quaisquer): o sintoma de um N+1."""
+        return {sql: n for sql, n in Counter(self.statements).items() if n > 1}
+
+    def resumo(self) -> str:
+        linhas = [f"{self.total} statements SQL em {self.tempo * 1000:.1f}ms"]
+        for sql, n in sorted(self.duplicados().items(), key=lambda item: -item[1]):
+            linhas.append(f"  {n}x {' '.join(sql.split())[:200]}")
+        return "\n".join(linhas)
+
+_perfil_atual: ContextVar[PerfilSQL | None] = ContextVar("perfil_sql", default=None)
+
+def _antesDoStatement(conn, cursor, statement, parameters, context, executemany):
+    if _perfil_atual.get() is not None:
+        conn.info.setdefault("perfil_sql_inicio", []).append(time.perf_counter())
+
+def _depoisDoStatement(conn, cursor, statement, parameters, context, executemany):
+    perfil = _perfil_atual.get()
+    inicios = conn.info.get("perfil_sql_inicio")
+    if perfil is None or not inicios:
+        return
+    perfil.tempo += time.perf_counter() - inicios.pop()
+    perfil.statements.append(statement)
+
+def instalarPerfilador(engine_alvo):
+    """Registra os eventos do engine. Sem um `perfilar()` ativo, o custo é só ler a ContextVar."""
+    if not event.contains(engine_alvo, "before_cursor_execute", _antesDoStatement):
+        event.listen(engine_alvo, "before_cursor_execute", _antesDoStatement)
+        event.listen(engine_alvo, "after_cursor_execute", _depoisDoStatement)
+
+@contextmanager
+def perfilar():
+    """Coleta os statements executados no contexto atual (inclusive em threads do threadpool do FastAPI)."""
+    perfil = PerfilSQL()
+    token = _perfil_atual.set(perfil)
+    try:
+        yield perfil
+    finally:
+        _perfil_atual.reset(token)
+
+async def middlewarePerfilSQL(request, call_next):
+    """Middleware HTTP: devolve a contagem em `X-SQL-Queries` e loga requisições acima do limite.
+
+    Respostas em streaming só contam os statements feitos antes do primeiro byte.
+    """
+    with perfilar() as perfil:
+        resposta = await call_next(request)
+    resposta.headers["X-SQL-Queries"] = str(perfil.total)
+    resposta.headers["X-SQL-Duplicadas"] = str(sum(n - 1 for n in perfil.duplicados().values()))
+    resposta.headers["X-SQL-Tempo-Ms"] = f"{perfil.tempo * 1000:.1f}"
+    if perfil.total > PERFIL_SQL_LIMITE:
+        print(f"Aviso: {request.method} {request.url.path} acima do limite de {PERFIL_SQL_LIMITE} statements SQL: {perfil.resumo()}")
+    return resposta
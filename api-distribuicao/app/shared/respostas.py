@@ -0,0 +1,35 @@
+import json
+import os
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional: sem ele, cai no json da biblioteca padrão
+    orjson = None
+
+# Opt-in: com a resposta rápida ligada, os handlers devolvem o dict já no formato
+# final direto para o encoder, sem a validação do response_model a cada requisição
+RESPOSTA_JSON_RAPIDA = os.environ.get("RESPOSTA_JSON_RAPIDA", "false").lower() in ("1", "true", "sim")
+
+def serializarJSON(conteudo) -> bytes:
+    """Serializa para JSON compacto em UTF-8 (orjson quando instalado)."""
+    if orjson is not None:
+        return orjson.dumps(conteudo)
+    return json.dumps(conteudo, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+class RespostaJSONRapida(Response):
+    """Resposta JSON que pula o jsonable_encoder: o conteúdo já deve estar em tipos nativos."""
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return serializarJSON(content)
+
+def responder(conteudo, status_code: int = 200):
+    """Devolve o conteúdo pelo encoder rápido quando ligado; senão, deixa o FastAPI validar e serializar.
+
+    Sem o encoder rápido, o `status_code` fica a cargo do handler (ex.: `response.status_code`).
+    """
+    if RESPOSTA_JSON_RAPIDA:
+        return RespostaJSONRapida(conteudo, status_code=status_code)
+    return conteudo
@@ -0,0 +1,53 @@
+import pytest
+from sqlalchemy import create_engine, event
+from modules.distribuicao.models import Base
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+class ContadorQueries:
+    """Conta os statements SQL enviados ao banco dentro de um bloco `with`.
+
+    Com `limite`, o teste falha ao sair do bloco se forem feitos mais statements
+    do que o orçamento (mostrando quais foram).
+    """
+
+    def __init__(self, engine, limite: int = None):
+        self.engine = engine
+        self.limite = limite
+        self.statements = []
+
+    def __registrar(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        self.statements.clear()
+        event.listen(self.engine, "before_cursor_execute", self.__registrar)
+        return self
+
+    def __exit__(self, tipo_erro, *args):
+        event.remove(self.engine, "before_cursor_execute", self.__registrar)
+        if tipo_erro is None and self.limite is not None and self.total > self.limite:
+            listagem = "\n".join(f"  {' '.join(s.split())}" for s in self.statements)
+            pytest.fail(f"{self.total} statements SQL, orçamento de {self.limite}:\n{listagem}", pytrace=False)
+
+    @property
+    def total(self):
+        return len(self.statements)
+
+
+@pytest.fixture
+def contar_queries(engine):
+    return ContadorQueries(engine)
+
+
+@pytest.fixture
+def orcamento_queries(engine):
+    """Uso: `with orcamento_queries(2): repo.metodo()` falha o teste acima de 2 statements."""
+    return lambda limite: ContadorQueries(engine, limite)
@@ -0,0 +1,231 @@
+import threading
+import pytest
+from modules.distribuicao.cache import CacheEspecies, CacheMaxID, CacheNegativo, CacheTimes, IBackendCache, BackendMemoriaLRU
+
+
+class RelogioFalso:
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        return self.agora
+
+
+@pytest.fixture
+def relogio():
+    return RelogioFalso()
+
+
+def test_miss_e_hit():
+    cache = CacheEspecies()
+    assert cache.obter(25) is None
+    cache.definir(25, "pikachu")
+    assert cache.obter(25) == "pikachu"
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_eviction_remove_menos_usado():
+    cache = CacheEspecies(capacidade=2)
+    cache.definir(1, "bulbasaur")
+    cache.definir(4, "charmander")
+    cache.obter(1)  # 1 passa a ser o mais recente
+    cache.definir(7, "squirtle")
+
+    assert cache.obter(4) is None
+    assert cache.obter(1) == "bulbasaur"
+    assert cache.evictions == 1
+    assert len(cache) == 2
+
+
+def test_ttl_expira_entrada(relogio):
+    cache = CacheEspecies(ttl=10, relogio=relogio)
+    cache.definir(25, "pikachu")
+    relogio.agora = 5
+    assert cache.obter(25) == "pikachu"
+    relogio.agora = 16
+    assert cache.obter(25) is None
+
+
+def test_snapshot_salvar_e_aquecer(tmp_path):
+    arquivo = str(tmp_path / "especies.json")
+    cache = CacheEspecies(arquivo=arquivo)
+    cache.definir(1, "bulbasaur")
+    cache.definir(6, "charizard")
+    assert cache.salvar() is True
+
+    novo = CacheEspecies(arquivo=arquivo)
+    assert novo.carregar() == 2
+    assert novo.obter(6) == "charizard"
+
+
+def test_carregar_sem_arquivo():
+    assert CacheEspecies().carregar() == 0
+    assert CacheEspecies(arquivo="/nao/existe.json").carregar() == 0
+
+
+def test_metricas_hit_ratio():
+    cache = CacheEspecies()
+    cache.definir(1, "bulbasaur")
+    cache.obter(1)
+    cache.obter(2)
+    metricas = cache.metricas()
+    assert metricas["hits"] == 1
+    assert metricas["misses"] == 1
+    assert metricas["hit_ratio"] == 0.5
+
+
+# Testes do CacheMaxID
+def buscaLiberada(liberar: threading.Event, valores):
+    """Busca que só termina quando o teste liberar, para observar o valor antigo."""
+    valores = iter(valores)
+    def buscar():
+        liberar.wait(timeout=5)
+        return next(valores)
+    return buscar
+
+
+def test_cache_negativo_expira_pelo_ttl(relogio):
+    cache = CacheNegativo(ttl=60, relogio=relogio)
+    cache.marcar(10001)
+
+    assert cache.contem(10001)
+    assert not cache.contem(10002)
+    relogio.agora = 60
+    assert not cache.contem(10001)
+    assert len(cache) == 0
+
+
+def test_cache_negativo_ids_descarta_expirados(relogio):
+    cache = CacheNegativo(ttl=60, relogio=relogio)
+    cache.marcar(1)
+    relogio.agora = 30
+    cache.marcar(2)
+
+    relogio.agora = 61
+    assert cache.ids() == [2]
+    assert cache.metricas()["marcacoes"] == 2
+
+
+def test_cache_negativo_capacidade():
+    cache = CacheNegativo(capacidade=2)
+    for numero in (1, 2, 3):
+        cache.marcar(numero)
+
+    assert cache.ids() == [2, 3]
+
+
+def test_max_id_padrao_antes_da_primeira_busca(relogio):
+    liberar = threading.Event()
+    memo = CacheMaxID(buscaLiberada(liberar, [1300]), relogio=relogio)
+    assert memo.obter() == 1025
+    liberar.set()
+    memo.thread.join()
+    assert memo.obter() == 1300
+
+
+def test_max_id_nao_busca_antes_de_vencer(relogio):
+    chamadas = []
+    memo = CacheMaxID(lambda: chamadas.append(1) or 1300, intervalo=100, relogio=relogio)
+    memo.atualizar()
+    relogio.agora = 50
+    memo.obter()
+    assert len(chamadas) == 1
+    assert memo.thread is None
+
+
+def test_max_id_atualiza_em_segundo_plano_quando_vence(relogio):
+    liberar = threading.Event()
+    liberar.set()
+    memo = CacheMaxID(buscaLiberada(liberar, [1300, 1400]), intervalo=100, relogio=relogio)
+    memo.atualizar()
+    liberar.clear()
+    relogio.agora = 101
+    assert memo.obter() == 1300  # devolve o valor antigo sem esperar
+    liberar.set()
+    memo.thread.join()
+    assert memo.obter() == 1400
+
+
+def test_max_id_falha_usa_intervalo_curto(relogio):
+    memo = CacheMaxID(lambda: None, intervalo=100, intervalo_falha=10, relogio=relogio)
+    assert memo.atualizar() == 1025
+    assert memo.falhas == 1
+    relogio.agora = 5
+    memo.obter()
+    assert memo.thread is None
+    relogio.agora = 11
+    memo.obter()
+    assert memo.thread is not None
+
+
+# Testes do cache de times
+class BackendFalso(IBackendCache):
+    """Backend em dicionário, no lugar de um cache compartilhado."""
+
+    def __init__(self):
+        self.dados = {}
+
+    def obter(self, chave):
+        return self.dados.get(chave)
+
+    def definir(self, chave, valor):
+        self.dados[chave] = valor
+
+    def remover(self, chave):
+        self.dados.pop(chave, None)
+
+
+def test_backend_lru_eviction_e_ttl(relogio):
+    backend = BackendMemoriaLRU(capacidade=2, ttl=10, relogio=relogio)
+    backend.definir("a", 1)
+    backend.definir("b", 2)
+    backend.definir("c", 3)
+    assert backend.obter("a") is None
+    assert backend.evictions == 1
+
+    relogio.agora = 11
+    assert backend.obter("b") is None
+
+
+def test_cache_times_usa_backend_plugavel():
+    backend = BackendFalso()
+    cache = CacheTimes(backend)
+    cache.definir("1", [{"pokemon_name": "pikachu", "is_shiny": False}])
+
+    assert "time:1" in backend.dados
+    assert cache.obter("1") == [{"pokemon_name": "pikachu", "is_shiny": False}]
+
+    cache.invalidar("1")
+    assert cache.obter("1") is None
+    assert cache.invalidacoes == 1
+
+
+def test_cache_times_nao_grava_leitura_anterior_a_invalidacao():
+    cache = CacheTimes(BackendFalso())
+    geracao = cache.geracao("1")
+    cache.invalidar("1")  # escrita concorrente entre a leitura do banco e o definir
+
+    cache.definir("1", [{"pokemon_name": "antigo"}], geracao)
+
+    assert cache.obter("1") is None
+    assert cache.metricas()["descartadas"] == 1
+    cache.definir("1", [{"pokemon_name": "novo"}], cache.geracao("1"))
+    assert cache.obter("1") == [{"pokemon_name": "novo"}]
+
+
+def test_cache_times_geracoes_esquecidas_nao_liberam_leitura_antiga():
+    cache = CacheTimes(BackendFalso(), capacidade_geracoes=1)
+    geracao = cache.geracao("1")
+    cache.invalidar("1")
+    cache.invalidar("2")  # "1" sai do registro de gerações
+
+    cache.definir("1", [{"pokemon_name": "antigo"}], geracao)
+    assert cache.obter("1") is None
+
+
+def test_cache_times_devolve_copia():
+    cache = CacheTimes(BackendFalso())
+    cache.definir("1", [{"pokemon_name": "pikachu", "is_shiny": False}])
+    cache.obter("1").clear()
+    assert len(cache.obter("1")) == 1
@@ -0,0 +1,124 @@
+import asyncio
+import json
+import os
+import pytest
+from unittest.mock import Mock, patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from modules.distribuicao.models import Base
+from modules.distribuicao.catalogo import CatalogoEspecies, especiesDaListagem, importarCatalogo, baixarListagem
+from modules.distribuicao.external import GestorAPI, GestorAPIAsync
+from modules.distribuicao.repository import GerenciadorBD
+from modules.distribuicao.service import GestorCartas
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "pokeapi_pokemon.json")
+
+
+@pytest.fixture
+def listagem():
+    with open(FIXTURE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def db_session():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def catalogo(db_session, listagem):
+    importarCatalogo(db_session, listagem)
+    catalogo = CatalogoEspecies()
+    catalogo.carregarDoBanco(db_session)
+    return catalogo
+
+
+def test_especies_da_listagem_extrai_id_da_url(listagem):
+    especies = especiesDaListagem(listagem)
+
+    assert len(especies) == 25
+    assert especies[1] == "bulbasaur"
+    assert especies[25] == "pikachu"
+
+
+def test_importar_e_idempotente(db_session, listagem):
+    importarCatalogo(db_session, listagem)
+    importarCatalogo(db_session, listagem)
+
+    catalogo = CatalogoEspecies()
+    assert catalogo.carregarDoBanco(db_session) == 25
+
+
+def test_catalogo_consultas(catalogo):
+    assert catalogo.nome(4) == "charmander"
+    assert catalogo.nome(999) is None
+    assert 25 in catalogo
+    assert catalogo.maxID() == 25
+    assert catalogo.pokemon(25, shiny=True).is_shiny()
+
+
+def test_arquivo_compacto_ida_e_volta(catalogo, tmp_path):
+    arquivo = tmp_path / "catalogo.json"
+    catalogo.salvarArquivo(str(arquivo))
+
+    novo = CatalogoEspecies()
+    assert novo.carregarArquivo(str(arquivo)) == 25
+    assert novo.nome(7) == "squirtle"
+
+
+def test_baixar_listagem_em_uma_chamada(listagem):
+    api = Mock(spec=GestorAPI)
+    api.api_url = "https://pokeapi.co/api/v2/"
+    api.atualizarMaxID.return_value = 25
+    api._get.return_value = Mock(status_code=200, json=Mock(return_value=listagem))
+
+    assert baixarListagem(api) == listagem
+    api._get.assert_called_once_with("https://pokeapi.co/api/v2/pokemon/?limit=25&offset=0")
+
+
+@patch("requests.Session.get")
+def test_get_pokemon_sem_rede(mock_get, catalogo):
+    api = GestorAPI(catalogo=catalogo)
+
+    pokemon = api.getPokemon(25)
+
+    assert pokemon.get_nome() == "pikachu"
+    assert api.getMaxID() == 25
+    mock_get.assert_not_called()
+
+
+@patch("requests.Session.get")
+def test_get_pokemon_fora_do_catalogo_usa_api(mock_get, catalogo):
+    mock_get.return_value = Mock(status_code=200, json=Mock(return_value={"forms": [{"name": "mew"}]}))
+    api = GestorAPI(catalogo=catalogo)
+
+    assert api.getPokemon(151).get_nome() == "mew"
+    mock_get.assert_called_once()
+
+
+@patch("requests.Session.get")
+def test_distribuicao_sem_rede(mock_get, catalogo):
+    bd = Mock(spec=GerenciadorBD)
+    gestor = GestorCartas(GestorAPI(catalogo=catalogo), bd)
+
+    resultado = gestor.gerarPokemonsIniciais("jogador1")
+
+    assert resultado["status"] == "sucesso"
+    assert all(p.get_numero_pokedex() in catalogo for p in resultado["pokemons"])
+    mock_get.assert_not_called()
+
+
+def test_distribuicao_async_sem_rede(catalogo):
+    client = Mock()  # qualquer uso do cliente HTTP quebraria o teste
+    api_async = GestorAPIAsync(catalogo=catalogo, client=client)
+    gestor = GestorCartas(GestorAPI(catalogo=catalogo), Mock(spec=GerenciadorBD), api_async)
+
+    resultado = asyncio.run(gestor.gerarPokemonsIniciaisAsync("jogador1"))
+
+    assert resultado["status"] == "sucesso"
+    client.get.assert_not_called()
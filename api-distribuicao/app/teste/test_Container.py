@@ -0,0 +1,53 @@
+import threading
+from unittest.mock import Mock
+
+from modules.distribuicao.container import Container, obterGestorCartas
+
+
+def test_pecas_compartilhadas():
+    container = Container()
+    assert container.api.cache is container.cache_especies
+    assert container.api_async.cache is container.cache_especies
+    assert container.api_async.disjuntor is container.disjuntor
+    assert container.api_async.max_id is container.api.max_id
+    # Um 404 visto por qualquer cliente já é excluído do próximo sorteio
+    assert container.api.cache_negativo is container.api_async.cache_negativo is container.cache_negativo
+    assert container.sorteio.invalidos is container.cache_negativo
+
+
+def test_gestor_por_requisicao_compartilha_api():
+    container = Container()
+    gestor1 = container.gestorCartas(Mock())
+    gestor2 = container.gestorCartas(Mock())
+
+    assert gestor1 is not gestor2
+    assert gestor1._GestorCartas__api is gestor2._GestorCartas__api is container.api
+
+
+def test_cada_requisicao_usa_sua_sessao():
+    container = Container()
+    sessao1, sessao2 = Mock(), Mock()
+    gestor1 = obterGestorCartas(db=sessao1, c=container)
+    gestor2 = obterGestorCartas(db=sessao2, c=container)
+
+    assert gestor1._GestorCartas__bd.session is sessao1
+    assert gestor2._GestorCartas__bd.session is sessao2
+
+
+def test_sessoes_distintas_entre_threads():
+    container = Container()
+    sessoes = []
+    lock = threading.Lock()
+
+    def requisicao():
+        gestor = container.gestorCartas(Mock())
+        with lock:
+            sessoes.append(gestor._GestorCartas__bd.session)
+
+    threads = [threading.Thread(target=requisicao) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len({id(s) for s in sessoes}) == 8
@@ -0,0 +1,60 @@
+import pytest
+from unittest.mock import patch
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import QueuePool
+
+from shared import database
+from shared.database import ContadorPool, estatisticasPool, get_db
+
+
+@pytest.fixture
+def engine_pool(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}", poolclass=QueuePool, pool_size=2, max_overflow=1
+    )
+    yield engine
+    engine.dispose()
+
+
+def test_engine_configurado_pelo_ambiente():
+    pool = database.engine.pool
+    assert pool.size() == database.DB_POOL_SIZE
+    assert pool._recycle == database.DB_POOL_RECYCLE
+    assert pool._pre_ping == database.DB_POOL_PRE_PING
+
+
+def test_get_db_fecha_sessao():
+    with patch.object(database, "SessionLocal") as session_local:
+        dependencia = get_db()
+        sessao = next(dependencia)
+        with pytest.raises(StopIteration):
+            next(dependencia)
+    sessao.close.assert_called_once()
+
+
+def test_get_db_fecha_sessao_em_erro():
+    with patch.object(database, "SessionLocal") as session_local:
+        dependencia = get_db()
+        sessao = next(dependencia)
+        with pytest.raises(RuntimeError):
+            dependencia.throw(RuntimeError("falha no handler"))
+    sessao.close.assert_called_once()
+
+
+def test_estatisticas_pool(engine_pool):
+    contador = ContadorPool(engine_pool)
+    conexoes = [engine_pool.connect() for _ in range(3)]
+    for conexao in conexoes:
+        conexao.execute(text("SELECT 1"))
+
+    estatisticas = estatisticasPool(engine_pool, contador)
+    assert estatisticas["em_uso"] == 3
+    assert estatisticas["overflow"] == 1
+    assert estatisticas["max_overflow"] == 1
+    assert estatisticas["checkouts"] == 3
+
+    for conexao in conexoes:
+        conexao.close()
+    estatisticas = estatisticasPool(engine_pool, contador)
+    assert estatisticas["em_uso"] == 0
+    assert estatisticas["checkins"] == 3
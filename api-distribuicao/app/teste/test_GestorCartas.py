@@ -1,8 +1,10 @@
+import asyncio
 import pytest
-from unittest.mock import Mock
+from unittest.mock import Mock, AsyncMock
 from modules.distribuicao.service import GestorCartas
-from modules.distribuicao.external import GestorAPI
+from modules.distribuicao.external import GestorAPI, GestorAPIAsync
 from modules.distribuicao.models import Pokemon
+from modules.distribuicao.cache import CacheTimes, BackendMemoriaLRU
 from modules.distribuicao.repository import GerenciadorBD
 
 
@@ -10,19 +12,33 @@ from modules.distribuicao.repository import GerenciadorBD
 def mock_api():
     api = Mock(spec=GestorAPI)
     api.getMaxID.return_value = 151
+    api.getPokemonLocal.return_value = None
+    return api
+
+
+@pytest.fixture
+def mock_api_async():
+    api = Mock(spec=GestorAPIAsync)
+    api.getMaxID = AsyncMock(return_value=151)
+    api.getPokemon = AsyncMock()
     return api
 
 
 @pytest.fixture
 def mock_bd():
     bd = Mock(spec=GerenciadorBD)
+    bd.buscarPokemon.return_value = None
     return bd
 
 
 @pytest.fixture
-def gestor_cartas(mock_api, mock_bd):
-    GestorCartas._instance = None
-    return GestorCartas(mock_api, mock_bd)
+def cache_times():
+    return CacheTimes(BackendMemoriaLRU())
+
+
+@pytest.fixture
+def gestor_cartas(mock_api, mock_bd, mock_api_async, cache_times):
+    return GestorCartas(mock_api, mock_bd, mock_api_async, cache_times)
 
 
 @pytest.fixture
@@ -48,21 +64,62 @@ def test_gerar_pokemons_iniciais_cria_jogador(gestor_cartas, mock_api, mock_bd,
     mock_api.getPokemon.return_value = pokemon_mock
     gestor_cartas.gerarPokemonsIniciais("jogador1")
     
-    mock_bd.createJogador.assert_called_once_with("jogador1")
+    jogador = mock_bd.adicionarDistribuicao.call_args[0][0]
+    assert jogador.get_id() == "jogador1"
 
 
-def test_gerar_pokemons_iniciais_adiciona_ao_bd(gestor_cartas, mock_api, mock_bd, pokemon_mock):
+def test_gerar_pokemons_iniciais_grava_em_lote(gestor_cartas, mock_api, mock_bd, pokemon_mock):
     mock_api.getPokemon.return_value = pokemon_mock
     gestor_cartas.gerarPokemonsIniciais("jogador1")
     
-    assert mock_bd.adicionarPokemon.call_count == 5
+    mock_bd.adicionarDistribuicao.assert_called_once()
+    assert len(mock_bd.adicionarDistribuicao.call_args[0][1]) == 5
+    mock_bd.adicionarPokemon.assert_not_called()
+    mock_bd.adicionarPokemonAoJogador.assert_not_called()
+
+
+def test_gerar_pokemons_iniciais_vincula_jogador(gestor_cartas, mock_api, mock_bd):
+    mock_api.getPokemon.side_effect = pokemon_por_numero
+    resultado = gestor_cartas.gerarPokemonsIniciais("jogador1")
 
+    jogador, pokemons = mock_bd.adicionarDistribuicao.call_args[0]
+    # As 5 cartas gravadas são as do jogador, e são as devolvidas na resposta
+    assert jogador.get_pokemons() == pokemons == resultado["pokemons"]
+    assert len({p.get_numero_pokedex() for p in pokemons}) == 5
 
-def test_gerar_pokemons_iniciais_vincula_jogador(gestor_cartas, mock_api, mock_bd, pokemon_mock):
+
+def test_gerar_pokemons_iniciais_erro_bd_responde_erro(gestor_cartas, mock_api, mock_bd, pokemon_mock):
     mock_api.getPokemon.return_value = pokemon_mock
-    gestor_cartas.gerarPokemonsIniciais("jogador1")
+    mock_bd.adicionarDistribuicao.side_effect = ValueError("Erro no banco")
+    resultado = gestor_cartas.gerarPokemonsIniciais("jogador1")
     
-    assert mock_bd.adicionarPokemonAoJogador.call_count == 5
+    assert resultado["status"] == "erro"
+    assert resultado["codigo"] == "500"
+    assert "pokemons" not in resultado
+
+
+def test_gerar_async_erro_bd_responde_erro(gestor_cartas, mock_api_async, mock_bd, pokemon_mock):
+    mock_api_async.getPokemon.return_value = pokemon_mock
+    mock_bd.adicionarDistribuicao.side_effect = ValueError("Erro no banco")
+    resultado = asyncio.run(gestor_cartas.gerarPokemonsIniciaisAsync("jogador1"))
+
+    assert resultado["status"] == "erro"
+    assert resultado["codigo"] == "500"
+
+
+def test_gerar_pokemons_iniciais_max_id_uma_vez(gestor_cartas, mock_api, pokemon_mock):
+    mock_api.getPokemon.return_value = pokemon_mock
+    gestor_cartas.gerarPokemonsIniciais("jogador1")
+
+    mock_api.getMaxID.assert_called_once()
+
+
+def test_gerar_pokemons_iniciais_api_indisponivel(gestor_cartas, mock_api):
+    mock_api.getPokemon.return_value = None
+    resultado = gestor_cartas.gerarPokemonsIniciais("jogador1")
+
+    assert resultado["status"] == "erro"
+    assert resultado["codigo"] == "500"
 
 
 def test_gerar_pokemons_iniciais_erro_api(gestor_cartas, mock_api):
@@ -73,6 +130,114 @@ def test_gerar_pokemons_iniciais_erro_api(gestor_cartas, mock_api):
     assert resultado["codigo"] == "500"
 
 
+# Testes do método gerarPokemonsIniciaisEmLote
+def pokemon_por_numero(numero_pokedex, shiny=False):
+    return Pokemon(numero_pokedex, f"pokemon-{numero_pokedex}", shiny)
+
+
+def test_lote_um_resultado_por_jogador(gestor_cartas, mock_api, mock_bd):
+    mock_api.getPokemon.side_effect = pokemon_por_numero
+    resultados = list(gestor_cartas.gerarPokemonsIniciaisEmLote(["j1", "j2", "j3", "j1"]))
+
+    assert [r["player_id"] for r in resultados] == ["j1", "j2", "j3"]
+    assert all(r["status"] == "sucesso" and len(r["pokemons"]) == 5 for r in resultados)
+    mock_api.getMaxID.assert_called_once()
+
+
+def test_lote_busca_cada_especie_uma_vez(gestor_cartas, mock_api):
+    mock_api.getPokemon.side_effect = pokemon_por_numero
+    list(gestor_cartas.gerarPokemonsIniciaisEmLote([f"j{i}" for i in range(200)]))
+
+    consultados = [c.args[0] for c in mock_api.getPokemon.call_args_list]
+    assert len(consultados) == len(set(consultados)) <= 151
+
+
+def test_lote_grava_em_transacoes_por_bloco(gestor_cartas, mock_api, mock_bd):
+    mock_api.getPokemon.side_effect = pokemon_por_numero
+    list(gestor_cartas.gerarPokemonsIniciaisEmLote([f"j{i}" for i in range(25)], tamanho_lote=10))
+
+    assert [len(c.args[0]) for c in mock_bd.adicionarDistribuicoesEmLote.call_args_list] == [10, 10, 5]
+    mock_bd.adicionarDistribuicao.assert_not_called()
+
+
+def test_lote_ressorteia_especies_invalidas(gestor_cartas, mock_api):
+    # Múltiplos de 10 não existem na API (15 espécies, abaixo do limite de tentativas)
+    mock_api.getPokemon.side_effect = lambda n, shiny=False: None if n % 10 == 0 else pokemon_por_numero(n, shiny)
+    resultados = list(gestor_cartas.gerarPokemonsIniciaisEmLote([f"j{i}" for i in range(20)]))
+
+    assert all(r["status"] == "sucesso" for r in resultados)
+    assert all(p.get_numero_pokedex() % 10 != 0 for r in resultados for p in r["pokemons"])
+
+
+def test_lote_erro_bd_marca_jogadores_do_bloco(gestor_cartas, mock_api, mock_bd):
+    mock_api.getPokemon.side_effect = pokemon_por_numero
+    mock_bd.adicionarDistribuicoesEmLote.side_effect = [ValueError("Erro no banco"), True]
+    resultados = list(gestor_cartas.gerarPokemonsIniciaisEmLote(["j1", "j2", "j3"], tamanho_lote=2))
+
+    assert [r["status"] for r in resultados] == ["erro", "erro", "sucesso"]
+
+
+def test_lote_invalida_cache_dos_times(gestor_cartas, mock_api, cache_times):
+    mock_api.getPokemon.side_effect = pokemon_por_numero
+    cache_times.definir("j1", [{"pokemon_name": "antigo"}])
+    list(gestor_cartas.gerarPokemonsIniciaisEmLote(["j1"]))
+
+    assert cache_times.obter("j1") is None
+
+
+# Testes do método gerarPokemonsIniciaisAsync
+def test_gerar_async_sucesso(gestor_cartas, mock_api_async, mock_bd, pokemon_mock):
+    mock_api_async.getPokemon.return_value = pokemon_mock
+    resultado = asyncio.run(gestor_cartas.gerarPokemonsIniciaisAsync("jogador1"))
+
+    assert resultado["status"] == "sucesso"
+    assert len(resultado["pokemons"]) == 5
+    mock_api_async.getMaxID.assert_awaited_once()
+    mock_bd.adicionarDistribuicao.assert_called_once()
+
+
+def test_gerar_async_ids_distintos(gestor_cartas, mock_api_async, pokemon_mock):
+    mock_api_async.getPokemon.return_value = pokemon_mock
+    asyncio.run(gestor_cartas.gerarPokemonsIniciaisAsync("jogador1"))
+
+    ids = [chamada.args[0] for chamada in mock_api_async.getPokemon.await_args_list]
+    assert len(ids) == len(set(ids)) == 5
+
+
+def test_gerar_async_busca_concorrente(gestor_cartas, mock_api_async, pokemon_mock):
+    em_andamento = 0
+    maximo = 0
+
+    async def get_pokemon_lento(pokemon_id, shiny=False):
+        nonlocal em_andamento, maximo
+        em_andamento += 1
+        maximo = max(maximo, em_andamento)
+        await asyncio.sleep(0.01)
+        em_andamento -= 1
+        return pokemon_mock
+
+    mock_api_async.getPokemon.side_effect = get_pokemon_lento
+    asyncio.run(gestor_cartas.gerarPokemonsIniciaisAsync("jogador1", limite_concorrencia=3))
+
+    assert maximo == 3
+
+
+def test_gerar_async_resorteia_invalidos(gestor_cartas, mock_api_async, pokemon_mock):
+    mock_api_async.getPokemon.side_effect = [None, pokemon_mock, pokemon_mock, pokemon_mock, pokemon_mock, pokemon_mock]
+    resultado = asyncio.run(gestor_cartas.gerarPokemonsIniciaisAsync("jogador1"))
+
+    assert len(resultado["pokemons"]) == 5
+    assert mock_api_async.getPokemon.await_count == 6
+
+
+def test_gerar_async_api_indisponivel(gestor_cartas, mock_api_async):
+    mock_api_async.getPokemon.return_value = None
+    resultado = asyncio.run(gestor_cartas.gerarPokemonsIniciaisAsync("jogador1"))
+
+    assert resultado["status"] == "erro"
+    assert resultado["codigo"] == "500"
+
+
 # Testes do método adicionarPokemon
 def test_adicionar_pokemon_sucesso(gestor_cartas, mock_bd, pokemon_mock):
     resultado = gestor_cartas.adicionarPokemon(1, pokemon_mock)
@@ -114,7 +279,7 @@ def test_remover_pokemon_sucesso(gestor_cartas, mock_bd, pokemon_mock):
 def test_remover_pokemon_chama_bd(gestor_cartas, mock_bd, pokemon_mock):
     gestor_cartas.removerPokemon(1, pokemon_mock)
     
-    mock_bd.removerPokemonDoJogador.assert_called_once_with(1, pokemon_mock)
+    mock_bd.removerPokemonDoJogador.assert_called_once_with(1, 25)
 
 
 def test_remover_pokemon_jogador_especifico(gestor_cartas, mock_bd, pokemon_mock):
@@ -123,20 +288,224 @@ def test_remover_pokemon_jogador_especifico(gestor_cartas, mock_bd, pokemon_mock
     assert mock_bd.removerPokemonDoJogador.call_args[0][0] == 123
 
 
-# Testes do padrão Singleton
-def test_singleton_mesma_instancia(mock_api, mock_bd):
-    GestorCartas._instance = None
-    gestor1 = GestorCartas(mock_api, mock_bd)
-    gestor2 = GestorCartas(mock_api, mock_bd)
-    
-    assert gestor1 is gestor2
+def test_remover_pokemon_por_id_sem_pokeapi(gestor_cartas, mock_api, mock_bd):
+    resultado = gestor_cartas.removerPokemon("a", 25)
 
+    mock_bd.removerPokemonDoJogador.assert_called_once_with("a", 25)
+    mock_api.getPokemon.assert_not_called()
+    mock_bd.buscarPokemon.assert_not_called()
+    assert resultado["status"] == "sucesso"
+    assert "Pokémon 25" in resultado["mensagem"]
 
-def test_singleton_nao_reinicializa(mock_api, mock_bd):
-    GestorCartas._instance = None
-    gestor1 = GestorCartas(mock_api, mock_bd)
-    mock_api_novo = Mock(spec=GestorAPI)
-    gestor2 = GestorCartas(mock_api_novo, mock_bd)
-    
-    assert gestor1 is gestor2
-    assert gestor1._GestorCartas__api is mock_api
\ No newline at end of file
+
+def test_remover_pokemon_por_id_usa_nome_em_memoria(gestor_cartas, mock_api):
+    mock_api.getPokemonLocal.return_value = Pokemon(25, "pikachu")
+
+    resultado = gestor_cartas.removerPokemon("a", 25)
+
+    assert "pikachu" in resultado["mensagem"]
+    mock_api.getPokemon.assert_not_called()
+
+
+# Testes da resolução de espécies (memória -> banco -> PokeAPI)
+def test_resolver_pokemon_memoria_primeiro(gestor_cartas, mock_api, mock_bd):
+    mock_api.getPokemonLocal.return_value = Pokemon(25, "pikachu", True)
+
+    assert gestor_cartas.resolverPokemon(25, True).get_nome() == "pikachu"
+    mock_bd.buscarPokemon.assert_not_called()
+    mock_api.getPokemon.assert_not_called()
+
+
+def test_resolver_pokemon_usa_tabela_pokemon(gestor_cartas, mock_api, mock_bd):
+    mock_bd.buscarPokemon.return_value = Pokemon(25, "pikachu", False)
+
+    pokemon = gestor_cartas.resolverPokemon(25, shiny=True)
+
+    assert pokemon.get_nome() == "pikachu" and pokemon.get_numero_pokedex() == 25
+    assert pokemon.is_shiny() is True  # o shiny é o da requisição, não o da linha gravada
+    mock_api.getPokemon.assert_not_called()
+
+
+def test_resolver_pokemon_pokeapi_por_ultimo(gestor_cartas, mock_api, mock_bd):
+    mock_api.getPokemon.side_effect = pokemon_por_numero
+
+    assert gestor_cartas.resolverPokemon(150).get_numero_pokedex() == 150
+    mock_bd.buscarPokemon.assert_called_once_with(150)
+    mock_api.getPokemon.assert_called_once_with(150, shiny=False)
+
+
+def test_resolver_pokemon_local_nao_chama_pokeapi(gestor_cartas, mock_api):
+    assert gestor_cartas.resolverPokemonLocal(150) is None
+    mock_api.getPokemon.assert_not_called()
+
+
+
+# Testes do método listarTime e do cache de times
+LINHA_PIKACHU = (25, "Pikachu", False)
+
+def test_listar_time_sucesso(gestor_cartas, mock_bd, pokemon_mock):
+    mock_bd.getLinhasTimeDoJogador.return_value = [LINHA_PIKACHU]
+    resultado = gestor_cartas.listarTime("jogador1")
+
+    assert resultado["status"] == 200
+    assert resultado["data"]["team"] == [{"pokemon_name": "Pikachu", "is_shiny": False}]
+
+
+def test_listar_time_escrita_concorrente_nao_volta_time_antigo(gestor_cartas, mock_bd, cache_times):
+    def lerDoBancoEnquantoAlguemEscreve(id_jogador):
+        cache_times.invalidar(id_jogador)
+        return [(25, "pikachu", False)]
+    mock_bd.getLinhasTimeDoJogador.side_effect = lerDoBancoEnquantoAlguemEscreve
+
+    resultado = gestor_cartas.listarTime("a")
+
+    assert resultado["data"]["team"] == [{"pokemon_name": "pikachu", "is_shiny": False}]
+    assert cache_times.obter("a") is None
+
+
+def test_listar_time_jogador_inexistente_nao_vai_para_cache(gestor_cartas, mock_bd, cache_times):
+    mock_bd.getLinhasTimeDoJogador.side_effect = ValueError("Usuário com ID x não encontrado")
+    resultado = gestor_cartas.listarTime("x")
+
+    assert resultado["status"] == 404
+    assert cache_times.obter("x") is None
+
+
+def test_listar_time_usa_cache(gestor_cartas, mock_bd, pokemon_mock):
+    mock_bd.getLinhasTimeDoJogador.return_value = [LINHA_PIKACHU]
+    gestor_cartas.listarTime("jogador1")
+    resultado = gestor_cartas.listarTime("jogador1")
+
+    mock_bd.getLinhasTimeDoJogador.assert_called_once()
+    assert len(resultado["data"]["team"]) == 1
+
+
+def test_adicionar_pokemon_invalida_cache(gestor_cartas, mock_bd, pokemon_mock):
+    mock_bd.getLinhasTimeDoJogador.return_value = []
+    gestor_cartas.listarTime("jogador1")
+    gestor_cartas.adicionarPokemon("jogador1", pokemon_mock)
+    mock_bd.getLinhasTimeDoJogador.return_value = [LINHA_PIKACHU]
+    resultado = gestor_cartas.listarTime("jogador1")
+
+    assert mock_bd.getLinhasTimeDoJogador.call_count == 2
+    assert len(resultado["data"]["team"]) == 1
+
+
+def test_remover_pokemon_invalida_cache(gestor_cartas, mock_bd, pokemon_mock, cache_times):
+    mock_bd.getLinhasTimeDoJogador.return_value = [LINHA_PIKACHU]
+    gestor_cartas.listarTime("jogador1")
+    gestor_cartas.removerPokemon("jogador1", pokemon_mock)
+
+    assert cache_times.obter("jogador1") is None
+
+
+def test_distribuicao_invalida_cache(gestor_cartas, mock_api, mock_bd, pokemon_mock, cache_times):
+    cache_times.definir("jogador1", [])
+    mock_api.getPokemon.return_value = pokemon_mock
+    gestor_cartas.gerarPokemonsIniciais("jogador1")
+
+    assert cache_times.obter("jogador1") is None
+
+
+def test_listar_time_sem_cache(mock_api, mock_bd, pokemon_mock):
+    gestor = GestorCartas(mock_api, mock_bd)
+    mock_bd.getLinhasTimeDoJogador.return_value = [LINHA_PIKACHU]
+    gestor.listarTime("jogador1")
+    gestor.listarTime("jogador1")
+
+    assert mock_bd.getLinhasTimeDoJogador.call_count == 2
+
+
+# Testes do método trocarPokemons
+def test_trocar_pokemons_sucesso(gestor_cartas, mock_bd, cache_times):
+    cache_times.definir("a", [{"pokemon_name": "antigo"}])
+    cache_times.definir("b", [{"pokemon_name": "antigo"}])
+    resultado = gestor_cartas.trocarPokemons("a", 1, "b", 25)
+
+    assert resultado["status"] == "sucesso"
+    mock_bd.trocarPokemons.assert_called_once_with("a", 1, "b", 25)
+    assert cache_times.obter("a") is None and cache_times.obter("b") is None
+
+
+def test_trocar_pokemons_erro(gestor_cartas, mock_bd):
+    mock_bd.trocarPokemons.side_effect = ValueError("Usuário a não possui o Pokémon 1")
+    resultado = gestor_cartas.trocarPokemons("a", 1, "b", 25)
+
+    assert resultado["status"] == "erro"
+    assert resultado["codigo"] == "400"
+    assert "não possui" in resultado["mensagem"]
+
+
+# Testes do método substituirPokemon
+def test_substituir_pokemon_sucesso(gestor_cartas, mock_api, mock_bd, cache_times):
+    mock_api.getPokemon.side_effect = pokemon_por_numero
+    mock_bd.buscarRespostaIdempotente.return_value = None
+    mock_bd.substituirPokemonDoJogador.side_effect = lambda id_jogador, removido, novo, resposta, chave: resposta
+    cache_times.definir("a", [{"pokemon_name": "antigo"}])
+
+    resultado = gestor_cartas.substituirPokemon("a", 1, 150, False, "k1")
+
+    assert resultado["status"] == "sucesso"
+    assert "pokemon-150" in resultado["mensagem"]
+    args = mock_bd.substituirPokemonDoJogador.call_args.args
+    assert args[0:2] == ("a", 1) and args[2].get_numero_pokedex() == 150 and args[4] == "k1"
+    assert cache_times.obter("a") is None
+
+
+def test_substituir_pokemon_especie_gravada_sem_pokeapi(gestor_cartas, mock_api, mock_bd):
+    mock_bd.buscarPokemon.return_value = Pokemon(150, "mewtwo", False)
+    mock_bd.buscarRespostaIdempotente.return_value = None
+    mock_bd.substituirPokemonDoJogador.side_effect = lambda id_jogador, removido, novo, resposta, chave: resposta
+
+    resultado = gestor_cartas.substituirPokemon("a", 1, 150)
+
+    assert "mewtwo" in resultado["mensagem"]
+    mock_api.getPokemon.assert_not_called()
+
+
+def test_substituir_pokemon_repeticao_devolve_resposta_original(gestor_cartas, mock_api, mock_bd):
+    original = {"status": "sucesso", "mensagem": "original", "codigo": "200"}
+    mock_bd.buscarRespostaIdempotente.return_value = original
+
+    assert gestor_cartas.substituirPokemon("a", 1, 150, False, "k1") == original
+    mock_api.getPokemon.assert_not_called()
+    mock_bd.substituirPokemonDoJogador.assert_not_called()
+
+
+def test_substituir_pokemon_inexistente(gestor_cartas, mock_api, mock_bd):
+    mock_api.getPokemon.return_value = None
+    resultado = gestor_cartas.substituirPokemon("a", 1, 99999)
+
+    assert resultado["status"] == "erro"
+    assert resultado["codigo"] == "400"
+    mock_bd.substituirPokemonDoJogador.assert_not_called()
+
+
+def test_substituir_pokemon_erro_bd(gestor_cartas, mock_api, mock_bd):
+    mock_api.getPokemon.side_effect = pokemon_por_numero
+    mock_bd.substituirPokemonDoJogador.side_effect = ValueError("Usuário a não possui o Pokémon 1")
+    resultado = gestor_cartas.substituirPokemon("a", 1, 150)
+
+    assert resultado["status"] == "erro"
+    assert "não possui" in resultado["mensagem"]
+
+
+# Testes da listagem paginada e em streaming
+def test_listar_time_paginado(gestor_cartas, mock_bd, pokemon_mock):
+    mock_bd.getPaginaPokemonsDoJogador.return_value = ([pokemon_mock], 25)
+    resultado = gestor_cartas.listarTime("jogador1", limite=1, cursor=10)
+
+    mock_bd.getPaginaPokemonsDoJogador.assert_called_once_with("jogador1", 1, 10)
+    assert resultado["data"]["team"] == [{"pokemon_name": "Pikachu", "is_shiny": False}]
+    assert resultado["data"]["next_cursor"] == 25
+
+
+def test_listar_time_paginado_usuario_inexistente(gestor_cartas, mock_bd):
+    mock_bd.getPaginaPokemonsDoJogador.side_effect = ValueError("Usuário com ID x não encontrado")
+    assert gestor_cartas.listarTime("x", limite=10)["status"] == 404
+
+
+def test_iterar_time(gestor_cartas, mock_bd, pokemon_mock):
+    mock_bd.iterarLinhasDoJogador.return_value = iter([LINHA_PIKACHU, LINHA_PIKACHU])
+
+    assert list(gestor_cartas.iterarTime("jogador1")) == [{"pokemon_name": "Pikachu", "is_shiny": False}] * 2
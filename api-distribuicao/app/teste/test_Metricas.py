@@ -0,0 +1,120 @@
+import asyncio
+import pytest
+from unittest.mock import Mock
+from modules.distribuicao.external import GestorAPI
+from modules.distribuicao.repository import GerenciadorBD
+from modules.distribuicao.service import GestorCartas
+from shared.metricas import (
+    Contador, Histograma, RegistroMetricas, cronometrar, instrumentar, exportarEstado,
+    duracao_operacoes, erros_operacoes,
+)
+
+
+def test_contador_por_rotulos():
+    contador = Contador("x_total", "ajuda", rotulos=("tipo",))
+
+    contador.incrementar("a")
+    contador.incrementar("a", valor=2)
+    contador.incrementar("b")
+
+    assert contador.valor("a") == 3
+    assert contador.exportar() == ['x_total{tipo="a"} 3', 'x_total{tipo="b"} 1']
+
+
+def test_histograma_exporta_buckets_acumulados():
+    histograma = Histograma("d_segundos", "ajuda", buckets=(0.1, 1.0))
+
+    for valor in (0.05, 0.5, 0.5, 3.0):
+        histograma.observar(valor)
+
+    linhas = histograma.exportar()
+    assert 'd_segundos_bucket{le="0.1"} 1' in linhas
+    assert 'd_segundos_bucket{le="1.0"} 3' in linhas
+    assert 'd_segundos_bucket{le="+Inf"} 4' in linhas
+    assert "d_segundos_count 4" in linhas
+    assert "d_segundos_sum 4.05" in linhas
+
+
+def test_registro_reaproveita_metrica_e_exporta_cabecalhos():
+    registro = RegistroMetricas()
+
+    assert registro.contador("c_total", "ajuda") is registro.contador("c_total", "ajuda")
+    registro.contador("c_total", "ajuda").incrementar()
+
+    texto = registro.exportar()
+    assert "# HELP c_total ajuda\n# TYPE c_total counter\nc_total 1\n" == texto
+
+
+def test_cronometrar_conta_erros_e_repassa_excecao():
+    @cronometrar("teste", "falha")
+    def falha():
+        raise ValueError("x")
+
+    antes = duracao_operacoes.contagem("teste", "falha")
+    with pytest.raises(ValueError):
+        falha()
+
+    assert duracao_operacoes.contagem("teste", "falha") == antes + 1
+    assert erros_operacoes.valor("teste", "falha", "ValueError") >= 1
+
+
+def test_cronometrar_async_e_gerador():
+    @cronometrar("teste", "assincrona")
+    async def assincrona():
+        return 7
+
+    @cronometrar("teste", "geradora")
+    def geradora():
+        yield from range(3)
+
+    antes_async = duracao_operacoes.contagem("teste", "assincrona")
+    antes_gerador = duracao_operacoes.contagem("teste", "geradora")
+
+    assert asyncio.run(assincrona()) == 7
+    iterador = geradora()
+    # A geradora só é medida quando a iteração termina
+    assert duracao_operacoes.contagem("teste", "geradora") == antes_gerador
+    assert list(iterador) == [0, 1, 2]
+
+    assert duracao_operacoes.contagem("teste", "assincrona") == antes_async + 1
+    assert duracao_operacoes.contagem("teste", "geradora") == antes_gerador + 1
+
+
+def test_instrumentar_ignora_metodos_privados():
+    @instrumentar("teste")
+    class Classe:
+        def publico(self):
+            return self._privado()
+
+        def _privado(self):
+            return 1
+
+    antes = duracao_operacoes.contagem("teste", "publico")
+    assert Classe().publico() == 1
+    assert duracao_operacoes.contagem("teste", "publico") == antes + 1
+    assert duracao_operacoes.contagem("teste", "_privado") == 0
+
+
+def test_gestor_cartas_registra_listagem():
+    bd = Mock(spec=GerenciadorBD)
+    bd.getLinhasTimeDoJogador.return_value = [(25, "Pikachu", False)]
+    gestor = GestorCartas(Mock(spec=GestorAPI), bd)
+
+    antes_servico = duracao_operacoes.contagem("gestor_cartas", "listarTime")
+    gestor.listarTime("ash")
+
+    assert duracao_operacoes.contagem("gestor_cartas", "listarTime") == antes_servico + 1
+
+
+def test_exportar_estado_converte_numeros_textos_e_dicts():
+    texto = exportarEstado("disjuntor", "ajuda", {
+        "estado": "fechado",
+        "falhas": 2,
+        "transicoes": {"aberto": 1},
+        "ignorado": None,
+    })
+
+    assert 'disjuntor_estado{valor="fechado"} 1' in texto
+    assert "disjuntor_falhas 2" in texto
+    assert 'disjuntor_transicoes{chave="aberto"} 1' in texto
+    assert "ignorado" not in texto
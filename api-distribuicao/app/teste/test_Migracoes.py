@@ -0,0 +1,193 @@
+import re
+import pytest
+from sqlalchemy import create_engine, event, inspect, select
+from sqlalchemy.orm import sessionmaker
+from modules.distribuicao.models import Pokemon, Jogador
+from modules.distribuicao.repository import PokemonRepository, UsuarioRepository, UsuarioPokemonRepository, GerenciadorBD
+from shared.migracoes import PASTA_MIGRACOES, aplicarMigracoes, lerStatements, listarMigracoes, versao_esquema
+
+
+def escrever(pasta, arquivos: dict):
+    for nome, conteudo in arquivos.items():
+        (pasta / nome).write_text(conteudo, encoding="utf-8")
+    return str(pasta)
+
+
+@pytest.fixture
+def banco_vazio():
+    engine = create_engine("sqlite:///:memory:")
+    yield engine
+    engine.dispose()
+
+
+# Testes do executor de migrações
+def test_migracoes_do_projeto_em_ordem():
+    migracoes = listarMigracoes(PASTA_MIGRACOES)
+
+    assert [versao for versao, _, _ in migracoes] == [1, 2, 3, 4, 5]
+    assert all(lerStatements(caminho) for _, _, caminho in migracoes)
+
+
+# Esquema do banco-de-dados.sql original (antes das migrações), sem o AUTO_INCREMENT do MySQL
+ESQUEMA_ORIGINAL = [
+    "CREATE TABLE Pokemon (idPokemon INT PRIMARY KEY, nomePokemon VARCHAR(25) NOT NULL, isShiny BOOLEAN DEFAULT FALSE)",
+    "CREATE TABLE Usuario (idUsuario INT PRIMARY KEY)",
+    "CREATE TABLE UsuarioPokemon (idUsuario INT NOT NULL, idPokemon INT NOT NULL, PRIMARY KEY (idUsuario, idPokemon),"
+    " FOREIGN KEY (idUsuario) REFERENCES Usuario(idUsuario) ON DELETE CASCADE ON UPDATE CASCADE,"
+    " FOREIGN KEY (idPokemon) REFERENCES Pokemon(idPokemon) ON DELETE CASCADE ON UPDATE CASCADE)",
+]
+
+
+def test_migracoes_do_projeto_sobre_o_esquema_original(banco_vazio):
+    # Os statements só do MySQL (MODIFY, FOREIGN_KEY_CHECKS) viram no-op no SQLite;
+    # o SQLite já guarda o ID do jogador como texto
+    def soMySQL(conn, cursor, statement, parameters, context, executemany):
+        if re.match(r"\s*(SET FOREIGN_KEY_CHECKS|ALTER TABLE \w+ MODIFY)", statement):
+            return "SELECT 1", ()
+        return statement, parameters
+
+    event.listen(banco_vazio, "before_cursor_execute", soMySQL, retval=True)
+    with banco_vazio.begin() as conn:
+        for statement in ESQUEMA_ORIGINAL:
+            conn.exec_driver_sql(statement)
+
+    assert aplicarMigracoes(banco_vazio) == [1, 2, 3, 4, 5]
+
+    inspetor = inspect(banco_vazio)
+    assert {"Especie", "Idempotencia"} <= set(inspetor.get_table_names())
+    assert [i["name"] for i in inspetor.get_indexes("Idempotencia")] == ["ix_Idempotencia_criadoEm"]
+    # A troca com Idempotency-Key funciona no banco migrado
+    with sessionmaker(bind=banco_vazio)() as session:
+        gerenciador = GerenciadorBD(session)
+        gerenciador.adicionarDistribuicao(Jogador("a", []), [Pokemon(1, "Bulbasaur")])
+        gerenciador.substituirPokemonDoJogador("a", 1, Pokemon(150, "Mewtwo"), {"ok": True}, chave="k1")
+        assert gerenciador.buscarRespostaIdempotente("k1", "a") == {"ok": True}
+
+
+def test_ler_statements_ignora_comentarios(tmp_path):
+    pasta = escrever(tmp_path, {"001_a.sql": "-- comentário; com ponto e vírgula\nCREATE TABLE A (x INT);\n\nCREATE TABLE B (y INT);\n"})
+
+    assert lerStatements(f"{pasta}/001_a.sql") == ["CREATE TABLE A (x INT)", "CREATE TABLE B (y INT)"]
+
+
+def test_aplica_pendentes_em_ordem_uma_vez(tmp_path, banco_vazio):
+    pasta = escrever(tmp_path, {
+        "002_indice.sql": "CREATE INDEX ix_A_x ON A (x);",
+        "001_tabela.sql": "CREATE TABLE A (x INT);",
+        "LEIAME.txt": "ignorado",
+    })
+
+    assert aplicarMigracoes(banco_vazio, pasta) == [1, 2]
+    assert aplicarMigracoes(banco_vazio, pasta) == []
+    assert [i["name"] for i in inspect(banco_vazio).get_indexes("A")] == ["ix_A_x"]
+    with banco_vazio.connect() as conn:
+        assert conn.execute(select(versao_esquema.c.versao, versao_esquema.c.nome)).all() == [(1, "tabela"), (2, "indice")]
+
+
+def test_migracao_com_erro_nao_registra_versao(tmp_path, banco_vazio):
+    pasta = escrever(tmp_path, {"001_tabela.sql": "CREATE TABLE A (x INT);", "002_quebrada.sql": "CREATE INDEX ix ON Inexistente (x);"})
+
+    with pytest.raises(Exception):
+        aplicarMigracoes(banco_vazio, pasta)
+
+    with banco_vazio.connect() as conn:
+        assert list(conn.scalars(select(versao_esquema.c.versao))) == [1]
+
+
+def test_conexao_da_migracao_nao_volta_ao_pool(tmp_path):
+    # SQLite em arquivo usa um pool comum, como o MySQL da aplicação
+    engine = create_engine(f"sqlite:///{tmp_path}/banco.db")
+    descartadas = []
+    event.listen(engine, "invalidate", lambda *args: descartadas.append(args))
+    pasta = escrever(tmp_path, {"001_tabela.sql": "CREATE TABLE A (x INT);", "002_quebrada.sql": "PRAGMA foreign_keys = OFF; CREATE INDEX ix ON Inexistente (x);"})
+
+    with pytest.raises(Exception):
+        aplicarMigracoes(engine, pasta)
+
+    assert len(descartadas) == 1
+    # A próxima conexão da aplicação é nova, sem o estado deixado pela migração
+    novas = []
+    event.listen(engine, "connect", lambda *args: novas.append(args))
+    with engine.connect():
+        pass
+    assert len(novas) == 1
+    engine.dispose()
+
+
+def test_versao_repetida(tmp_path):
+    pasta = escrever(tmp_path, {"001_a.sql": "", "1_b.sql": ""})
+
+    with pytest.raises(ValueError):
+        listarMigracoes(pasta)
+
+
+# Planos de execução (EXPLAIN QUERY PLAN do SQLite) das consultas do time
+@pytest.fixture
+def db_session(engine):
+    session = sessionmaker(bind=engine)()
+    GerenciadorBD(session).adicionarDistribuicoesEmLote([
+        Jogador(f"j{j}", [Pokemon(i, f"pokemon-{i}") for i in range(1, 30)]) for j in range(20)
+    ])
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def usuario_pokemon_repo(db_session):
+    return UsuarioPokemonRepository(db_session, PokemonRepository(db_session), UsuarioRepository(db_session))
+
+
+def planos(engine, operacao) -> str:
+    """Executa a operação e devolve o plano de cada SELECT que ela enviou ao banco."""
+    selects = []
+
+    def registrar(conn, cursor, statement, parameters, *args):
+        if statement.lstrip().upper().startswith("SELECT"):
+            selects.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", registrar)
+    try:
+        operacao()
+    finally:
+        event.remove(engine, "before_cursor_execute", registrar)
+
+    assert selects
+    with engine.connect() as conn:
+        return "\n".join(
+            linha.detail
+            for statement, parameters in selects
+            for linha in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        )
+
+
+def test_plano_donos_do_pokemon_usa_indice_de_cobertura(engine, usuario_pokemon_repo):
+    plano = planos(engine, lambda: usuario_pokemon_repo.listarDonosDoPokemon(25))
+
+    assert "COVERING INDEX ix_UsuarioPokemon_idPokemon_idUsuario (idPokemon=?)" in plano
+    assert "SCAN" not in plano
+    assert len(usuario_pokemon_repo.listarDonosDoPokemon(25)) == 20
+
+
+def test_plano_listagem_do_time_usa_chave_primaria(engine, usuario_pokemon_repo):
+    plano = planos(engine, lambda: usuario_pokemon_repo.listarLinhasDoUsuario("j3"))
+
+    # SQLite: a PK composta de UsuarioPokemon vira o índice sqlite_autoindex_UsuarioPokemon_1
+    assert "SCAN" not in plano
+    assert "UsuarioPokemon USING COVERING INDEX sqlite_autoindex_UsuarioPokemon_1 (idUsuario=?)" in plano
+
+
+def test_plano_posse_e_travas_da_troca_usam_chave_primaria(engine, usuario_pokemon_repo, db_session):
+    for id_jogador, numero in (("j1", 100), ("j2", 200)):
+        usuario_pokemon_repo.pokemon_repo.create(Pokemon(numero, f"pokemon-{numero}"))
+        usuario_pokemon_repo.adicionarPokemonJogador(id_jogador, Pokemon(numero, f"pokemon-{numero}"))
+
+    plano = planos(engine, lambda: usuario_pokemon_repo.usuarioPossuiPokemon("j3", 7))
+    def trocar():
+        usuario_pokemon_repo.trocarPokemonsJogadores("j1", 100, "j2", 200)
+        db_session.commit()  # o EXPLAIN reusa a conexão do SQLite em memória
+
+    plano += "\n" + planos(engine, trocar)
+
+    assert "SCAN Usuario" not in plano  # o EXISTS gera só um "SCAN CONSTANT ROW"
+    assert "(idUsuario=? AND idPokemon=?)" in plano
+    assert usuario_pokemon_repo.listarDonosDoPokemon(100) == ["j2"]
@@ -0,0 +1,63 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+from shared import perfil_sql
+from shared.perfil_sql import instalarPerfilador, middlewarePerfilSQL, perfilar
+
+
+@pytest.fixture
+def engine_perfilado():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    instalarPerfilador(engine)
+    yield engine
+    engine.dispose()
+
+
+def test_perfilar_conta_statements_e_duplicados(engine_perfilado):
+    with perfilar() as perfil, engine_perfilado.connect() as conn:
+        for i in range(3):
+            conn.execute(text("SELECT :i"), {"i": i})
+        conn.execute(text("SELECT 1 + 1"))
+
+    assert perfil.total == 4
+    assert perfil.duplicados() == {"SELECT ?": 3}
+    assert perfil.tempo > 0
+    assert "3x SELECT ?" in perfil.resumo()
+
+
+def test_fora_do_perfilar_nada_e_registrado(engine_perfilado):
+    with perfilar() as perfil:
+        pass
+    with engine_perfilado.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+    assert perfil.total == 0
+
+
+def test_instalar_duas_vezes_nao_duplica_contagem(engine_perfilado):
+    instalarPerfilador(engine_perfilado)
+    with perfilar() as perfil, engine_perfilado.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+    assert perfil.total == 1
+
+
+def test_middleware_devolve_cabecalho_e_loga_acima_do_limite(engine_perfilado, monkeypatch, capsys):
+    app = FastAPI()
+    app.middleware("http")(middlewarePerfilSQL)
+
+    @app.get("/n-mais-1")
+    def n_mais_1():  # rota síncrona: roda no threadpool, como as do router
+        with engine_perfilado.connect() as conn:
+            for i in range(5):
+                conn.execute(text("SELECT :i"), {"i": i})
+        return {}
+
+    monkeypatch.setattr(perfil_sql, "PERFIL_SQL_LIMITE", 3)
+    resposta = TestClient(app).get("/n-mais-1")
+
+    assert resposta.headers["X-SQL-Queries"] == "5"
+    assert resposta.headers["X-SQL-Duplicadas"] == "4"
+    assert "acima do limite de 3" in capsys.readouterr().out
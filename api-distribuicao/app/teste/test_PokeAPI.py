@@ -1,8 +1,12 @@
+import asyncio
+import threading
+import httpx
 import pytest
 from unittest.mock import MagicMock, patch
 import requests
 
-from modules.distribuicao.external import GestorAPI 
+from benchmarks.stub_pokeapi import StubPokeAPI
+from modules.distribuicao.external import GestorAPI, GestorAPIAsync, DisjuntorAPI, VooUnico, VooUnicoAsync, criarSessaoHTTP
 
 class PokemonMock:
     def __init__(self, numero_pokedex, nome, shiny=False): 
@@ -16,13 +20,6 @@ class PokemonMock:
                 self.nome == other.nome)
 
 
-@pytest.fixture(autouse=True)
-def reset_singleton():
-    """Reseta o Singleton antes de cada teste"""
-    GestorAPI._instance = None
-    yield
-    GestorAPI._instance = None
-
 @pytest.fixture
 def gestor():
     return GestorAPI()
@@ -30,17 +27,17 @@ def gestor():
 # =================== TESTES ==================
 
 class TestConexao:
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_conexao_sucesso(self, mock_get, gestor):
         mock_get.return_value.status_code = 200
         assert gestor.conexaoAPI() is True
 
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_conexao_falha_500(self, mock_get, gestor):
         mock_get.return_value.status_code = 500
         assert gestor.conexaoAPI() is False
 
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_conexao_exception(self, mock_get, gestor):
         mock_get.side_effect = requests.exceptions.RequestException
         assert gestor.conexaoAPI() is False
@@ -52,9 +49,8 @@ class TestConexao:
 @patch('modules.distribuicao.external.Pokemon', new=PokemonMock)
 class TestGetPokemon:
     
-    @patch.object(GestorAPI, 'conexaoAPI', return_value=True)
-    @patch('requests.get')
-    def test_get_pokemon_sucesso(self, mock_get, mock_conn, gestor):
+    @patch('requests.Session.get')
+    def test_get_pokemon_sucesso(self, mock_get, gestor):
         # Configura o retorno da API
         mock_get.return_value.status_code = 200
         mock_get.return_value.json.return_value = {
@@ -71,38 +67,430 @@ class TestGetPokemon:
         assert pokemon.numero_pokedex == 6
         assert pokemon.shiny is True
 
-    @patch.object(GestorAPI, 'conexaoAPI', return_value=True)
-    @patch('requests.get')
-    def test_get_pokemon_404_nao_encontrado(self, mock_get, mock_conn, gestor):
+    @patch('requests.Session.get')
+    def test_get_pokemon_404_nao_encontrado(self, mock_get, gestor):
         mock_get.return_value.status_code = 404
         pokemon = gestor.getPokemon(9999)
         assert pokemon is None
 
-    @patch.object(GestorAPI, 'conexaoAPI', return_value=False)
-    def test_get_pokemon_sem_conexao(self, mock_conn, gestor):
+    @patch('requests.Session.get')
+    def test_get_pokemon_404_vai_para_o_cache_negativo(self, mock_get, gestor):
+        mock_get.return_value.status_code = 404
+        assert gestor.getPokemon(9999) is None
+        assert gestor.getPokemon(9999) is None
+        # O segundo pedido não chega à rede
+        assert mock_get.call_count == 1
+        assert gestor.cache_negativo.ids() == [9999]
+
+    @patch('requests.Session.get')
+    def test_get_pokemon_nao_sonda_conexao(self, mock_get, gestor):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = {"forms": [{"name": "ivysaur"}]}
+        gestor.getPokemon(2)
+        # Apenas a chamada real, sem o GET de teste na raiz da API
+        assert mock_get.call_count == 1
+
+    @patch('requests.Session.get')
+    def test_get_pokemon_circuito_aberto(self, mock_get, gestor):
+        gestor.disjuntor.estado = DisjuntorAPI.ABERTO
+        gestor.disjuntor.tempo_reabertura = float("inf")
         pokemon = gestor.getPokemon(1)
         assert pokemon is None
+        mock_get.assert_not_called()
+
+    @patch('requests.Session.get')
+    def test_get_pokemon_usa_cache(self, mock_get, gestor):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = {
+            "forms": [{"name": "pikachu"}]
+        }
+
+        gestor.getPokemon(25)
+        pokemon = gestor.getPokemon(25, shiny=True)
+
+        assert mock_get.call_count == 1
+        assert pokemon.nome == "pikachu"
+        assert pokemon.shiny is True
+        assert gestor.cache.hits == 1
 
 
 class TestMaxID:
-    @patch.object(GestorAPI, 'conexaoAPI', return_value=True)
-    @patch('requests.get')
-    def test_get_max_id_sucesso(self, mock_get, mock_conn, gestor):
+    @patch('requests.Session.get')
+    def test_get_max_id_sucesso(self, mock_get, gestor):
         mock_get.return_value.status_code = 200
         mock_get.return_value.json.return_value = {"count": 1500}
+        assert gestor.atualizarMaxID() == 1500
         assert gestor.getMaxID() == 1500
 
-    @patch.object(GestorAPI, 'conexaoAPI', return_value=False)
-    def test_get_max_id_fallback_sem_conexao(self, mock_conn, gestor):
+    @patch('requests.Session.get')
+    def test_get_max_id_memoizado(self, mock_get, gestor):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = {"count": 1500}
+        gestor.atualizarMaxID()
+        for _ in range(10):
+            gestor.getMaxID()
+        assert mock_get.call_count == 1
+
+    @patch('requests.Session.get')
+    def test_get_max_id_frio_nao_bloqueia(self, mock_get, gestor):
+        liberar = threading.Event()
+        resposta = MagicMock(status_code=200)
+        resposta.json.return_value = {"count": 1500}
+        mock_get.side_effect = lambda *args, **kwargs: liberar.wait(timeout=5) and resposta
+        # Sem valor ainda: devolve o fallback e atualiza em segundo plano
         assert gestor.getMaxID() == 1025
+        liberar.set()
+        gestor.max_id.thread.join()
+        assert gestor.getMaxID() == 1500
+
+    @patch('requests.Session.get')
+    def test_get_max_id_fallback_circuito_aberto(self, mock_get, gestor):
+        gestor.disjuntor.estado = DisjuntorAPI.ABERTO
+        gestor.disjuntor.tempo_reabertura = float("inf")
+        assert gestor.atualizarMaxID() == 1025
+        mock_get.assert_not_called()
 
-    @patch.object(GestorAPI, 'conexaoAPI', return_value=True)
-    @patch('requests.get')
-    def test_get_max_id_erro_json(self, mock_get, mock_conn, gestor):
+    @patch('requests.Session.get')
+    def test_get_max_id_erro_json(self, mock_get, gestor):
         mock_get.side_effect = requests.exceptions.RequestException
-        assert gestor.getMaxID() == 1025
+        assert gestor.atualizarMaxID() == 1025
+
+    @patch('requests.Session.get')
+    def test_get_max_id_mantem_ultimo_valor_em_falha(self, mock_get, gestor):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = {"count": 1500}
+        gestor.atualizarMaxID()
+        mock_get.side_effect = requests.exceptions.RequestException
+        assert gestor.atualizarMaxID() == 1500
+
+
+class TestDisjuntor:
+    class Relogio:
+        agora = 0.0
+        def __call__(self):
+            return self.agora
+
+    def test_abre_apos_falhas_consecutivas(self):
+        disjuntor = DisjuntorAPI(limite_falhas=3)
+        for _ in range(3):
+            assert disjuntor.permitirChamada()
+            disjuntor.registrarFalha()
+        assert disjuntor.estado == DisjuntorAPI.ABERTO
+        assert disjuntor.permitirChamada() is False
+        assert disjuntor.chamadas_rejeitadas == 1
+
+    def test_sucesso_zera_falhas(self):
+        disjuntor = DisjuntorAPI(limite_falhas=2)
+        disjuntor.registrarFalha()
+        disjuntor.registrarSucesso()
+        disjuntor.registrarFalha()
+        assert disjuntor.estado == DisjuntorAPI.FECHADO
+
+    def test_semiaberto_libera_uma_chamada_de_teste(self):
+        relogio = self.Relogio()
+        disjuntor = DisjuntorAPI(limite_falhas=1, tempo_reabertura=10, relogio=relogio)
+        disjuntor.registrarFalha()
+        relogio.agora = 11
+
+        assert disjuntor.permitirChamada() is True
+        assert disjuntor.estado == DisjuntorAPI.SEMI_ABERTO
+        assert disjuntor.permitirChamada() is False
+
+        disjuntor.registrarSucesso()
+        assert disjuntor.estado == DisjuntorAPI.FECHADO
+        assert disjuntor.metricas()["transicoes"] == {"fechado": 1, "aberto": 1, "semi_aberto": 1}
+
+    def test_falha_no_teste_reabre(self):
+        relogio = self.Relogio()
+        disjuntor = DisjuntorAPI(limite_falhas=1, tempo_reabertura=10, relogio=relogio)
+        disjuntor.registrarFalha()
+        relogio.agora = 11
+        disjuntor.permitirChamada()
+        disjuntor.registrarFalha()
+        assert disjuntor.estado == DisjuntorAPI.ABERTO
+        assert disjuntor.permitirChamada() is False
+
+    @patch('requests.Session.get')
+    def test_erro_inesperado_no_teste_nao_trava_o_semiaberto(self, mock_get):
+        relogio = self.Relogio()
+        gestor = GestorAPI(disjuntor=DisjuntorAPI(limite_falhas=1, tempo_reabertura=10, relogio=relogio))
+        gestor.disjuntor.registrarFalha()
+        relogio.agora = 11
+        mock_get.side_effect = ValueError("resposta inválida")
+
+        with pytest.raises(ValueError):
+            gestor.getPokemon(1)
+        assert gestor.disjuntor.estado == DisjuntorAPI.ABERTO
+
+        relogio.agora = 22
+        mock_get.side_effect = None
+        mock_get.return_value.status_code = 404
+        gestor.getPokemon(1)
+        assert gestor.disjuntor.estado == DisjuntorAPI.FECHADO
+
+    def test_async_cancelamento_no_teste_conta_como_falha(self):
+        relogio = self.Relogio()
+
+        async def cenario():
+            iniciou = asyncio.Event()
+
+            async def handler(request):
+                iniciou.set()
+                await asyncio.sleep(10)
+
+            gestor = GestorAPIAsync(
+                api_url="http://pokeapi.teste/api/v2/",
+                client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+                disjuntor=DisjuntorAPI(limite_falhas=1, tempo_reabertura=10, relogio=relogio),
+            )
+            gestor.disjuntor.registrarFalha()
+            relogio.agora = 11
+            tarefa = asyncio.create_task(gestor.getPokemon(1))
+            await iniciou.wait()
+            tarefa.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await tarefa
+            return gestor.disjuntor
+
+        disjuntor = asyncio.run(cenario())
+        assert disjuntor.estado == DisjuntorAPI.ABERTO
+        relogio.agora = 22
+        assert disjuntor.permitirChamada() is True
+
+    @patch('requests.Session.get')
+    def test_erro_5xx_conta_como_falha(self, mock_get, gestor):
+        mock_get.return_value.status_code = 503
+        gestor.disjuntor.limite_falhas = 2
+        gestor.getPokemon(1)
+        gestor.getPokemon(2)
+        assert gestor.disjuntor.estado == DisjuntorAPI.ABERTO
+
+    @patch('requests.Session.get')
+    def test_404_nao_conta_como_falha(self, mock_get, gestor):
+        mock_get.return_value.status_code = 404
+        gestor.getPokemon(99999)
+        assert gestor.disjuntor.falhas_consecutivas == 0
+
+
+class TestSessaoHTTP:
+    def test_pool_e_retentativas_configurados(self):
+        session = criarSessaoHTTP(pool_tamanho=7, tentativas=3, backoff=0.5, jitter=0.2)
+        adapter = session.get_adapter("https://pokeapi.co/")
+        assert adapter._pool_maxsize == 7
+        assert adapter.max_retries.total == 3
+        assert adapter.max_retries.backoff_jitter == 0.2
+        assert 503 in adapter.max_retries.status_forcelist
+
+    @patch('requests.Session.get')
+    def test_get_pokemon_usa_timeout(self, mock_get, gestor):
+        mock_get.return_value.status_code = 404
+        gestor.getPokemon(1)
+        assert mock_get.call_args.kwargs["timeout"] == gestor.timeout
+
+
+def criarGestorAsync(handler):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return GestorAPIAsync(api_url="http://pokeapi.teste/api/v2/", client=client)
+
+
+@patch('modules.distribuicao.external.HTTP_BACKOFF', 0)
+@patch('modules.distribuicao.external.HTTP_BACKOFF_JITTER', 0)
+class TestGestorAPIAsync:
+    def test_get_pokemon_sucesso(self):
+        gestor = criarGestorAsync(lambda request: httpx.Response(200, json={"forms": [{"name": "mew"}]}))
+        pokemon = asyncio.run(gestor.getPokemon(151, shiny=True))
+        assert pokemon.get_nome() == "mew"
+        assert pokemon.is_shiny() is True
+        assert gestor.cache.obter(151) == "mew"
+
+    def test_get_pokemon_404(self):
+        gestor = criarGestorAsync(lambda request: httpx.Response(404))
+        assert asyncio.run(gestor.getPokemon(99999)) is None
+
+    def test_get_pokemon_404_em_cache_nao_chama_a_api(self):
+        chamadas = []
+        gestor = criarGestorAsync(lambda request: chamadas.append(request) or httpx.Response(404))
+        asyncio.run(gestor.getPokemon(99999))
+        asyncio.run(gestor.getPokemon(99999))
+        assert len(chamadas) == 1
+
+    def test_retentativa_em_5xx(self):
+        respostas = iter([httpx.Response(503), httpx.Response(200, json={"count": 1300})])
+        gestor = criarGestorAsync(lambda request: next(respostas))
+        assert asyncio.run(gestor.getMaxID()) == 1300
+        assert gestor.disjuntor.falhas_consecutivas == 0
+
+    def test_erro_de_conexao_usa_fallback(self):
+        def handler(request):
+            raise httpx.ConnectError("recusada")
+        gestor = criarGestorAsync(handler)
+        assert asyncio.run(gestor.getMaxID()) == 1025
+        assert gestor.disjuntor.falhas_consecutivas == 1
+
+    def test_fallback_do_max_id_igual_ao_sincrono(self):
+        gestor = criarGestorAsync(lambda request: httpx.Response(500))
+        with patch('modules.distribuicao.external.MAX_ID_PADRAO', 900):
+            assert asyncio.run(gestor.getMaxID()) == 900
+
+    def test_circuito_aberto(self):
+        chamadas = []
+        gestor = criarGestorAsync(lambda request: chamadas.append(request) or httpx.Response(200))
+        gestor.disjuntor.estado = DisjuntorAPI.ABERTO
+        gestor.disjuntor.tempo_reabertura = float("inf")
+        assert asyncio.run(gestor.getPokemon(1)) is None
+        assert chamadas == []
+
+
+class TestClienteAsyncPorLoop:
+    def test_loops_diferentes_usam_clientes_diferentes(self):
+        gestor = GestorAPIAsync()
+
+        async def cliente():
+            return gestor._cliente()
+
+        primeiro = asyncio.run(cliente())
+        segundo = asyncio.run(cliente())
+        assert primeiro is not segundo
+
+    def test_mesmo_loop_reaproveita_o_cliente(self):
+        gestor = GestorAPIAsync()
+
+        async def cenario():
+            cliente = gestor._cliente()
+            assert gestor._cliente() is cliente
+            await gestor.fechar()
+            assert cliente.is_closed
+            assert gestor._cliente() is not cliente
+            await gestor.fechar()
+
+        asyncio.run(cenario())
+
+    def test_get_pokemon_em_loops_sucessivos(self):
+        # Conexões HTTP de verdade: o cliente do primeiro loop não pode ser reaproveitado no segundo
+        with StubPokeAPI() as stub:
+            gestor = GestorAPIAsync(api_url=stub.url)
+            assert asyncio.run(gestor.getPokemon(1)).get_nome() == "pokemon-1"
+            assert asyncio.run(gestor.getPokemon(2)).get_nome() == "pokemon-2"
+
+
+def esperar(condicao, timeout: float = 5):
+    """Espera ativa curta, com prazo, até a condição valer."""
+    evento = threading.Event()
+    for _ in range(int(timeout / 0.001)):
+        if condicao():
+            return
+        evento.wait(0.001)
+    raise AssertionError("condição não atingida no prazo")
+
+
+class TestVooUnico:
+    @patch('requests.Session.get')
+    def test_buscas_simultaneas_dividem_uma_chamada(self, mock_get, gestor):
+        liberar = threading.Event()
+        resposta = MagicMock(status_code=200)
+        resposta.json.return_value = {"forms": [{"name": "pikachu"}]}
+        mock_get.side_effect = lambda *args, **kwargs: liberar.wait(timeout=5) and resposta
+
+        resultados = []
+        threads = [
+            threading.Thread(target=lambda shiny=(i % 2 == 0): resultados.append(gestor.getPokemon(25, shiny=shiny)))
+            for i in range(8)
+        ]
+        for t in threads:
+            t.start()
+        # Espera todas as threads entrarem no voo em andamento antes de liberar a resposta
+        esperar(lambda: gestor.voo_unico.coalescidas == 7)
+        liberar.set()
+        for t in threads:
+            t.join()
+
+        assert mock_get.call_count == 1
+        assert {p.nome for p in resultados} == {"pikachu"}
+        # Cada chamador recebe o seu próprio Pokemon, com o seu shiny
+        assert sorted(p.shiny for p in resultados) == [False] * 4 + [True] * 4
+        assert gestor.voo_unico.metricas() == {"em_andamento": 0, "execucoes": 1, "coalescidas": 7}
+
+    def test_excecao_chega_a_todos_que_esperavam(self):
+        voo = VooUnico()
+        liberar = threading.Event()
+        erros = []
+
+        def falhar():
+            liberar.wait(timeout=5)
+            raise RuntimeError("falhou")
+
+        def chamar():
+            try:
+                voo.executar(1, falhar)
+            except RuntimeError as e:
+                erros.append(e)
+
+        threads = [threading.Thread(target=chamar) for _ in range(3)]
+        for t in threads:
+            t.start()
+        esperar(lambda: voo.coalescidas == 2)
+        liberar.set()
+        for t in threads:
+            t.join()
+
+        assert len(erros) == 3
+        # Depois de terminar, a chave é liberada para uma nova execução
+        assert voo.executar(1, lambda: "ok") == "ok"
+        assert voo.execucoes == 2
+
+    def test_async_buscas_simultaneas_dividem_uma_chamada(self):
+        chamadas = []
+
+        async def handler(request):
+            chamadas.append(request)
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, json={"forms": [{"name": "eevee"}]})
+
+        gestor = criarGestorAsync(handler)
+
+        async def buscar():
+            return await asyncio.gather(*(gestor.getPokemon(133, shiny=i == 0) for i in range(10)))
+
+        pokemons = asyncio.run(buscar())
+
+        assert len(chamadas) == 1
+        assert [p.nome for p in pokemons] == ["eevee"] * 10
+        assert [p.shiny for p in pokemons] == [True] + [False] * 9
+        assert gestor.voo_unico.metricas() == {"em_andamento": 0, "execucoes": 1, "coalescidas": 9}
+
+    def test_async_cancelar_quem_busca_nao_cancela_quem_espera(self):
+        voo = VooUnicoAsync()
+        execucoes = []
+
+        async def buscar():
+            execucoes.append(1)
+            await asyncio.sleep(0.01 if len(execucoes) > 1 else 10)
+            return "eevee"
+
+        async def cenario():
+            lider = asyncio.create_task(voo.executar(133, buscar))
+            await asyncio.sleep(0)
+            esperando = asyncio.create_task(voo.executar(133, buscar))
+            await asyncio.sleep(0)
+            lider.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await lider
+            return await esperando
+
+        assert asyncio.run(cenario()) == "eevee"
+        assert len(execucoes) == 2
+        assert voo.metricas()["em_andamento"] == 0
+
+    def test_async_excecao_sem_espera_nao_fica_pendente(self):
+        voo = VooUnicoAsync()
+
+        async def falhar():
+            raise ValueError("x")
+
+        async def executar():
+            with pytest.raises(ValueError):
+                await voo.executar(1, falhar)
+            return await voo.executar(1, lambda: asyncio.sleep(0, result="ok"))
 
-def test_singleton_padrao():
-    g1 = GestorAPI()
-    g2 = GestorAPI()
-    assert g1 is g2
\ No newline at end of file
+        assert asyncio.run(executar()) == "ok"
+        assert voo.metricas()["em_andamento"] == 0
@@ -1,13 +1,15 @@
 import pytest
-from sqlalchemy import create_engine
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker
-from modules.distribuicao.models import Base, Pokemon, Jogador
-from modules.distribuicao.repository import PokemonRepository, UsuarioRepository, UsuarioPokemonRepository
+from modules.distribuicao.models import Base, Pokemon, Jogador, IdempotenciaORM
+from modules.distribuicao.repository import PokemonRepository, UsuarioRepository, UsuarioPokemonRepository, GerenciadorBD, IdempotenciaRepository, contador_trocas
 
 @pytest.fixture
-def db_session():
-    engine = create_engine("sqlite:///:memory:")
-    Base.metadata.create_all(engine)
+def db_session(engine):
     Session = sessionmaker(bind=engine)
     session = Session()
     yield session
@@ -28,6 +30,11 @@ def usuario_repo(db_session):
 def usuario_pokemon_repo(db_session, pokemon_repo, usuario_repo):
     return UsuarioPokemonRepository(db_session, pokemon_repo, usuario_repo)
 
+
+@pytest.fixture
+def gerenciador(db_session):
+    return GerenciadorBD(db_session)
+
 # Testes envonveldno o pokemon repository
 
 def test_create_pokemon(pokemon_repo):
@@ -114,4 +121,455 @@ def test_listar_pokemons_do_usuario(usuario_pokemon_repo, pokemon_repo, usuario_
     usuario_pokemon_repo.adicionarPokemonJogador("1", pokemon1)
     usuario_pokemon_repo.adicionarPokemonJogador("1", pokemon2)
     resultado = usuario_pokemon_repo.listarPokemonsDoUsuario("1")
-    assert len(resultado) == 2
\ No newline at end of file
+    assert len(resultado) == 2
+
+# Testes da gravação em lote da distribuição
+def test_adicionar_distribuicao(gerenciador, usuario_repo, usuario_pokemon_repo):
+    pokemons = [Pokemon(1, "Bulbasaur"), Pokemon(4, "Charmander"), Pokemon(7, "Squirtle")]
+    gerenciador.adicionarDistribuicao(Jogador("1", pokemons), pokemons)
+
+    assert usuario_repo.exists("1")
+    assert len(usuario_pokemon_repo.listarPokemonsDoUsuario("1")) == 3
+
+
+def test_buscar_pokemon_gravado(gerenciador, pokemon_repo):
+    pokemon_repo.create(Pokemon(25, "Pikachu"))
+
+    assert gerenciador.buscarPokemon(25).get_nome() == "Pikachu"
+    assert gerenciador.buscarPokemon(26) is None
+
+def test_adicionar_distribuicao_ignora_existentes(gerenciador, pokemon_repo, usuario_repo, usuario_pokemon_repo):
+    usuario_repo.create(Jogador("1", []))
+    pokemon_repo.create(Pokemon(1, "Bulbasaur"))
+    usuario_pokemon_repo.adicionarPokemonJogador("1", Pokemon(1, "Bulbasaur"))
+
+    pokemons = [Pokemon(1, "Bulbasaur"), Pokemon(4, "Charmander")]
+    gerenciador.adicionarDistribuicao(Jogador("1", pokemons), pokemons)
+
+    assert len(pokemon_repo.listarTodos()) == 2
+    assert len(usuario_pokemon_repo.listarPokemonsDoUsuario("1")) == 2
+
+
+def test_adicionar_distribuicao_uma_transacao(gerenciador, db_session):
+    commits = []
+    event.listen(db_session, "after_commit", lambda session: commits.append(session))
+    pokemons = [Pokemon(i, f"Pokemon {i}") for i in range(1, 6)]
+    gerenciador.adicionarDistribuicao(Jogador("1", pokemons), pokemons)
+
+    assert len(commits) == 1
+
+
+def test_adicionar_distribuicoes_em_lote(gerenciador, db_session, usuario_pokemon_repo, contar_queries):
+    commits = []
+    event.listen(db_session, "after_commit", lambda session: commits.append(session))
+    jogadores = [Jogador(str(j), [Pokemon(j * 5 + i, f"Pokemon {j * 5 + i}") for i in range(1, 6)]) for j in range(20)]
+
+    with contar_queries:
+        gerenciador.adicionarDistribuicoesEmLote(jogadores)
+
+    assert contar_queries.total == 3
+    assert len(commits) == 1
+    assert len(usuario_pokemon_repo.listarPokemonsDoUsuario("7")) == 5
+
+
+# Testes de número de queries por operação
+def test_create_pokemon_uma_query(pokemon_repo, contar_queries):
+    with contar_queries:
+        pokemon_repo.create(Pokemon(1, "Bulbasaur"))
+    assert contar_queries.total == 1
+
+
+def test_create_pokemon_duplicado(pokemon_repo):
+    pokemon_repo.create(Pokemon(1, "Bulbasaur"))
+    with pytest.raises(ValueError, match="já existe"):
+        pokemon_repo.create(Pokemon(1, "Bulbasaur"))
+
+
+def test_create_usuario_uma_query(usuario_repo, contar_queries):
+    with contar_queries:
+        usuario_repo.create(Jogador("1", []))
+    assert contar_queries.total == 1
+
+
+def test_create_usuario_duplicado(usuario_repo):
+    usuario_repo.create(Jogador("1", []))
+    with pytest.raises(ValueError, match="já existe"):
+        usuario_repo.create(Jogador("1", []))
+
+
+def test_exists_uma_query_escalar(pokemon_repo, contar_queries):
+    with contar_queries:
+        pokemon_repo.exists(1)
+    assert contar_queries.total == 1
+    assert "EXISTS" in contar_queries.statements[0]
+
+
+def test_adicionar_pokemon_jogador_uma_query(usuario_pokemon_repo, pokemon_repo, usuario_repo, contar_queries):
+    usuario_repo.create(Jogador("1", []))
+    pokemon_repo.create(Pokemon(1, "Bulbasaur"))
+    with contar_queries:
+        usuario_pokemon_repo.adicionarPokemonJogador("1", Pokemon(1, "Bulbasaur"))
+    assert contar_queries.total == 1
+
+
+def test_adicionar_pokemon_jogador_erros(usuario_pokemon_repo, pokemon_repo, usuario_repo):
+    pokemon_repo.create(Pokemon(1, "Bulbasaur"))
+    with pytest.raises(ValueError, match="Usuário com ID 1 não encontrado"):
+        usuario_pokemon_repo.adicionarPokemonJogador("1", Pokemon(1, "Bulbasaur"))
+
+    usuario_repo.create(Jogador("1", []))
+    with pytest.raises(ValueError, match="Pokémon com ID 2 não encontrado"):
+        usuario_pokemon_repo.adicionarPokemonJogador("1", Pokemon(2, "Ivysaur"))
+
+    usuario_pokemon_repo.adicionarPokemonJogador("1", Pokemon(1, "Bulbasaur"))
+    with pytest.raises(ValueError, match="já possui"):
+        usuario_pokemon_repo.adicionarPokemonJogador("1", Pokemon(1, "Bulbasaur"))
+
+
+def test_listar_pokemons_uma_query(usuario_pokemon_repo, pokemon_repo, usuario_repo, contar_queries):
+    usuario_repo.create(Jogador("1", []))
+    pokemon_repo.create(Pokemon(1, "Bulbasaur"))
+    usuario_pokemon_repo.adicionarPokemonJogador("1", Pokemon(1, "Bulbasaur"))
+    with contar_queries:
+        resultado = usuario_pokemon_repo.listarPokemonsDoUsuario("1")
+    assert contar_queries.total == 1
+    assert [p.get_nome() for p in resultado] == ["Bulbasaur"]
+
+
+def test_listar_time_vazio_e_usuario_inexistente(usuario_pokemon_repo, usuario_repo):
+    usuario_repo.create(Jogador("1", []))
+    assert usuario_pokemon_repo.listarPokemonsDoUsuario("1") == []
+    with pytest.raises(ValueError, match="não encontrado"):
+        usuario_pokemon_repo.listarPokemonsDoUsuario("2")
+
+
+def test_read_usuario_carrega_time_sem_n_mais_1(gerenciador, db_session, usuario_repo, orcamento_queries):
+    gerenciador.adicionarDistribuicoesEmLote([Jogador("1", [Pokemon(i, f"pokemon-{i}") for i in range(1, 11)])])
+    db_session.expunge_all()
+
+    # Usuário + vínculos + pokémons, independente do tamanho do time
+    with orcamento_queries(3):
+        jogador = usuario_repo.read("1")
+        nomes = sorted(p.get_nome() for p in jogador.get_pokemons())
+
+    assert nomes == sorted(f"pokemon-{i}" for i in range(1, 11))
+
+
+def test_remover_pokemon_inexistente_uma_query(usuario_pokemon_repo, contar_queries):
+    with contar_queries:
+        assert usuario_pokemon_repo.removerPokemonJogador("1", 1) is False
+    assert contar_queries.total == 1
+
+
+# Testes da troca entre jogadores
+@pytest.fixture
+def dois_times(gerenciador, usuario_pokemon_repo):
+    gerenciador.adicionarDistribuicoesEmLote([
+        Jogador("a", [Pokemon(1, "Bulbasaur"), Pokemon(4, "Charmander")]),
+        Jogador("b", [Pokemon(7, "Squirtle"), Pokemon(25, "Pikachu")]),
+    ])
+    return usuario_pokemon_repo
+
+
+def numeros(repo, id_usuario):
+    return sorted(p.get_numero_pokedex() for p in repo.listarPokemonsDoUsuario(id_usuario))
+
+
+def test_trocar_pokemons(gerenciador, dois_times, db_session):
+    commits = []
+    event.listen(db_session, "after_commit", lambda session: commits.append(session))
+
+    gerenciador.trocarPokemons("a", 1, "b", 25)
+
+    assert numeros(dois_times, "a") == [4, 25]
+    assert numeros(dois_times, "b") == [1, 7]
+    assert len(commits) == 1
+
+
+def test_trocar_pokemons_sem_apagar_linhas(gerenciador, dois_times, contar_queries):
+    with contar_queries:
+        gerenciador.trocarPokemons("a", 1, "b", 25)
+
+    assert not any(s.lstrip().upper().startswith(("DELETE", "INSERT")) for s in contar_queries.statements)
+    assert sum(s.lstrip().upper().startswith("UPDATE") for s in contar_queries.statements) == 1
+
+
+def test_trocar_trava_na_mesma_ordem(gerenciador, dois_times, engine):
+    travas = []
+
+    def registrar(conn, cursor, statement, params, *args):
+        if statement.lstrip().startswith("SELECT"):
+            travas.append(params[0])
+
+    event.listen(engine, "before_cursor_execute", registrar)
+
+    gerenciador.trocarPokemons("b", 25, "a", 1)
+    gerenciador.trocarPokemons("b", 1, "a", 25)
+
+    event.remove(engine, "before_cursor_execute", registrar)
+    assert travas == ["a", "b", "a", "b"]
+
+
+def test_trocar_pokemon_que_nao_possui(gerenciador, dois_times):
+    with pytest.raises(ValueError, match="não possui o Pokémon 7"):
+        gerenciador.trocarPokemons("a", 7, "b", 25)
+    assert numeros(dois_times, "a") == [1, 4]
+
+
+def test_trocar_destino_ja_possui(gerenciador, dois_times):
+    dois_times.adicionarVinculosEmLote([("b", 4)])
+    dois_times.db.commit()
+
+    with pytest.raises(ValueError, match="já possui"):
+        gerenciador.trocarPokemons("a", 4, "b", 25)
+    assert numeros(dois_times, "a") == [1, 4]
+    assert numeros(dois_times, "b") == [4, 7, 25]
+
+
+def test_trocar_consigo_mesmo(gerenciador, dois_times):
+    with pytest.raises(ValueError):
+        gerenciador.trocarPokemons("a", 1, "a", 4)
+
+
+def test_trocar_repete_apos_deadlock(gerenciador, dois_times, monkeypatch):
+    original = UsuarioPokemonRepository.trocarPokemonsJogadores
+    chamadas = []
+
+    def comDeadlock(self, *args):
+        chamadas.append(args)
+        if len(chamadas) == 1:
+            raise OperationalError("UPDATE", {}, Exception(1213, "Deadlock found when trying to get lock"))
+        return original(self, *args)
+
+    monkeypatch.setattr(UsuarioPokemonRepository, "trocarPokemonsJogadores", comDeadlock)
+    antes = contador_trocas.metricas()
+
+    gerenciador.trocarPokemons("a", 1, "b", 25)
+
+    assert len(chamadas) == 2
+    assert contador_trocas.retentativas == antes["retentativas"] + 1
+    assert numeros(dois_times, "a") == [4, 25]
+
+
+def test_trocar_desiste_apos_tentativas(gerenciador, dois_times, monkeypatch):
+    def sempreDeadlock(self, *args):
+        raise OperationalError("UPDATE", {}, Exception(1205, "Lock wait timeout exceeded"))
+
+    monkeypatch.setattr(UsuarioPokemonRepository, "trocarPokemonsJogadores", sempreDeadlock)
+
+    with pytest.raises(ValueError, match="concorrência"):
+        gerenciador.trocarPokemons("a", 1, "b", 25)
+
+
+# Testes da troca de um pokémon do próprio jogador (PATCH)
+RESPOSTA_OK = {"status": "sucesso", "mensagem": "trocado", "codigo": "200"}
+
+
+def test_substituir_pokemon(gerenciador, dois_times, db_session, contar_queries):
+    commits = []
+    event.listen(db_session, "after_commit", lambda session: commits.append(session))
+
+    with contar_queries:
+        resposta = gerenciador.substituirPokemonDoJogador("a", 1, Pokemon(150, "Mewtwo"), RESPOSTA_OK)
+
+    assert resposta == RESPOSTA_OK
+    assert numeros(dois_times, "a") == [4, 150]
+    assert len(commits) == 1
+    assert not any(s.lstrip().upper().startswith("DELETE") for s in contar_queries.statements)
+
+
+def test_substituir_pokemon_que_nao_possui(gerenciador, dois_times):
+    with pytest.raises(ValueError, match="não possui o Pokémon 7"):
+        gerenciador.substituirPokemonDoJogador("a", 7, Pokemon(150, "Mewtwo"), RESPOSTA_OK)
+
+
+def test_substituir_por_pokemon_que_ja_possui(gerenciador, dois_times):
+    with pytest.raises(ValueError, match="já possui o Pokémon 4"):
+        gerenciador.substituirPokemonDoJogador("a", 1, Pokemon(4, "Charmander"), RESPOSTA_OK)
+    assert numeros(dois_times, "a") == [1, 4]
+
+
+def test_substituir_com_chave_grava_resposta(gerenciador, dois_times):
+    gerenciador.substituirPokemonDoJogador("a", 1, Pokemon(150, "Mewtwo"), RESPOSTA_OK, chave="k1")
+
+    assert gerenciador.buscarRespostaIdempotente("k1", "a") == RESPOSTA_OK
+    assert gerenciador.buscarRespostaIdempotente("k2", "a") is None
+
+
+def test_substituir_chave_repetida_nao_aplica_de_novo(gerenciador, dois_times):
+    gerenciador.substituirPokemonDoJogador("a", 1, Pokemon(150, "Mewtwo"), RESPOSTA_OK, chave="k1")
+    # Corrida: a repetição passou da checagem antes da primeira gravar a chave
+    dois_times.adicionarVinculosEmLote([("a", 1)])
+    dois_times.db.commit()
+
+    resposta = gerenciador.substituirPokemonDoJogador("a", 1, Pokemon(151, "Mew"), {"outra": True}, chave="k1")
+
+    assert resposta == RESPOSTA_OK
+    assert numeros(dois_times, "a") == [1, 4, 150]
+
+
+def test_repeticoes_simultaneas_devolvem_a_mesma_resposta(tmp_path):
+    # Banco em arquivo: cada thread tem sua própria conexão e sessão
+    engine = create_engine(f"sqlite:///{tmp_path}/banco.db")
+    Base.metadata.create_all(engine)
+    Sessao = sessionmaker(bind=engine)
+    with Sessao() as db:
+        GerenciadorBD(db).adicionarDistribuicao(Jogador("a", []), [Pokemon(1, "Bulbasaur"), Pokemon(4, "Charmander")])
+
+    barreira = threading.Barrier(2)
+
+    def repetir(resposta):
+        with Sessao() as db:
+            barreira.wait()
+            return GerenciadorBD(db).substituirPokemonDoJogador("a", 1, Pokemon(150, "Mewtwo"), resposta, chave="k1")
+
+    with ThreadPoolExecutor(2) as executor:
+        respostas = list(executor.map(repetir, [{"tentativa": 1}, {"tentativa": 2}]))
+
+    # As duas recebem a resposta de quem gravou a chave primeiro; a troca é aplicada uma vez
+    assert respostas[0] == respostas[1]
+    with Sessao() as db:
+        assert numeros(UsuarioPokemonRepository(db, PokemonRepository(db), UsuarioRepository(db)), "a") == [4, 150]
+    engine.dispose()
+
+
+def test_repeticao_depois_da_troca_devolve_resposta_gravada(gerenciador, dois_times):
+    gerenciador.substituirPokemonDoJogador("a", 1, Pokemon(150, "Mewtwo"), RESPOSTA_OK, chave="k1")
+
+    # A repetição passou da checagem antes da primeira gravar; o vínculo já não existe
+    resposta = gerenciador.substituirPokemonDoJogador("a", 1, Pokemon(150, "Mewtwo"), {"outra": True}, chave="k1")
+
+    assert resposta == RESPOSTA_OK
+    assert numeros(dois_times, "a") == [4, 150]
+
+
+def test_buscar_chave_sem_tabela_idempotencia(gerenciador, engine):
+    # Banco ainda sem a migração da tabela: erro esperado, não uma exceção do SQLAlchemy
+    IdempotenciaORM.__table__.drop(engine)
+
+    with pytest.raises(ValueError, match="Erro ao buscar chave de idempotência"):
+        gerenciador.buscarRespostaIdempotente("k1", "a")
+
+
+def test_chave_de_outro_jogador(gerenciador, dois_times):
+    gerenciador.substituirPokemonDoJogador("a", 1, Pokemon(150, "Mewtwo"), RESPOSTA_OK, chave="k1")
+
+    with pytest.raises(ValueError, match="outro jogador"):
+        gerenciador.buscarRespostaIdempotente("k1", "b")
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = datetime(2026, 1, 1)
+
+    def __call__(self):
+        return self.agora
+
+
+def test_chave_vencida_vale_como_nova(db_session):
+    relogio = Relogio()
+    repo = IdempotenciaRepository(db_session, ttl=60, relogio=relogio)
+    repo.registrar("k1", "a", RESPOSTA_OK)
+    db_session.commit()
+
+    relogio.agora += timedelta(seconds=59)
+    assert repo.buscar("k1", "a") == RESPOSTA_OK
+
+    relogio.agora += timedelta(seconds=2)
+    assert repo.buscar("k1", "a") is None
+    assert repo.buscar("k1", "b") is None  # vencida, não acusa outro jogador
+
+    # Reaproveitar a chave vencida grava a resposta nova
+    repo.registrar("k1", "b", {"nova": True})
+    db_session.commit()
+    assert repo.buscar("k1", "b") == {"nova": True}
+
+
+def test_purgar_apaga_so_chaves_vencidas(db_session):
+    relogio = Relogio()
+    repo = IdempotenciaRepository(db_session, ttl=60, relogio=relogio)
+    for i in range(5):
+        repo.registrar(f"velha-{i}", "a", RESPOSTA_OK)
+    relogio.agora += timedelta(seconds=120)
+    repo.registrar("recente", "a", RESPOSTA_OK)
+    db_session.commit()
+
+    assert repo.purgarExpiradas(tamanho_lote=2) == 5
+    assert db_session.scalars(select(IdempotenciaORM.chave)).all() == ["recente"]
+
+
+# Testes da listagem paginada e em streaming
+@pytest.fixture
+def time_grande(gerenciador):
+    gerenciador.adicionarDistribuicoesEmLote([Jogador("c", [Pokemon(i, f"Pokemon {i}") for i in range(1, 26)])])
+    return gerenciador
+
+
+def test_paginas_por_cursor(time_grande):
+    vistos = []
+    cursor = None
+    while True:
+        pagina, cursor = time_grande.getPaginaPokemonsDoJogador("c", 10, cursor)
+        vistos.extend(p.get_numero_pokedex() for p in pagina)
+        if cursor is None:
+            break
+
+    assert vistos == list(range(1, 26))
+
+
+def test_pagina_exata_nao_tem_proxima(time_grande):
+    pagina, cursor = time_grande.getPaginaPokemonsDoJogador("c", 25)
+    assert len(pagina) == 25
+    assert cursor is None
+
+
+def test_pagina_apos_o_fim_e_vazia(time_grande):
+    assert time_grande.getPaginaPokemonsDoJogador("c", 10, 25) == ([], None)
+
+
+def test_pagina_usuario_inexistente(time_grande):
+    with pytest.raises(ValueError, match="não encontrado"):
+        time_grande.getPaginaPokemonsDoJogador("zz", 10)
+
+
+def test_pagina_uma_query(time_grande, contar_queries):
+    with contar_queries:
+        time_grande.getPaginaPokemonsDoJogador("c", 10, 5)
+    assert contar_queries.total == 1
+
+
+def test_iterar_pokemons_em_lotes(time_grande):
+    gerador = time_grande.iterarPokemonsDoJogador("c", tamanho_lote=4)
+
+    assert next(gerador).get_numero_pokedex() == 1
+    assert [p.get_numero_pokedex() for p in gerador] == list(range(2, 26))
+
+
+def test_iterar_usa_cursor_do_servidor(time_grande, engine):
+    opcoes = []
+
+    def registrar(conn, clauseelement, multiparams, params, execution_options):
+        opcoes.append(execution_options)
+
+    event.listen(engine, "before_execute", registrar)
+
+    list(time_grande.iterarPokemonsDoJogador("c", tamanho_lote=4))
+
+    event.remove(engine, "before_execute", registrar)
+    assert any(o.get("stream_results") and o.get("yield_per") == 4 for o in opcoes)
+
+
+def test_listar_linhas_do_usuario(time_grande, usuario_repo):
+    linhas = time_grande.getLinhasTimeDoJogador("c")
+
+    assert sorted(linhas)[0] == (1, "Pokemon 1", False)
+    assert len(linhas) == 25
+    usuario_repo.create(Jogador("vazio", []))
+    assert time_grande.getLinhasTimeDoJogador("vazio") == []
+    with pytest.raises(ValueError, match="não encontrado"):
+        time_grande.getLinhasTimeDoJogador("zz")
+
+
+def test_modelos_de_dominio_sem_dict():
+    assert not hasattr(Pokemon(1, "Bulbasaur"), "__dict__")
+    assert not hasattr(Jogador("1", []), "__dict__")
@@ -0,0 +1,65 @@
+import json
+from unittest.mock import patch
+from modules.distribuicao.models import Pokemon
+from modules.distribuicao.router import DistribuicaoResponse, formatarDistribuicao
+from shared import respostas
+from shared.respostas import RespostaJSONRapida, responder, serializarJSON
+
+
+def resultado_distribuicao():
+    return {
+        "status": "sucesso",
+        "mensagem": "Os 5 pokémons iniciais foram gerados com sucesso.",
+        "codigo": "200",
+        "pokemons": [Pokemon(25, "Pikachu", True), Pokemon(6, "Charizard")],
+    }
+
+
+def test_formatar_distribuicao_valida_no_response_model():
+    formatado = formatarDistribuicao(resultado_distribuicao())
+
+    # O formato montado à mão tem que ser o mesmo que o response_model produziria
+    validado = DistribuicaoResponse.model_validate(resultado_distribuicao(), from_attributes=True).model_dump()
+    assert formatado == validado
+
+
+def test_formatar_distribuicao_erro_ganha_lista_vazia():
+    erro = {"status": "erro", "mensagem": "Erro ao gerar pokémons iniciais: x", "codigo": "500"}
+
+    formatado = formatarDistribuicao(erro)
+
+    assert formatado["pokemons"] == []
+    assert formatado == DistribuicaoResponse.model_validate(erro).model_dump()
+
+
+def test_serializar_json_compacto_e_utf8():
+    dados = {"mensagem": "Pokémon", "pokemons": [{"numero_pokedex": 1, "shiny": False}]}
+
+    saida = serializarJSON(dados)
+
+    assert isinstance(saida, bytes)
+    assert json.loads(saida) == dados
+    assert b" " not in saida.replace("Pokémon".encode(), b"")
+
+
+def test_serializar_json_sem_orjson_usa_json_padrao():
+    dados = {"mensagem": "Pokémon", "lista": [1, 2]}
+
+    with patch.object(respostas, "orjson", None):
+        saida = serializarJSON(dados)
+
+    assert saida == '{"mensagem":"Pokémon","lista":[1,2]}'.encode("utf-8")
+
+
+def test_responder_desligado_devolve_o_conteudo():
+    with patch.object(respostas, "RESPOSTA_JSON_RAPIDA", False):
+        assert responder({"a": 1}) == {"a": 1}
+
+
+def test_responder_ligado_devolve_resposta_rapida():
+    with patch.object(respostas, "RESPOSTA_JSON_RAPIDA", True):
+        resposta = responder({"a": 1})
+
+    assert isinstance(resposta, RespostaJSONRapida)
+    assert resposta.media_type == "application/json"
+    assert json.loads(resposta.body) == {"a": 1}
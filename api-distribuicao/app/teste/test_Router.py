@@ -0,0 +1,63 @@
+import json
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from benchmarks.stub_pokeapi import StubPokeAPI
+from modules.distribuicao.container import Container, obterContainer
+from modules.distribuicao.models import Base
+from modules.distribuicao.router import router
+from shared.database import get_db
+
+
+@pytest.fixture
+def sessoes():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def cliente(sessoes):
+    with StubPokeAPI() as stub:
+        container = Container(api_url=stub.url, sessoes=sessoes)
+        app = FastAPI()
+        app.include_router(router, prefix="/api")
+        app.dependency_overrides[obterContainer] = lambda: container
+
+        def semSessaoDaRequisicao():
+            raise AssertionError("o stream não deve usar a sessão do Depends(get_db)")
+            yield
+
+        app.dependency_overrides[get_db] = semSessaoDaRequisicao
+        yield TestClient(app)
+
+
+def test_lote_em_stream_usa_sessao_propria(cliente):
+    resposta = cliente.post("/api/distributions/batch", json={"player_ids": ["a", "b"]})
+
+    linhas = [json.loads(linha) for linha in resposta.text.splitlines()]
+    assert resposta.status_code == 200
+    assert [linha["status"] for linha in linhas] == ["sucesso", "sucesso"]
+    assert all(len(linha["pokemons"]) == 5 for linha in linhas)
+
+
+def test_distribuicao_que_nao_foi_gravada_responde_500(cliente):
+    # Banco sem tabelas: a transação da distribuição falha
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    sessao = sessionmaker(bind=engine)
+
+    def semTabelas():
+        with sessao() as db:
+            yield db
+
+    cliente.app.dependency_overrides[get_db] = semTabelas
+    resposta = cliente.post("/api/players/a/distribution")
+
+    assert resposta.status_code == 500
+    assert resposta.json()["status"] == "erro"
+    assert resposta.json()["pokemons"] == []
+    engine.dispose()
@@ -0,0 +1,157 @@
+import json
+import numpy as np
+import pytest
+from unittest.mock import Mock
+from modules.distribuicao.cache import CacheNegativo
+from modules.distribuicao.sorteio import MotorSorteio
+from modules.distribuicao.service import GestorCartas
+from modules.distribuicao.external import GestorAPI
+from modules.distribuicao.models import Pokemon
+from modules.distribuicao.repository import GerenciadorBD
+
+
+def test_formato_e_ids_unicos_por_linha():
+    ids, shiny = MotorSorteio(semente=1).sortear(1000, max_id=151, k=5)
+
+    assert ids.shape == shiny.shape == (1000, 5)
+    assert ids.min() >= 1 and ids.max() <= 151
+    assert all(len(set(linha)) == 5 for linha in ids.tolist())
+
+
+def test_mesma_semente_mesmo_sorteio():
+    a = MotorSorteio(semente=42).sortear(100, max_id=1025)
+    b = MotorSorteio(semente=42).sortear(100, max_id=1025)
+
+    assert np.array_equal(a[0], b[0])
+    assert np.array_equal(a[1], b[1])
+
+
+def test_sementes_diferentes_sorteios_diferentes():
+    a, _ = MotorSorteio(semente=1).sortear(100, max_id=1025)
+    b, _ = MotorSorteio(semente=2).sortear(100, max_id=1025)
+
+    assert not np.array_equal(a, b)
+
+
+def test_taxa_de_shiny():
+    _, shiny = MotorSorteio(semente=7).sortear(100_000, max_id=1025)
+
+    assert shiny.mean() == pytest.approx(1 / 256, rel=0.1)
+
+
+def test_universo_pequeno_cobre_todos_os_ids():
+    ids, _ = MotorSorteio(semente=3).sortear(50, max_id=5, k=5)
+
+    assert all(sorted(linha) == [1, 2, 3, 4, 5] for linha in ids.tolist())
+
+
+def test_peso_zero_exclui_especie():
+    motor = MotorSorteio(semente=5, pesos={1: 0, 2: 0})
+    ids, _ = motor.sortear(2000, max_id=20, k=5)
+
+    assert not np.isin(ids, [1, 2]).any()
+
+
+def test_pesos_de_raridade():
+    # A espécie 1 tem peso 10x maior que as demais
+    motor = MotorSorteio(semente=9, pesos={1: 10.0})
+    ids, _ = motor.sortear(20_000, max_id=100, k=1)
+
+    frequencia = np.bincount(ids.ravel(), minlength=101)[1:] / ids.size
+    assert frequencia[0] == pytest.approx(10 / 109, rel=0.1)
+    assert frequencia[1:].mean() == pytest.approx(1 / 109, rel=0.1)
+
+
+def test_peso_concentrado_usa_gumbel_em_blocos():
+    # Duas espécies concentram quase todo o peso: colisões frequentes
+    motor = MotorSorteio(semente=11, pesos={3: 1000.0, 4: 1000.0, 5: 0}, tamanho_bloco=64)
+    ids, _ = motor.sortear(1000, max_id=200, k=5)
+
+    assert ids.shape == (1000, 5)
+    assert all(len(set(linha)) == 5 for linha in ids.tolist())
+    assert (ids == 3).any(axis=1).mean() > 0.95
+    assert not (ids == 5).any()
+
+
+def test_excluir_ids():
+    ids, _ = MotorSorteio(semente=13).sortear(500, max_id=10, k=3, excluir={1, 2, 3})
+
+    assert not np.isin(ids, [1, 2, 3]).any()
+
+
+def test_invalidos_excluidos_sem_sair_do_sorteio_uniforme():
+    invalidos = CacheNegativo()
+    for numero in (1, 2, 3):
+        invalidos.marcar(numero)
+    motor = MotorSorteio(semente=13, invalidos=invalidos)
+
+    ids, _ = motor.sortear(2000, max_id=151, k=5)
+
+    assert not np.isin(ids, [1, 2, 3]).any()
+    assert all(len(set(linha)) == 5 for linha in ids.tolist())
+    # Os demais continuam equiprováveis
+    contagem = np.bincount(ids.ravel(), minlength=152)[4:]
+    assert contagem.min() > 0
+
+
+def test_invalidos_em_excesso_esgotam_especies():
+    invalidos = CacheNegativo()
+    for numero in range(1, 8):
+        invalidos.marcar(numero)
+
+    with pytest.raises(ValueError):
+        MotorSorteio(invalidos=invalidos).sortear(1, max_id=10, k=5)
+
+
+def test_poucas_especies_disponiveis():
+    with pytest.raises(ValueError):
+        MotorSorteio().sortear(1, max_id=4, k=5)
+
+
+def test_carregar_pesos(tmp_path):
+    arquivo = tmp_path / "pesos.json"
+    arquivo.write_text(json.dumps({"1": 0, "2": 0.5}))
+    motor = MotorSorteio()
+
+    assert motor.carregarPesos(str(arquivo)) == 2
+    assert motor.pesos == {1: 0.0, 2: 0.5}
+
+
+def test_distribuicao_reproduzivel_pela_semente():
+    def distribuir():
+        api = Mock(spec=GestorAPI)
+        api.getMaxID.return_value = 151
+        api.getPokemon.side_effect = lambda numero, shiny=False: Pokemon(numero, f"pokemon-{numero}", shiny)
+        gestor = GestorCartas(api, Mock(spec=GerenciadorBD), sorteio=MotorSorteio(semente=2024))
+        return [p.get_numero_pokedex() for p in gestor.gerarPokemonsIniciais("jogador1")["pokemons"]]
+
+    assert distribuir() == distribuir()
+
+
+def test_distribuicao_nao_repete_id_invalido():
+    api = Mock(spec=GestorAPI)
+    api.getMaxID.return_value = 10
+    # Os ids 1 e 2 não existem na API
+    api.getPokemon.side_effect = lambda numero, shiny=False: None if numero <= 2 else Pokemon(numero, "x", shiny)
+    gestor = GestorCartas(api, Mock(spec=GerenciadorBD), sorteio=MotorSorteio(semente=0))
+
+    resultado = gestor.gerarPokemonsIniciais("jogador1")
+
+    consultados = [c.args[0] for c in api.getPokemon.call_args_list]
+    assert resultado["status"] == "sucesso"
+    assert len(consultados) == len(set(consultados))
+
+
+def test_distribuicao_nao_sorteia_id_com_404_em_cache():
+    invalidos = CacheNegativo()
+    for numero in range(1, 6):
+        invalidos.marcar(numero)
+    api = Mock(spec=GestorAPI)
+    api.getMaxID.return_value = 10
+    api.getPokemon.side_effect = lambda numero, shiny=False: Pokemon(numero, "x", shiny)
+    gestor = GestorCartas(api, Mock(spec=GerenciadorBD), sorteio=MotorSorteio(semente=0, invalidos=invalidos))
+
+    resultado = gestor.gerarPokemonsIniciais("jogador1")
+
+    assert resultado["status"] == "sucesso"
+    assert sorted(c.args[0] for c in api.getPokemon.call_args_list) == [6, 7, 8, 9, 10]
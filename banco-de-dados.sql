@@ -4,29 +4,62 @@ USE distribuicao_de_cartas;
 
 -- Tabela de Pokémons
 CREATE TABLE IF NOT EXISTS Pokemon (
-    idPokemon INT AUTO_INCREMENT PRIMARY KEY,
+    idPokemon INT PRIMARY KEY, -- número da pokédex
     nomePokemon VARCHAR(25) NOT NULL,
     isShiny BOOLEAN DEFAULT FALSE
 );
 
 -- Tabela de Usuários
 CREATE TABLE IF NOT EXISTS Usuario (
-    idUsuario INT AUTO_INCREMENT PRIMARY KEY
+    idUsuario VARCHAR(20) PRIMARY KEY
 );
 
 -- Relação entre Usuario e Pokemon
 CREATE TABLE IF NOT EXISTS UsuarioPokemon (
-    idUsuario INT NOT NULL,
+    idUsuario VARCHAR(20) NOT NULL,
     idPokemon INT NOT NULL,
 
     PRIMARY KEY (idUsuario, idPokemon),
+    -- Busca inversa "quem possui o Pokémon X" (a PK cobre listagem e posse)
+    INDEX ix_UsuarioPokemon_idPokemon_idUsuario (idPokemon, idUsuario),
     FOREIGN KEY (idUsuario) REFERENCES Usuario(idUsuario)
         ON DELETE CASCADE ON UPDATE CASCADE,
     FOREIGN KEY (idPokemon) REFERENCES Pokemon(idPokemon)
         ON DELETE CASCADE ON UPDATE CASCADE
 );
 
+-- Catálogo local de espécies (importado da PokeAPI uma única vez)
+CREATE TABLE IF NOT EXISTS Especie (
+    idEspecie INT PRIMARY KEY,
+    nomeEspecie VARCHAR(50) NOT NULL,
+    tipos VARCHAR(50) NULL,
+    raridade INT NULL
+);
+
+-- Respostas de operações já aplicadas (cabeçalho Idempotency-Key)
+CREATE TABLE IF NOT EXISTS Idempotencia (
+    chave VARCHAR(64) PRIMARY KEY,
+    idUsuario VARCHAR(20) NOT NULL,
+    resposta TEXT NOT NULL,
+    criadoEm DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP, -- UTC
+    INDEX ix_Idempotencia_criadoEm (criadoEm)
+);
+
+-- Migrações (api-distribuicao/app/migracoes) já incluídas neste script
+CREATE TABLE IF NOT EXISTS VersaoEsquema (
+    versao INT PRIMARY KEY,
+    nome VARCHAR(100) NOT NULL,
+    aplicadaEm DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+INSERT INTO VersaoEsquema (versao, nome) VALUES
+    (1, 'alinhar_tipos'),
+    (2, 'indices_time'),
+    (3, 'criar_especie'),
+    (4, 'criar_idempotencia'),
+    (5, 'indice_idempotencia');
+
 -- Teste
 SELECT * FROM Pokemon;
 SELECT * FROM Usuario;
-SELECT * FROM UsuarioPokemon;
\ No newline at end of file
+SELECT * FROM UsuarioPokemon;
+SELECT * FROM Especie;
\ No newline at end of file